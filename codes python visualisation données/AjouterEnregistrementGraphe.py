@@ -1,73 +1,92 @@
-import json
-import networkx as nx
+import argparse
+from FormatBinaireGraphe import load_networkx, write_snapshot_for, from_networkx
+from FluxGEXF import write_gexf
 from tqdm import tqdm
+from LireEnregistrements import iter_records
+from GrapheNetworkX import paper_attributes, resolve_pending_references, add_collaboration_records
 
 def load_graph(file_path):
-    """ Load an existing GEXF file into a NetworkX graph. """
-    return nx.read_gexf(file_path)
+    """ Load an existing GEXF file into a NetworkX graph to add records to, from its binary snapshot when available.
+
+    Records are added by mutating the graph, so NetworkX is needed here; the --store mode adds them
+    to an array-based graph store instead.
+    """
+    return load_networkx(file_path)
 
 def save_graph(graph, file_path):
-    """ Save a NetworkX graph to a GEXF file. """
-    nx.write_gexf(graph, file_path)
+    """ Save a NetworkX graph to a GEXF file and refresh its binary snapshot. """
+    # Une seule conversion en tableaux, partagée par l'export GEXF en flux et l'instantané
+    compact = from_networkx(graph)
+    write_gexf(compact, file_path)
+    write_snapshot_for(compact, file_path)
     print(f"Graph saved to {file_path}")
 
-def add_records_to_graph(graph, records, network_type):
-    """ Add records to the graph and create necessary edges. """
+def add_records_to_graph(graph, records, network_type, stub_nodes=False, max_authors=None, weighting='count'):
+    """ Add records to the graph and create necessary edges, whatever the order of the records. """
+    if network_type != '1':
+        # Collaboration network: author pairs expanded in arrays, repeated collaborations increase the edge weight
+        add_collaboration_records(graph, records, max_authors, weighting, desc="Adding records to graph")
+        return
+    pending_references = {}
     for record in tqdm(records, desc="Adding records to graph"):
-        node_attributes = {
-            'year': str(record.get('year', "")),
-            'title': str(record.get('title', "")),
-            'fos': ', '.join(record.get('fos', [])) if record.get('fos', None) is not None else "Unknown",
-            'references': ', '.join(record.get('references', [])) if record.get('references', None) is not None else "Unknown"
-        }
+        # Add node for citation network (an existing stub keeps its edges and becomes a real paper)
+        graph.add_node(record['_id'], **paper_attributes(record))
+        graph.nodes[record['_id']].pop('stub', None)
+        references = record.get('references', [])
+        if isinstance(references, list):
+            for ref in references:
+                if ref and ref in graph:
+                    graph.add_edge(ref, record['_id'])
+                elif ref:
+                    pending_references.setdefault(ref, []).append(record['_id'])
 
-        if network_type == '1':
-            # Add node for citation network
-            graph.add_node(record['_id'], **node_attributes)
-            references = record.get('references', [])
-            if isinstance(references, list):
-                for ref in references:
-                    if ref and ref in graph:
-                        graph.add_edge(ref, record['_id'])
-        else:
-            # Add nodes and edges for collaboration network
-            authors = record.get('authors', [])
-            if authors:
-                for author in authors:
-                    if 'name' in author and '_id' in author:
-                        author_attributes = {
-                            'name': str(author.get('name', "Unknown")),
-                            **node_attributes
-                        }
-                        graph.add_node(author['_id'], **author_attributes)
+    resolve_pending_references(graph, pending_references, stub_nodes)
 
-                for i in range(len(authors)):
-                    if '_id' in authors[i]:
-                        for j in range(i + 1, len(authors)):
-                            if '_id' in authors[j]:
-                                graph.add_edge(authors[i]['_id'], authors[j]['_id'])
+def add_records_to_store(store_path, records_path, network_type, stub_nodes=False):
+    """ Append records to a persistent graph store: cost proportional to the new records only. """
+    from GrapheIncremental import GraphStore
+    store = GraphStore(store_path, network_type, stub_nodes)
+    added = store.ingest_file(records_path)
+    print(f"{added} new papers added to the graph store {store_path}")
+    return store
 
-def main():
+def main(store_path=None, export_path=None, max_authors=None, weighting='count'):
     # Paths to the graph file and new records file
     graph_path = r"C:\Users\Kenzi\Documents\MIASHS\L3 MIAGE\Nanterre\Semestre 6\GRAPHES ET OPEN DATA\projet\Dataset\Graphe\Dataset_Collaboration_Top_200_Sommets_merged_citation_network.gexf"
     new_records_path = r"C:\Users\Kenzi\Documents\MIASHS\L3 MIAGE\Nanterre\Semestre 6\GRAPHES ET OPEN DATA\projet\Dataset\Ajout.json"
     updated_graph_path = r"C:\Users\Kenzi\Documents\MIASHS\L3 MIAGE\Nanterre\Semestre 6\GRAPHES ET OPEN DATA\projet\Dataset\Graphe\Dataset_Collaboration_Top_200_Sommets_merged_citation_network.gexf"
 
+    # Ask the user for the network type
+    network_type = input("Type '1' for a citation network, '2' for a collaboration network: ").strip()
+
+    stub_nodes = network_type == '1' and input("Add cited papers missing from the graph as stub nodes? (y/n): ").strip().lower() == 'y'
+
+    if store_path:
+        # Incremental mode: no GEXF reload, the GEXF is only written when asked
+        store = add_records_to_store(store_path, new_records_path, network_type, stub_nodes)
+        if export_path:
+            store.export_gexf(export_path)
+        store.close()
+        return
+
     # Load the existing graph
     graph = load_graph(graph_path)
 
-    # Load new records from JSON file
-    with open(new_records_path, 'r', encoding='utf-8') as file:
-        new_records = json.load(file)
-
-    # Ask the user for the network type
-    network_type = input("Type '1' for a citation network, '2' for a collaboration network: ").strip()
+    # Stream new records from JSON file
+    new_records = iter_records(new_records_path)
 
     # Add new records to the graph
-    add_records_to_graph(graph, new_records, network_type)
+    add_records_to_graph(graph, new_records, network_type, stub_nodes, max_authors, weighting)
 
     # Save the updated graph
     save_graph(graph, updated_graph_path)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Add new records to a citation or collaboration graph.")
+    parser.add_argument('--store', help="Persistent graph store directory (incremental mode, see GrapheIncremental.py)")
+    parser.add_argument('--export-gexf', help="In incremental mode, also export the whole graph to this GEXF file")
+    parser.add_argument('--max-authors', type=int, help="Skip papers with more authors than this (collaboration network)")
+    parser.add_argument('--weighting', choices=['count', 'newman'], default='count',
+                        help="Collaboration weight: number of papers, or 1/(k-1) per paper with k authors")
+    args = parser.parse_args()
+    main(args.store, args.export_gexf, args.max_authors, args.weighting)
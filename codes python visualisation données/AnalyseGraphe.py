@@ -1,109 +1,185 @@
 import os
+import argparse
 import networkx as nx
-import community as community_louvain
+from FormatBinaireGraphe import load_compact
+from ContexteAnalyse import analysis_context
+from PageRankCreux import pagerank, fos_personalization, save_scores, load_start
+from DetectionCommunautes import cached_communities
+from ServiceDistances import DistanceService
+from DiametreApproche import diameter_bounds, distance_statistics
+from CentraliteApprochee import degree_centrality, closeness_centrality, betweenness_centrality, average_clustering, top_k
+from ExecutionParallele import add_workers_argument
 import json
 from networkx.algorithms import community as nx_community
-from networkx.algorithms.centrality import degree_centrality, closeness_centrality, betweenness_centrality
-from networkx.algorithms.link_analysis import pagerank_alg
 from networkx.algorithms.flow import maximum_flow
 from networkx.algorithms.matching import max_weight_matching
-from networkx.algorithms.shortest_paths.dense import floyd_warshall
 from networkx.algorithms.tree import minimum_spanning_tree
 
+# Au-delà de ce nombre de sommets, les centralités sont estimées à partir de sources tirées au hasard
+EXACT_CENTRALITY_LIMIT = 5000
+DEFAULT_SAMPLE_SIZE = 1000
+
 def list_gexf_files(directory):
     """ List all GEXF files in a directory. """
     return [file for file in os.listdir(directory) if file.endswith('.gexf')]
 
 def load_graph(file_path):
-    """ Load a GEXF file into a NetworkX graph. """
-    return nx.read_gexf(file_path)
+    """ Load a GEXF file as a CompactGraph, from its binary snapshot when available.
+
+    The analyses run on the arrays; a NetworkX graph is only built by the analysis context for the
+    few that need it (maximum flow, matching, spanning tree, directed clustering).
+    """
+    return load_compact(file_path)
 
 def save_json(data, file_path):
     """ Save data to a JSON file. """
     with open(file_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=4)
 
-def graph_details(graph):
-    graph_undirected = graph.to_undirected()
-    num_nodes = graph.number_of_nodes()
-    num_edges = graph.number_of_edges()
-    degree_centrality = nx.degree_centrality(graph)
-    betweenness_centrality = nx.betweenness_centrality(graph)
-    closeness_centrality = nx.closeness_centrality(graph)
-    clustering_coefficient = nx.average_clustering(graph_undirected)
-    largest_component = max(nx.connected_components(graph_undirected), key=len)
-    subgraph_largest_component = graph_undirected.subgraph(largest_component)
-    diameter = nx.diameter(subgraph_largest_component)
-    density = nx.density(graph)
+def graph_details(graph, sample_size=None, workers=1, diameter=None):
+    context = analysis_context(graph)
+    compact = context.compact
+    num_nodes = compact.num_nodes
+    num_edges = compact.num_edges
+    centralities = calculate_centralities(graph, sample_size, workers)
+    clustering_coefficient = context.memoize('undirected_clustering', lambda: average_clustering(compact), persist=True)
+    # Diamètre déjà calculé par l'appelant, sinon iFUB sur la plus grande composante
+    diameter = diameter or graph_diameter(graph)
+    # Densité comme nx.density : m / n(n-1), doublée pour un graphe non orienté
+    pairs = num_nodes * (num_nodes - 1)
+    density = (num_edges if compact.directed else 2 * num_edges) / pairs if pairs else 0
 
     return {
         "num_nodes": num_nodes,
         "num_edges": num_edges,
-        "degree_centrality": list(degree_centrality.items())[:5],
-        "betweenness_centrality": list(betweenness_centrality.items())[:5],
-        "closeness_centrality": list(closeness_centrality.items())[:5],
+        "degree_centrality": centralities['degré'][0],
+        "betweenness_centrality": centralities['intermédiarité'][0],
+        "closeness_centrality": centralities['proximité'][0],
         "clustering_coefficient": clustering_coefficient,
-        "diameter": diameter,
+        "diameter": diameter['lower'] if diameter['exact'] else (diameter['lower'], diameter['upper']),
         "density": density
     }
 
-def detect_communities(graph):
-    partition = community_louvain.best_partition(graph)
-    num_communities = len(set(partition.values()))
-    return partition, num_communities
-
-def calculate_centralities(graph):
-    degree = degree_centrality(graph)
-    closeness = closeness_centrality(graph)
-    betweenness = betweenness_centrality(graph)
-    return degree, closeness, betweenness
-
-def display_centralities(graph, centrality_data, centrality_name):
-    top_5 = sorted(centrality_data.items(), key=lambda x: x[1], reverse=True)[:5]
-    print(f"Top 5 des centralités de {centrality_name} :")
-    for node_id, value in top_5:
-        node_label = graph.nodes[node_id].get('name') or graph.nodes[node_id].get('title', 'N/A')
+def detect_communities(graph, resolution=1.0, method='leiden'):
+    """ Communities of the graph ({node: community}, count, info), reused from the cache when already computed. """
+    context = analysis_context(graph)
+    labels, info = context.memoize(f'communities_{method}_{resolution}', lambda: cached_communities(
+        context.compact, resolution=resolution, method=method, weight=context.weight))
+    partition = dict(zip(context.compact.ids, labels.tolist()))
+    return partition, info['communities'], info
+
+def calculate_centralities(graph, sample_size=None, workers=1, top=5):
+    """ Top degree, closeness and betweenness centralities, each as (top list, info).
+
+    Exact up to EXACT_CENTRALITY_LIMIT nodes, estimated from sample_size sources beyond
+    (info then holds the error bound), with the sources split across worker processes.
+    """
+    context = analysis_context(graph)
+    compact = context.compact
+    if sample_size is None and compact.num_nodes > EXACT_CENTRALITY_LIMIT:
+        sample_size = DEFAULT_SAMPLE_SIZE
+    # Vecteurs complets mémorisés : un autre top ou un autre affichage ne relance pas le calcul
+    suffix = 'exact' if sample_size is None else f'k{sample_size}'
+    closeness, closeness_info = context.memoize(f'closeness_{suffix}', lambda: closeness_centrality(compact, sample_size, workers=workers), persist=True)
+    betweenness, betweenness_info = context.memoize(f'betweenness_{suffix}', lambda: betweenness_centrality(compact, sample_size, workers=workers), persist=True)
+    degree = context.memoize('degree_centrality', lambda: degree_centrality(compact))
+    return {
+        'degré': (top_k(compact, degree, top), None),
+        'proximité': (top_k(compact, closeness, top), closeness_info),
+        'intermédiarité': (top_k(compact, betweenness, top), betweenness_info),
+    }
+
+def display_centralities(graph, centrality_data, centrality_name, info=None):
+    print(f"Top {len(centrality_data)} des centralités de {centrality_name} :")
+    compact = analysis_context(graph).compact
+    for node_id, value in centrality_data:
+        attributes = compact.node_attributes(node_id)
+        node_label = attributes.get('name') or attributes.get('title', 'N/A')
         print(f"{node_id} ({node_label}): {value}")
+    if info:
+        if info['error_bound']:
+            print(f"Estimation sur {info['sources']} sources en {info['seconds']:.1f} s, erreur maximale ±{info['error_bound']:.4f} (confiance 95 %)")
+        else:
+            print(f"Calcul exact en {info['seconds']:.1f} s")
 
 
-def calculate_pagerank(graph):
-    return pagerank_alg.pagerank(graph)
+def calculate_pagerank(graph, fos_list=None, cache_path=None, top=5):
+    """ Top PageRank scores, one list per field of study when fos_list is given (personalized PageRank).
 
-def shortest_path(graph, source, target):
-    try:
-        return nx.shortest_path(graph, source=source, target=target)
-    except nx.NetworkXNoPath:
-        return None
+    When cache_path is given, the previous scores saved there warm-start the computation and are replaced.
+    """
+    compact = analysis_context(graph).compact
+    personalization = fos_personalization(compact, fos_list) if fos_list else None
+    start = load_start(cache_path, compact) if cache_path else None
+    if start is not None and start.ndim != (1 if personalization is None else 2):
+        start = None
+    weight = 'weight' if 'weight' in compact.edge_attributes else None
+    scores, info = pagerank(compact, personalization, start=start, weight=weight)
+    if cache_path:
+        save_scores(cache_path, compact, scores)
+    if personalization is None:
+        return {None: top_k(compact, scores, top)}, info
+    return {name: top_k(compact, scores[:, j], top) for j, name in enumerate(fos_list)}, info
+
+def distance_service(graph, index_path):
+    """ Shortest-path service of the graph, with its landmark index loaded from index_path or built once. """
+    context = analysis_context(graph)
+    return context.memoize('distance_service', lambda: DistanceService.load_or_build(context.compact, index_path))
+
+def shortest_path(service, source, target):
+    return service.shortest_path(source, target)
 
 def clustering_coefficient(graph):
-    return nx.average_clustering(graph)
+    """ Average clustering coefficient (directed clustering, through NetworkX, for a directed graph). """
+    context = analysis_context(graph)
+    if context.compact.directed:
+        return context.memoize('clustering', lambda: nx.average_clustering(context.networkx), persist=True)
+    return context.memoize('clustering', lambda: average_clustering(context.compact), persist=True)
+
+def graph_diameter(graph, max_bfs=None, distances=False):
+    """ Diameter of the largest component (edge directions ignored) with iFUB: dict with its bounds, the BFS count and the time.
 
-def graph_diameter(graph):
-    graph_undirected = graph.to_undirected()
-    largest_component = max(nx.connected_components(graph_undirected), key=len)
-    subgraph = graph_undirected.subgraph(largest_component)
-    return nx.diameter(subgraph)
+    With distances=True, the HyperANF average distance and effective diameter are added under 'distances'.
+    """
+    context = analysis_context(graph)
+    adjacency, _ = context.largest_component
+    result = dict(context.memoize(f'diameter_{max_bfs}', lambda: diameter_bounds(adjacency, max_bfs), persist=True))
+    if distances:
+        result['distances'] = context.memoize('distance_statistics', lambda: distance_statistics(adjacency), persist=True)
+    return result
+
+def display_diameter(result):
+    if result['exact']:
+        print(f"Diamètre du graphe : {result['lower']} (exact, {result['bfs']} BFS en {result['seconds']:.2f} s)")
+    else:
+        print(f"Diamètre du graphe : entre {result['lower']} et {result['upper']} ({result['bfs']} BFS en {result['seconds']:.2f} s)")
+    if 'distances' in result:
+        stats = result['distances']
+        print(f"Distance moyenne : {stats['average_distance']:.2f}, diamètre effectif (90 %) : {stats['effective_diameter']:.2f} "
+              f"(HyperANF, erreur relative ±{stats['relative_error']:.1%}, {stats['seconds']:.2f} s)")
 
 def maximum_flow_network(graph, source, target):
-    return maximum_flow(graph, source, target)
+    return maximum_flow(analysis_context(graph).networkx, source, target)
 
 def max_matching(graph):
-    return max_weight_matching(graph, maxcardinality=True)
+    return max_weight_matching(analysis_context(graph).networkx, maxcardinality=True)
 
 def minimum_spanning_tree_network(graph):
-    return minimum_spanning_tree(graph)
+    return minimum_spanning_tree(analysis_context(graph).networkx)
 
-def floyd_warshall_paths(graph):
-    return floyd_warshall(graph)
+def all_pairs_distances(service, output_path):
+    """ Write the matrix of all hop distances (small graphs only); returns the elapsed time. """
+    return service.write_all_pairs(output_path)
 
 def list_node_details(graph, node_id):
     """ List the details of a node with the specified ID. """
-    if node_id in graph.nodes:
-        return dict(graph.nodes[node_id])
+    compact = analysis_context(graph).compact
+    if node_id in compact.index:
+        return compact.node_attributes(node_id)
     else:
         return None
 
-def main():
+def main(sample_size=None, workers=1):
     # Obtenir le chemin du répertoire du script
     current_dir = os.path.dirname(os.path.abspath(__file__))
     source_directory = os.path.join(current_dir, '..', 'Dataset', 'Graphe')
@@ -133,20 +209,22 @@ def main():
         file_path = os.path.join(source_directory, files[file_choice - 1])
         graph = load_graph(file_path)
         base_filename = os.path.splitext(files[file_choice - 1])[0]
+        # Résultats intermédiaires partagés entre les analyses, conservés sur disque par contenu du graphe
+        analysis_context(graph, os.path.join(output_directory, 'cache'))
 
         while True:
             print("\nSélectionnez l'analyse à effectuer (ou entrez 0 pour revenir au choix du fichier, 99 pour quitter) :")
-            print("1. Détection de communautés (Louvain)")
+            print("1. Détection de communautés (Louvain/Leiden)")
             print("2. Calcul des centralités (degré, proximité, intermédiarité)")
             print("3. Calcul du PageRank")
-            print("4. Analyse du chemin le plus court entre deux chercheurs (Dijkstra)")
+            print("4. Analyse du chemin le plus court entre deux chercheurs (BFS bidirectionnel)")
             print("5. Coefficient de clustering")
             print("6. Diamètre du graphe")
             print("7. Flux maximum entre deux nœuds")
             print("8. Détails sur le graphe")
             print("9. Matching maximum")
             print("10. Arbre couvrant minimum")
-            print("11. Plus courts chemins entre toutes les paires de nœuds (Floyd-Warshall)")
+            print("11. Distances entre toutes les paires de nœuds (petits graphes, matrice compressée)")
             print("12. Détails d'un nœud spécifique")
 
             choice = input("Entrez le numéro de l'analyse à effectuer : ").strip()
@@ -158,23 +236,35 @@ def main():
                 return
 
             if choice == '1':
-                partition, num_communities = detect_communities(graph)
-                print(f"Nombre de communautés détectées (Louvain) : {num_communities}")
+                resolution_input = input("Résolution (vide pour 1.0, plus grande pour des communautés plus petites) : ").strip()
+                resolution = float(resolution_input) if resolution_input else 1.0
+                partition, num_communities, info = detect_communities(graph, resolution)
+                print(f"Nombre de communautés détectées (Leiden) : {num_communities}")
+                print(f"Modularité : {info['modularity']:.4f}" + (" (partition en cache)" if info['cached'] else f" ({info['seconds']:.1f} s)"))
                 print(f"Exemple de partitions de communauté : {list(partition.items())[:5]}")
             elif choice == '2':
-                degree, closeness, betweenness = calculate_centralities(graph)
-                display_centralities(graph, degree, "degré")
-                display_centralities(graph, closeness, "proximité")
-                display_centralities(graph, betweenness, "intermédiarité")
-        
+                centralities = calculate_centralities(graph, sample_size, workers)
+                for name, (top, info) in centralities.items():
+                    display_centralities(graph, top, name, info)
+
             elif choice == '3':
-                pagerank = calculate_pagerank(graph)
-                print("Top 5 des scores de PageRank :")
-                print(sorted(pagerank.items(), key=lambda x: x[1], reverse=True)[:5])
+                fos_input = input("Domaines pour un PageRank personnalisé (séparés par des virgules, vide pour le PageRank global) : ").strip()
+                fos_list = [fos.strip() for fos in fos_input.split(',') if fos.strip()]
+                cache_name = f"pagerank_{base_filename}.npz" if not fos_list else f"pagerank_{base_filename}_{'_'.join(fos_list)}.npz"
+                try:
+                    rankings, info = calculate_pagerank(graph, fos_list, os.path.join(output_directory, cache_name))
+                except ValueError as e:
+                    print(f"PageRank personnalisé impossible : {e}")
+                    continue
+                for fos, ranking in rankings.items():
+                    print("Top 5 des scores de PageRank :" if fos is None else f"Top 5 des scores de PageRank ({fos}) :")
+                    print(ranking)
+                print(f"{info['iterations']} itérations en {info['seconds']:.2f} s")
             elif choice == '4':
                 source = input("Entrez l'ID du chercheur source : ")
                 target = input("Entrez l'ID du chercheur cible : ")
-                path = shortest_path(graph, source, target)
+                service = distance_service(graph, os.path.join(output_directory, f"landmarks_{base_filename}.npz"))
+                path = shortest_path(service, source, target)
                 if path:
                     print(f"Le chemin le plus court entre {source} et {target} est : {path}")
                 else:
@@ -183,8 +273,7 @@ def main():
                 coefficient = clustering_coefficient(graph)
                 print(f"Coefficient de clustering moyen : {coefficient}")
             elif choice == '6':
-                diameter = graph_diameter(graph)
-                print(f"Diamètre du graphe : {diameter}")
+                display_diameter(graph_diameter(graph, distances=True))
             elif choice == '7':
                 source = input("Entrez l'ID du nœud source : ")
                 target = input("Entrez l'ID du nœud cible : ")
@@ -192,7 +281,7 @@ def main():
                 print(f"Flux maximum entre {source} et {target} : {flow_value}")
                 print(f"Détails du flux : {flow_dict}")
             elif choice == '8':
-                details = graph_details(graph)
+                details = graph_details(graph, sample_size, workers)
                 print("Détails du graphe :")
                 for key, value in details.items():
                     print(f"{key}: {value}")
@@ -211,12 +300,13 @@ def main():
                 save_json(mst_result, output_path)
                 print(f"Résultats de l'arbre couvrant minimum sauvegardés dans : {output_path}")
             elif choice == '11':
-                paths = floyd_warshall_paths(graph)
-                paths_result = {"paths": dict(paths)}
-                print("Plus courts chemins entre toutes les paires de nœuds :")
-                output_path = os.path.join(output_directory, f"floyd_warshall_{base_filename}.json")
-                save_json(paths_result, output_path)
-                print(f"Résultats des plus courts chemins sauvegardés dans : {output_path}")
+                service = distance_service(graph, os.path.join(output_directory, f"landmarks_{base_filename}.npz"))
+                output_path = os.path.join(output_directory, f"distances_{base_filename}.npy.gz")
+                try:
+                    elapsed = all_pairs_distances(service, output_path)
+                    print(f"Matrice des distances sauvegardée dans : {output_path} ({elapsed:.1f} s)")
+                except ValueError as e:
+                    print(f"{e} Utilisez l'option 4 pour des requêtes de chemin à la demande.")
             elif choice == '12':
                 node_id = input("Entrez l'ID du nœud : ")
                 details = list_node_details(graph, node_id)
@@ -230,5 +320,9 @@ def main():
                 print("Choix invalide. Veuillez sélectionner un numéro valide.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Analyse interactive des graphes GEXF.")
+    parser.add_argument('--sample', type=int, help=f"Nombre de sources tirées pour estimer les centralités (défaut : exact jusqu'à {EXACT_CENTRALITY_LIMIT} sommets, {DEFAULT_SAMPLE_SIZE} au-delà)")
+    add_workers_argument(parser)
+    args = parser.parse_args()
+    main(args.sample, args.workers)
 
@@ -1,9 +1,10 @@
 import os
 import networkx as nx
-import community as community_louvain
+from FormatBinaireGraphe import load_compact
+from AnalyseGraphe import calculate_centralities, display_centralities, calculate_pagerank, detect_communities, graph_diameter, display_diameter
+from AnalyseGraphe import graph_details, clustering_coefficient
+from ContexteAnalyse import analysis_context
 from networkx.algorithms import community as nx_community
-from networkx.algorithms.centrality import degree_centrality, closeness_centrality, betweenness_centrality
-from networkx.algorithms.link_analysis import pagerank_alg
 from networkx.algorithms.flow import maximum_flow
 from networkx.algorithms.matching import max_weight_matching
 from networkx.algorithms.shortest_paths.dense import floyd_warshall
@@ -14,63 +15,19 @@ def list_gexf_files(directory):
     return [file for file in os.listdir(directory) if file.endswith('.gexf')]
 
 def load_graph(file_path):
-    """ Load a GEXF file into a NetworkX graph. """
-    return nx.read_gexf(file_path)
-
-def graph_details(graph):
-    graph_undirected = graph.to_undirected()
-    num_nodes = graph.number_of_nodes()
-    num_edges = graph.number_of_edges()
-    degree_centrality = nx.degree_centrality(graph)
-    betweenness_centrality = nx.betweenness_centrality(graph)
-    closeness_centrality = nx.closeness_centrality(graph)
-    clustering_coefficient = nx.average_clustering(graph_undirected)
-    largest_component = max(nx.connected_components(graph_undirected), key=len)
-    subgraph_largest_component = graph_undirected.subgraph(largest_component)
-    diameter = nx.diameter(subgraph_largest_component)
-    density = nx.density(graph)
-
-    return {
-        "num_nodes": num_nodes,
-        "num_edges": num_edges,
-        "degree_centrality": list(degree_centrality.items())[:5],
-        "betweenness_centrality": list(betweenness_centrality.items())[:5],
-        "closeness_centrality": list(closeness_centrality.items())[:5],
-        "clustering_coefficient": clustering_coefficient,
-        "diameter": diameter,
-        "density": density
-    }
-
-def detect_communities(graph):
-    partition = community_louvain.best_partition(graph)
-    num_communities = len(set(partition.values()))
-    return partition, num_communities
-
-def calculate_centralities(graph):
-    degree = degree_centrality(graph)
-    closeness = closeness_centrality(graph)
-    betweenness = betweenness_centrality(graph)
-    return degree, closeness, betweenness
-
-def calculate_pagerank(graph):
-    return pagerank_alg.pagerank(graph)
-
-def clustering_coefficient(graph):
-    return nx.average_clustering(graph)
-
-def graph_diameter(graph):
-    largest_component = max(nx.connected_components(graph), key=len)
-    subgraph = graph.subgraph(largest_component)
-    return nx.diameter(subgraph)
+    """ Load a GEXF file as a CompactGraph, from its binary snapshot when available (NetworkX is built only for matching and spanning tree). """
+    return load_compact(file_path)
 
 def max_matching(graph):
-    return max_weight_matching(graph, maxcardinality=True)
+    return max_weight_matching(analysis_context(graph).networkx, maxcardinality=True)
 
 def minimum_spanning_tree_network(graph):
-    return minimum_spanning_tree(graph)
+    return minimum_spanning_tree(analysis_context(graph).networkx)
 
 def main():
-    source_directory = r"C:\Users\Kenzi\Documents\MIASHS\L3 MIAGE\Nanterre\Semestre 6\GRAPHES ET OPEN DATA\projet\Dataset\Graphe"
+    # Obtenir le chemin du répertoire du script
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    source_directory = os.path.join(current_dir, '..', 'Dataset', 'Graphe')
     files = list_gexf_files(source_directory)
 
     while True:
@@ -94,38 +51,36 @@ def main():
 
         file_path = os.path.join(source_directory, files[file_choice - 1])
         graph = load_graph(file_path)
+        # Centralités, composantes et diamètre calculés une fois, puis repris par graph_details
+        analysis_context(graph, os.path.join(current_dir, 'output', 'cache'))
 
         print(f"Analyse automatique du fichier : {file_path}")
 
-        # 1. Détection de communautés (Louvain)
-        #partition, num_communities = detect_communities(graph)
-        #print(f"Nombre de communautés détectées (Louvain) : {num_communities}")
-        #print(f"Exemple de partitions de communauté : {list(partition.items())[:5]}")
+        # 1. Détection de communautés (Leiden, partition réutilisée depuis le cache)
+        partition, num_communities, info = detect_communities(graph)
+        print(f"Nombre de communautés détectées (Leiden) : {num_communities}, modularité {info['modularity']:.4f}")
+        print(f"Exemple de partitions de communauté : {list(partition.items())[:5]}")
 
         # 2. Calcul des centralités (degré, proximité, intermédiarité)
-        degree, closeness, betweenness = calculate_centralities(graph)
-        print("Top 5 des centralités de degré :")
-        print(sorted(degree.items(), key=lambda x: x[1], reverse=True)[:5])
-        print("Top 5 des centralités de proximité :")
-        print(sorted(closeness.items(), key=lambda x: x[1], reverse=True)[:5])
-        print("Top 5 des centralités d'intermédiarité :")
-        print(sorted(betweenness.items(), key=lambda x: x[1], reverse=True)[:5])
+        centralities = calculate_centralities(graph)
+        for name, (top, info) in centralities.items():
+            display_centralities(graph, top, name, info)
 
         # 3. Calcul du PageRank
-        pagerank = calculate_pagerank(graph)
+        rankings, _ = calculate_pagerank(graph)
         print("Top 5 des scores de PageRank :")
-        print(sorted(pagerank.items(), key=lambda x: x[1], reverse=True)[:5])
+        print(rankings[None])
 
         # 5. Coefficient de clustering
         coefficient = clustering_coefficient(graph)
         print(f"Coefficient de clustering moyen : {coefficient}")
 
         # 6. Diamètre du graphe
-        diameter = graph_diameter(graph)
-        print(f"Diamètre du graphe : {diameter}")
+        diameter = graph_diameter(graph, distances=True)
+        display_diameter(diameter)
 
         # 8. Détails sur le graphe
-        details = graph_details(graph)
+        details = graph_details(graph, diameter=diameter)
         print("Détails du graphe :")
         for key, value in details.items():
             print(f"{key}: {value}")
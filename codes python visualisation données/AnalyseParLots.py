@@ -0,0 +1,241 @@
+import os
+import sys
+import json
+import glob
+import time
+import hashlib
+import argparse
+import traceback
+import multiprocessing
+from datetime import datetime
+from ExecutionParallele import add_workers_argument
+
+# Métriques disponibles pour les tâches (graphe, métrique)
+METRICS = ['details', 'centralities', 'pagerank', 'communities', 'clustering', 'diameter', 'distances']
+
+DEFAULT_CONFIG = {
+    'graphs': ['*.gexf'],
+    'metrics': METRICS,
+    'options': {},
+    'timeout': 3600,
+    'memory_limit_mb': None,
+    'output': os.path.join('output', 'resultats_analyses.json'),
+}
+
+def load_config(config_path=None):
+    """ Batch configuration: defaults, overridden by the keys of a JSON file.
+
+    Example: {"graphs": ["*_citation_network.gexf"], "metrics": ["pagerank", "diameter"],
+    "options": {"centralities": {"sample_size": 500}}, "timeout": 600, "memory_limit_mb": 8192,
+    "output": "output/resultats_analyses.parquet"}. Graph patterns are relative to Dataset/Graphe.
+    """
+    config = dict(DEFAULT_CONFIG)
+    if config_path:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    unknown = [metric for metric in config['metrics'] if metric not in METRICS]
+    if unknown:
+        raise ValueError(f"Métriques inconnues : {', '.join(unknown)} (disponibles : {', '.join(METRICS)})")
+    return config
+
+def resolve_graphs(patterns, graph_directory):
+    """ GEXF files matching the patterns (relative to graph_directory unless absolute), without duplicates. """
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern if os.path.isabs(pattern) else os.path.join(graph_directory, pattern))))
+    return list(dict.fromkeys(os.path.abspath(path) for path in paths))
+
+def file_hash(path, state):
+    """ SHA-256 of a file, recomputed only when its size or modification time changed since the last run. """
+    stat = os.stat(path)
+    known = state.get(path)
+    if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+        return known['sha256']
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    state[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+    return state[path]['sha256']
+
+def job_key(input_hash, metric, options):
+    return hashlib.sha256(json.dumps([input_hash, metric, options], sort_keys=True).encode('utf-8')).hexdigest()
+
+def compute_metric(graph_path, metric, options, cache_directory):
+    """ Run one metric on one graph and return a JSON-serializable result. """
+    import AnalyseGraphe as analyse
+    from ContexteAnalyse import analysis_context
+    graph = analyse.load_graph(graph_path)
+    # Les tâches d'un même graphe partagent les résultats intermédiaires par le cache sur disque
+    analysis_context(graph, cache_directory)
+    if metric == 'details':
+        return analyse.graph_details(graph, **options)
+    if metric == 'centralities':
+        return {name: {'top': top, 'info': info} for name, (top, info) in analyse.calculate_centralities(graph, **options).items()}
+    if metric == 'pagerank':
+        rankings, info = analyse.calculate_pagerank(graph, **options)
+        return {'top': {str(fos) if fos else 'global': ranking for fos, ranking in rankings.items()}, 'info': info}
+    if metric == 'communities':
+        _, num_communities, info = analyse.detect_communities(graph, **options)
+        return info
+    if metric == 'clustering':
+        return analyse.clustering_coefficient(graph)
+    if metric == 'diameter':
+        return analyse.graph_diameter(graph, **options)
+    return analyse.graph_diameter(graph, distances=True, **options)['distances']
+
+def _run_job(connection, graph_path, metric, options, cache_directory, memory_limit_mb):
+    """ Body of a job process: applies the memory limit, runs the metric and sends back (status, result). """
+    try:
+        if memory_limit_mb:
+            try:
+                import resource
+                limit = int(memory_limit_mb) * 2**20
+                resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+            except (ImportError, ValueError, OSError) as e:
+                print(f"Limite mémoire non appliquée ({e}).", file=sys.stderr)
+        result = compute_metric(graph_path, metric, options, cache_directory)
+        connection.send(('ok', json.loads(json.dumps(result, default=str))))
+    except MemoryError:
+        connection.send(('memory', f"Limite mémoire de {memory_limit_mb} Mo dépassée"))
+    except Exception as e:
+        connection.send(('error', f"{e}\n{traceback.format_exc()}"))
+    finally:
+        connection.close()
+
+def _receive(receiver):
+    """ (status, result) sent by a job process, or (None, None) when nothing can be read yet. """
+    if receiver.poll():
+        try:
+            return receiver.recv()
+        except EOFError:
+            pass
+    return None, None
+
+def run_jobs(jobs, workers, timeout, memory_limit_mb, cache_directory):
+    """ Run (graph, metric, options) jobs, each in its own process, at most `workers` at a time.
+
+    A job exceeding `timeout` seconds is terminated; a job process killed by the system (e.g. out of
+    memory) is reported as failed without stopping the others. Yields one result row per job.
+    """
+    pending = list(jobs)
+    running = {}
+    while pending or running:
+        while pending and len(running) < workers:
+            job = pending.pop(0)
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_run_job, args=(sender, job['graph'], job['metric'], job['options'], cache_directory, memory_limit_mb))
+            process.start()
+            sender.close()
+            running[process] = (job, receiver, time.time())
+            print(f"Lancement : {os.path.basename(job['graph'])} / {job['metric']}")
+
+        for process, (job, receiver, started) in list(running.items()):
+            elapsed = time.time() - started
+            status, result = _receive(receiver)
+            if status is None and not process.is_alive():
+                # Le résultat a pu arriver entre poll() et is_alive() : relecture avant de conclure à un arrêt
+                status, result = _receive(receiver)
+                if status is None:
+                    status, result = 'error', f"Processus arrêté (code {process.exitcode}), probablement par manque de mémoire"
+            if status is None and timeout and elapsed > timeout:
+                process.terminate()
+                status, result = 'timeout', f"Délai de {timeout} s dépassé"
+            if status is None:
+                continue
+            process.join()
+            receiver.close()
+            del running[process]
+            print(f"{status.upper()} : {os.path.basename(job['graph'])} / {job['metric']} ({elapsed:.1f} s)")
+            yield dict(job, status=status, result=result if status == 'ok' else None,
+                       error=None if status == 'ok' else result, seconds=round(elapsed, 3),
+                       finished_at=datetime.now().isoformat(timespec='seconds'))
+        time.sleep(0.1)
+
+def read_results(output_path):
+    """ Rows of a previous results table (JSON or Parquet), empty when there is none. """
+    if not os.path.exists(output_path):
+        return []
+    if output_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        rows = pq.read_table(output_path).to_pylist()
+        for row in rows:
+            row['options'] = json.loads(row['options'])
+            row['result'] = json.loads(row['result']) if row['result'] is not None else None
+        return rows
+    with open(output_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def write_results(rows, output_path):
+    """ Results table: JSON list, or Parquet (results and options as JSON strings) when the path ends in .parquet. """
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    temporary_path = output_path + '.tmp'
+    if output_path.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pylist([dict(row, options=json.dumps(row['options']),
+                                           result=None if row['result'] is None else json.dumps(row['result'])) for row in rows])
+        pq.write_table(table, temporary_path)
+    else:
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=4, ensure_ascii=False)
+    os.replace(temporary_path, output_path)
+
+def run_batch(config, workers, force=False):
+    """ Build the (graph, metric) jobs, skip those whose inputs did not change, run the others and write the table. """
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    graph_directory = os.path.join(current_dir, '..', 'Dataset', 'Graphe')
+    output_path = config['output'] if os.path.isabs(config['output']) else os.path.join(current_dir, config['output'])
+    cache_directory = os.path.join(current_dir, 'output', 'cache')
+    state_path = os.path.join(current_dir, 'output', 'etat_analyses.json')
+
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    previous = {row['key']: row for row in read_results(output_path) if row.get('status') == 'ok'}
+
+    rows, jobs = [], []
+    for graph_path in resolve_graphs(config['graphs'], graph_directory):
+        input_hash = file_hash(graph_path, state)
+        for metric in config['metrics']:
+            options = config['options'].get(metric, {})
+            key = job_key(input_hash, metric, options)
+            if key in previous and not force:
+                rows.append(previous[key])
+            else:
+                jobs.append({'key': key, 'graph': graph_path, 'metric': metric, 'options': options, 'input_hash': input_hash})
+    print(f"{len(jobs)} tâches à exécuter, {len(rows)} inchangées depuis la dernière exécution.")
+
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=4)
+    from FormatBinaireGraphe import has_fresh_snapshot, load_compact
+    # Instantanés binaires écrits ici, un graphe à la fois : les tâches parallèles d'un même graphe ne font que les lire
+    for graph_path in dict.fromkeys(job['graph'] for job in jobs):
+        if not has_fresh_snapshot(graph_path):
+            load_compact(graph_path)
+    for row in run_jobs(jobs, workers, config['timeout'], config['memory_limit_mb'], cache_directory):
+        rows.append(row)
+        # Table réécrite après chaque tâche : un arrêt en cours de nuit garde les résultats obtenus
+        write_results(rows, output_path)
+    write_results(rows, output_path)
+    failed = [row for row in rows if row['status'] != 'ok']
+    print(f"Résultats écrits dans {output_path} ({len(rows) - len(failed)} réussies, {len(failed)} en échec).")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse non interactive de tous les graphes GEXF : une tâche par (graphe, métrique).")
+    parser.add_argument('config', nargs='?', help="Fichier de configuration JSON (graphes, métriques, options, délai, limite mémoire, sortie)")
+    parser.add_argument('--graphs', nargs='+', help="Motifs des fichiers GEXF (remplace ceux de la configuration)")
+    parser.add_argument('--metrics', nargs='+', choices=METRICS, help="Métriques à calculer (remplace celles de la configuration)")
+    parser.add_argument('--output', help="Table de résultats (.json ou .parquet)")
+    parser.add_argument('--force', action='store_true', help="Relancer aussi les tâches dont les entrées n'ont pas changé")
+    add_workers_argument(parser)
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    for key in ('graphs', 'metrics', 'output'):
+        if getattr(args, key):
+            config[key] = getattr(args, key)
+    run_batch(config, args.workers, args.force)
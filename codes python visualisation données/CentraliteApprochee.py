@@ -0,0 +1,169 @@
+import math
+import time
+import numpy as np
+from ExecutionParallele import run_sharded, report_failures
+
+# Matrice d'adjacence partagée par les processus de calcul (initialisée une fois par processus)
+_ADJACENCY = None
+
+def _init_worker(adjacency):
+    global _ADJACENCY
+    _ADJACENCY = (adjacency, adjacency.T.tocsr())
+
+def _bfs_batch(adjacency, adjacency_t, sources):
+    """ Level-synchronous BFS from a batch of sources at once (one column per source).
+
+    Returns dist (-1 when unreachable) and sigma, the number of shortest paths from each source.
+    """
+    n = adjacency.shape[0]
+    columns = np.arange(len(sources))
+    dist = np.full((n, len(sources)), -1, dtype=np.int32)
+    sigma = np.zeros((n, len(sources)), dtype=np.float64)
+    dist[sources, columns] = 0
+    sigma[sources, columns] = 1.0
+    frontier = sigma.copy()
+    level = 0
+    while True:
+        # Nombre de plus courts chemins arrivant sur chaque sommet depuis le niveau courant
+        reached = adjacency_t @ frontier
+        new = (reached > 0) & (dist < 0)
+        if not new.any():
+            break
+        level += 1
+        dist[new] = level
+        sigma[new] = reached[new]
+        frontier = np.where(new, sigma, 0.0)
+    return dist, sigma, level
+
+def _betweenness_batch(sources):
+    """ Brandes dependencies accumulated over a batch of sources, vectorized level by level. """
+    adjacency, adjacency_t = _ADJACENCY
+    dist, sigma, max_level = _bfs_batch(adjacency, adjacency_t, sources)
+    delta = np.zeros_like(sigma)
+    for level in range(max_level, 0, -1):
+        at_level = dist == level
+        coefficient = np.where(at_level, (1.0 + delta) / np.where(at_level, sigma, 1.0), 0.0)
+        contribution = adjacency @ coefficient
+        previous = dist == level - 1
+        delta[previous] += sigma[previous] * contribution[previous]
+    delta[sources, np.arange(len(sources))] = 0.0
+    return delta.sum(axis=1)
+
+def _distance_batch(sources):
+    """ For every node: sum of distances, number of sources reaching it and sum of inverse distances. """
+    adjacency, adjacency_t = _ADJACENCY
+    dist, _, _ = _bfs_batch(adjacency, adjacency_t, sources)
+    reached = dist > 0
+    inverse = np.zeros(dist.shape, dtype=np.float64)
+    np.divide(1.0, dist, out=inverse, where=reached)
+    return np.where(reached, dist, 0).sum(axis=1), reached.sum(axis=1), inverse.sum(axis=1), int(dist.max(initial=0))
+
+def sample_sources(num_nodes, k=None, seed=None):
+    """ All nodes (exact computation) when k is None or >= num_nodes, k random pivots otherwise. """
+    if k is None or k >= num_nodes:
+        return np.arange(num_nodes)
+    return np.sort(np.random.default_rng(seed).choice(num_nodes, size=k, replace=False))
+
+def hoeffding_bound(num_nodes, k, confidence=0.95):
+    """ Additive error bound valid for all nodes at once (union bound) on a mean of k samples in [0, 1]. """
+    if k >= num_nodes:
+        return 0.0
+    return math.sqrt(math.log(2 * num_nodes / (1 - confidence)) / (2 * k))
+
+def _run_batches(func, adjacency, sources, workers, batch_size, desc):
+    batches = [sources[i:i + batch_size] for i in range(0, len(sources), batch_size)]
+    results, failures = run_sharded(func, batches, workers, desc=desc, unit="lot",
+                                    initializer=_init_worker, initargs=(adjacency,))
+    report_failures(failures)
+    if failures:
+        raise RuntimeError(f"{len(failures)} lots de sources n'ont pas pu être calculés.")
+    return results
+
+def degree_centrality(graph):
+    """ Degree centrality of every node, as in NetworkX. """
+    n = graph.num_nodes
+    return graph.degree() / (n - 1) if n > 1 else np.ones(n)
+
+def average_clustering(graph, chunk_size=4096):
+    """ Average clustering coefficient of the undirected simple graph (edge directions and loops ignored), as in NetworkX.
+
+    Triangles are counted with sparse products over blocks of chunk_size rows, so memory stays bounded.
+    """
+    adjacency = graph.to_csr()
+    if graph.directed:
+        adjacency = (adjacency + adjacency.T).tocsr()
+    adjacency = adjacency.astype(bool).astype(np.float64).tocsr()
+    adjacency.setdiag(0)
+    adjacency.eliminate_zeros()
+    n = adjacency.shape[0]
+    if n == 0:
+        return 0.0
+    degree = np.diff(adjacency.indptr).astype(np.float64)
+    triangles = np.zeros(n)
+    for first in range(0, n, chunk_size):
+        rows = adjacency[first:first + chunk_size]
+        # Chemins de longueur 2 qui se referment sur une arête : deux fois le nombre de triangles
+        triangles[first:first + rows.shape[0]] = np.asarray((rows @ adjacency).multiply(rows).sum(axis=1)).ravel()
+    coefficients = np.zeros(n)
+    np.divide(triangles, degree * (degree - 1), out=coefficients, where=degree > 1)
+    return float(coefficients.mean())
+
+def betweenness_centrality(graph, k=None, workers=1, batch_size=8, seed=None, confidence=0.95):
+    """ Betweenness centrality (normalized like NetworkX) estimated from k pivot sources.
+
+    Returns (scores, info) where info holds the number of sources, the elapsed time and an
+    additive error bound holding for every node with the given confidence (0 when exact).
+    """
+    start = time.time()
+    n = graph.num_nodes
+    sources = sample_sources(n, k, seed)
+    scores = np.zeros(n)
+    if n > 2 and len(sources):
+        for partial in _run_batches(_betweenness_batch, graph.to_csr(), sources, workers, batch_size, "Intermédiarité"):
+            scores += partial
+        scores *= n / len(sources) / ((n - 1) * (n - 2))
+    return scores, {'sources': len(sources), 'seconds': time.time() - start, 'error_bound': hoeffding_bound(n, len(sources), confidence)}
+
+def closeness_centrality(graph, k=None, harmonic=False, workers=1, batch_size=8, seed=None, confidence=0.95):
+    """ Closeness (Wasserman-Faust, like NetworkX) or harmonic centrality estimated from k sources.
+
+    Distances are measured towards each node (incoming distances for directed graphs) and the
+    harmonic centrality is not normalized, as in NetworkX. The error bound applies to the harmonic
+    centrality divided by n - 1, or to the average distance for the classic closeness.
+    """
+    start = time.time()
+    n = graph.num_nodes
+    sources = sample_sources(n, k, seed)
+    distance_sum = np.zeros(n)
+    reached = np.zeros(n)
+    inverse_sum = np.zeros(n)
+    max_distance = 0
+    if len(sources):
+        for partial in _run_batches(_distance_batch, graph.to_csr(), sources, workers, batch_size, "Proximité"):
+            distance_sum += partial[0]
+            reached += partial[1]
+            inverse_sum += partial[2]
+            max_distance = max(max_distance, partial[3])
+
+    # Un sommet tiré comme source ne compte pas dans sa propre estimation
+    samples = np.full(n, float(len(sources)))
+    samples[sources] -= 1
+    samples = np.maximum(samples, 1)
+    if harmonic:
+        scores = inverse_sum * (n - 1) / samples
+    else:
+        scores = np.zeros(n)
+        np.divide(reached / samples * reached, distance_sum, out=scores, where=distance_sum > 0)
+    bound = hoeffding_bound(n, len(sources), confidence)
+    info = {'sources': len(sources), 'seconds': time.time() - start,
+            'error_bound': bound if harmonic else bound * max_distance}
+    return scores, info
+
+def top_k(graph, scores, k=5):
+    """ The k best (node_id, score) pairs, selected with argpartition instead of a full sort. """
+    k = min(k, len(scores))
+    if k == 0:
+        return []
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best], kind='stable')]
+    return [(graph.ids[i], float(scores[i])) for i in best]
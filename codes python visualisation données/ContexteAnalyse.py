@@ -0,0 +1,144 @@
+import os
+import json
+import weakref
+import numpy as np
+from GrapheCompact import CompactGraph
+from FormatBinaireGraphe import from_networkx
+from DetectionCommunautes import graph_fingerprint
+
+# Un contexte par graphe chargé (CompactGraph ou NetworkX), libéré avec le graphe
+_CONTEXTS = weakref.WeakKeyDictionary()
+
+class AnalysisContext:
+    """ Derived structures of one graph (CompactGraph or NetworkX), computed once and shared by every analysis.
+
+    Values are memoized by key (NetworkX graph, largest component, centrality vectors,
+    partitions...). A CompactGraph (e.g. from load_compact) is used as is by the array-based engines,
+    and turned into NetworkX only for the analyses that need it. Values are keyed by the content hash
+    of the graph (graph_fingerprint: ids, edges, weights): they are dropped when a NetworkX graph is
+    modified, even if its node and edge counts stay the same, or explicitly with invalidate() after
+    an attribute-only change. With a cache directory, values that can be persisted are also written
+    under a folder named after this hash.
+    """
+
+    def __init__(self, graph, cache_directory=None):
+        self.graph = graph
+        self.cache_directory = cache_directory
+        self._values = {}
+        self._signature = None
+        self._check()
+
+    def invalidate(self):
+        """ Forget every memoized value (persisted values are keyed by content and stay valid). """
+        self._values.clear()
+        self._signature = None
+        self._check()
+
+    def _check(self):
+        if isinstance(self.graph, CompactGraph):
+            # Un CompactGraph n'est pas modifié en place : son empreinte est calculée une fois
+            if self._signature is None:
+                self._signature = graph_fingerprint(self.graph, _weight_column(self.graph))
+            return
+        # Graphe NetworkX : reconverti à chaque vérification, pour voir aussi une arête remplacée par une autre
+        compact = from_networkx(self.graph)
+        signature = graph_fingerprint(compact, _weight_column(compact))
+        if signature != self._signature:
+            self._values.clear()
+            self._values['compact'] = compact
+            self._signature = signature
+
+    def _persisted_path(self, key):
+        if not self.cache_directory:
+            return None
+        directory = os.path.join(self.cache_directory, self.fingerprint)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, key)
+
+    def memoize(self, key, compute, persist=False):
+        """ Value of compute() for key, computed at most once per graph version.
+
+        With persist=True and a cache directory, a value made of JSON data, a NumPy array or an
+        (array, JSON data) pair is also read from and written to disk.
+        """
+        self._check()
+        if key in self._values:
+            return self._values[key]
+        path = self._persisted_path(key) if persist else None
+        value = _load(path) if path else None
+        if value is None:
+            value = compute()
+            if path:
+                _save(path, value)
+        self._values[key] = value
+        return value
+
+    @property
+    def fingerprint(self):
+        self._check()
+        return self._signature
+
+    @property
+    def compact(self):
+        """ CompactGraph with CSR adjacency (the graph itself, or indexed like graph.nodes() for NetworkX). """
+        if isinstance(self.graph, CompactGraph):
+            return self.graph
+        self._check()
+        return self._values['compact']
+
+    @property
+    def networkx(self):
+        """ NetworkX graph, built on first use for the analyses without an array-based engine. """
+        if not isinstance(self.graph, CompactGraph):
+            return self.graph
+        return self.memoize('networkx', self.graph.to_networkx)
+
+    @property
+    def largest_component(self):
+        """ (symmetric CSR adjacency, node indices) of the largest connected component. """
+        from DiametreApproche import largest_component
+        return self.memoize('largest_component', lambda: largest_component(self.compact))
+
+    @property
+    def weight(self):
+        """ Name of the edge weight column, None for an unweighted graph. """
+        return _weight_column(self.compact)
+
+def _weight_column(compact):
+    return 'weight' if 'weight' in compact.edge_attributes else None
+
+def _load(path):
+    if os.path.exists(path + '.json'):
+        with open(path + '.json', 'r', encoding='utf-8') as f:
+            return json.load(f)
+    if os.path.exists(path + '.npz'):
+        with np.load(path + '.npz') as saved:
+            return saved['value'], json.loads(saved['info'].item())
+    if os.path.exists(path + '.npy'):
+        return np.load(path + '.npy')
+    return None
+
+def _write_atomic(file_path, mode, write):
+    # Fichier temporaire propre au processus, puis renommage : des tâches parallèles peuvent écrire
+    # la même clé, et un lecteur ne voit jamais un fichier à moitié écrit
+    temporary_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(temporary_path, mode, encoding=None if 'b' in mode else 'utf-8') as f:
+        write(f)
+    os.replace(temporary_path, file_path)
+
+def _save(path, value):
+    if isinstance(value, np.ndarray):
+        _write_atomic(path + '.npy', 'wb', lambda f: np.save(f, value))
+    elif isinstance(value, tuple) and len(value) == 2 and isinstance(value[0], np.ndarray):
+        _write_atomic(path + '.npz', 'wb', lambda f: np.savez(f, value=value[0], info=np.array(json.dumps(value[1]))))
+    else:
+        _write_atomic(path + '.json', 'w', lambda f: json.dump(value, f, indent=4))
+
+def analysis_context(graph, cache_directory=None):
+    """ The shared context of a graph (created on first use); a cache directory given here is kept. """
+    context = _CONTEXTS.get(graph)
+    if context is None:
+        context = _CONTEXTS[graph] = AnalysisContext(graph, cache_directory)
+    elif cache_directory:
+        context.cache_directory = cache_directory
+    return context
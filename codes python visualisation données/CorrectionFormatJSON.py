@@ -1,38 +1,173 @@
 import os
+import json
+import mmap
+import argparse
+import numpy as np
+from tqdm import tqdm
+from ExecutionParallele import add_workers_argument, run_sharded, report_failures
+from IndexEnregistrements import iter_record_offsets, record_level
+from LireEnregistrements import NUMBER_INT_PATTERN
 
-def check_and_fix_json(file_path):
-    needs_bracket_open = False
-    needs_bracket_close = False
-
-    with open(file_path, 'r', encoding='utf-8') as file:
-        first_line = file.readline().strip()
-        if not first_line.startswith('['):
-            needs_bracket_open = True
-
-    with open(file_path, 'r+', encoding='utf-8') as file:
-        file.seek(0, os.SEEK_END)
-        file.seek(file.tell() - 1024, os.SEEK_SET)  # Reculer de 1024 bytes pour être sûr de capturer la dernière ligne
-        last_lines = file.readlines()
-        last_line = last_lines[-1].strip() if last_lines else ''
-        if not last_line.endswith(']'):
-            needs_bracket_close = True
-
-    # Réécrire le fichier si nécessaire
-    if needs_bracket_open or needs_bracket_close:
-        with open(file_path, 'r+', encoding='utf-8') as file:
-            content = file.read()
-            if needs_bracket_open:
-                content = '[' + content.lstrip()
-            if needs_bracket_close:
-                content = content.rstrip() + ']'
-            file.seek(0)
-            file.write(content)
-            file.truncate()  # Tronquer le fichier pour supprimer l'ancien contenu si la nouvelle longueur est inférieure
-        print(f"Le fichier {os.path.basename(file_path)} a été mis à jour.")
+# Au-delà, ce qui suit le dernier enregistrement ne peut pas être une simple fermeture de tableau
+MAX_TAIL = 2**20
+
+def validate_json(file_path, parse_records=True, block_size=2**20):
+    """ Check the structure of a JSON array / JSON lines file in one streaming pass, with constant memory.
+
+    Returns a report: number of records, whether the file is an array missing its '[' (records at
+    top level separated by commas), missing its ']' or ending with a trailing comma, the byte
+    offset where the content ends, and the (offset, message) of the first bad record or separator.
+    With parse_records, every record is also decoded to catch malformed content; the file is read
+    by blocks of block_size bytes, each decoded at once while it is valid.
+    """
+    report = {'records': 0, 'missing_open': False, 'missing_close': False, 'trailing_comma': False,
+              'content_start': None, 'content_end': 0, 'error': None}
+    if os.path.getsize(file_path) == 0:
+        report['missing_open'] = report['missing_close'] = True
+        return report
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        data = np.frombuffer(mapped, dtype=np.uint8)
+        level = record_level(data)
+        previous_end, separator = None, None
+
+        def decode(content):
+            return json.loads(NUMBER_INT_PATTERN.sub(rb'\1', content) if b'NumberInt(' in content else content)
+
+        def check_records(starts, ends):
+            """ Record by record check of a block, to find the first bad record or separator. """
+            nonlocal previous_end, separator
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                gap = mapped[previous_end if previous_end is not None else 0:start].strip()
+                if previous_end is None:
+                    valid_gap = gap == (b'[' if level else b'')
+                elif level:
+                    valid_gap = gap == b','
+                else:
+                    # Premier niveau : JSON lines (rien entre les objets) ou tableau sans '[' (virgules), sans mélange
+                    separator = gap if separator is None else separator
+                    valid_gap = gap == separator and gap in (b'', b',')
+                if not valid_gap:
+                    report['error'] = (previous_end or 0, f"Contenu inattendu avant l'enregistrement à l'octet {start} : {gap[:40]!r}")
+                    return
+                if end < 0:
+                    report['error'] = (start, "Enregistrement tronqué en fin de fichier")
+                    return
+                if parse_records:
+                    try:
+                        decode(mapped[start:end])
+                    except ValueError as e:
+                        report['error'] = (start, f"Enregistrement invalide : {e}")
+                        return
+                if report['content_start'] is None:
+                    report['content_start'] = start
+                report['records'] += 1
+                previous_end = report['content_end'] = end
+
+        with tqdm(total=len(data), desc=f"Vérification de {os.path.basename(file_path)}", unit="o", unit_scale=True, leave=False) as progress:
+            for starts, ends in iter_record_offsets(data, block_size, progress):
+                if not len(starts):
+                    continue
+                # Cas courant : les enregistrements du bloc et leurs virgules forment un tableau, décodé en un seul appel
+                if previous_end is not None and ends[-1] >= 0 and (level or separator == b','):
+                    gap = mapped[previous_end:int(starts[0])].strip()
+                    try:
+                        if gap == b',' and (not parse_records or len(decode(b'[' + mapped[int(starts[0]):int(ends[-1])] + b']')) == len(starts)):
+                            report['records'] += len(starts)
+                            previous_end = report['content_end'] = int(ends[-1])
+                            continue
+                    except ValueError:
+                        pass
+                check_records(starts, ends)
+                if report['error']:
+                    break
+        del data
+        if report['error']:
+            return report
+
+        if report['records'] == 0:
+            head = mapped[:MAX_TAIL].strip()
+            report['content_end'] = 0
+            if head.startswith(b'['):
+                report['content_end'] = mapped.find(b'[') + 1
+            report['missing_open'] = not head.startswith(b'[')
+            report['missing_close'] = not head.endswith(b']')
+            if head not in (b'', b'[', b'[]', b']'):
+                report['error'] = (0, f"Contenu inattendu sans enregistrement : {head[:40]!r}")
+            return report
+        if len(mapped) - report['content_end'] > MAX_TAIL:
+            report['error'] = (report['content_end'], "Contenu inattendu après le dernier enregistrement")
+            return report
+        tail = mapped[report['content_end']:].strip()
+    report['trailing_comma'] = tail.startswith(b',')
+    tail = tail[1:].strip() if report['trailing_comma'] else tail
+    if level:
+        report['missing_close'] = tail == b''
+        valid = tail in (b'', b']')
     else:
-        print(f"Le fichier {os.path.basename(file_path)} est déjà correct.")
+        # Objets séparés par des virgules au premier niveau : tableau sans '['
+        report['missing_open'] = separator == b',' or tail == b']' or report['trailing_comma']
+        report['missing_close'] = report['missing_open'] and tail == b''
+        valid = tail in (b'', b']')
+        if valid and separator == b'' and report['missing_open']:
+            # JSON lines suivies de ']' ou d'une virgule : les entourer de crochets donnerait un tableau sans virgules
+            report['error'] = (report['content_end'], "Enregistrements sans virgules (JSON lines) suivis d'une fin de tableau")
+            return report
+    if not valid:
+        report['error'] = (report['content_end'], f"Contenu inattendu après le dernier enregistrement : {tail[:40]!r}")
+    return report
+
+def _copy_range(source, destination, start, end, block_size=16 * 2**20):
+    source.seek(start)
+    while start < end:
+        block = source.read(min(block_size, end - start))
+        if not block:
+            break
+        destination.write(block)
+        start += len(block)
+
+def check_and_fix_json(file_path, fix=True):
+    """ Validate a file and repair its brackets; returns 'correct', 'fixed' or 'invalid'.
+
+    A missing ']' or a trailing comma is fixed in place by truncating after the last record. A
+    missing '[' is fixed by one sequential copy to a temporary file, then renamed over the original.
+    A bad record, or JSON lines ending like an array (no commas to copy), is only reported, with its byte offset.
+    """
+    report = validate_json(file_path)
+    name = os.path.basename(file_path)
+    if report['error']:
+        offset, message = report['error']
+        print(f"Le fichier {name} est invalide à l'octet {offset} : {message}")
+        return 'invalid'
+    if not (report['missing_open'] or report['missing_close'] or report['trailing_comma']):
+        print(f"Le fichier {name} est déjà correct.")
+        return 'correct'
+    if not fix:
+        print(f"Le fichier {name} doit être corrigé (crochet ouvrant manquant : {report['missing_open']}, "
+              f"crochet fermant manquant : {report['missing_close']}, virgule finale : {report['trailing_comma']}).")
+        return 'invalid'
+
+    if report['missing_open']:
+        temporary_path = file_path + '.tmp'
+        with open(file_path, 'rb') as source, open(temporary_path, 'wb') as destination:
+            destination.write(b'[\n')
+            if report['records']:
+                _copy_range(source, destination, report['content_start'], report['content_end'])
+            destination.write(b'\n]')
+        os.replace(temporary_path, file_path)
+    else:
+        # Le début est correct : il suffit de remplacer la fin du fichier
+        with open(file_path, 'r+b') as file:
+            file.truncate(report['content_end'])
+            file.seek(report['content_end'])
+            file.write(b'\n]')
+    print(f"Le fichier {name} a été mis à jour.")
+    return 'fixed'
 
 if __name__ == "__main__":
+    parser = add_workers_argument(argparse.ArgumentParser(description="Vérifier et corriger les crochets des fichiers JSON."))
+    parser.add_argument('--check', action='store_true', help="Vérifier seulement, sans corriger les fichiers")
+    args = parser.parse_args()
+
     # Obtenir le chemin du répertoire du script
     current_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -42,10 +177,10 @@ if __name__ == "__main__":
     # Liste tous les fichiers dans le dossier
     files = [file for file in os.listdir(directory_path) if file.endswith('.json')]
 
-    # Parcourir chaque fichier
-    for file_name in files:
-        file_path = os.path.join(directory_path, file_name)
-        check_and_fix_json(file_path)
+    # Vérifier chaque fichier en parallèle
+    tasks = [(os.path.join(directory_path, file_name), not args.check) for file_name in files]
+    results, failures = run_sharded(check_and_fix_json, tasks, args.workers, desc="Vérification JSON")
+    report_failures(failures)
 
     print("Vérification et mise à jour terminées.")
 
@@ -1,12 +1,24 @@
 import os
 import json
+import argparse
+import numpy as np
+import scipy.sparse as sp
 import networkx as nx
 import matplotlib.pyplot as plt
-import networkx.algorithms.community as nx_comm
+from DetectionCommunautes import cached_communities, symmetric_adjacency
+from DispositionGraphe import cached_layout, coarsen, force_layout, induced_subgraph, draw_layout
+from GrapheCompact import build_compact_network
+from SyntheseCommunautes import export_summary, node_fos
+from SelectionTopN import top_indices
 from tqdm import tqdm
+from LireEnregistrements import iter_records
+from GrapheNetworkX import paper_attributes, resolve_pending_references, add_collaboration_records
+from FormatBinaireGraphe import write_snapshot_for, from_networkx
+from FluxGEXF import write_gexf
 
 def list_files_and_choose(directory):
-    files = [file for file in os.listdir(directory) if os.path.isfile(os.path.join(directory, file))]
+    # Un jeu Parquet partitionné est un dossier : l'accepter comme un fichier
+    files = [file for file in os.listdir(directory) if os.path.isfile(os.path.join(directory, file)) or file.endswith('.parquet')]
     if not files:
         print("Aucun fichier trouvé dans le dossier spécifié.")
         return None, None
@@ -23,59 +35,77 @@ def list_files_and_choose(directory):
         return None, None
 
 def save_top_nodes(network, output_directory2, base_filename, top_n=1000):
-    degrees = network.degree()
-    top_nodes = sorted(degrees, key=lambda x: x[1], reverse=True)[:top_n]
+    # Sélection partielle sur le tableau des degrés au lieu d'un tri complet
+    nodes = list(network.nodes())
+    degrees = np.fromiter((degree for _, degree in network.degree()), dtype=np.int64, count=len(nodes))
     top_nodes_data = [{
-        "node_id": node,
-        "degree": degree,
-        **network.nodes[node]
-    } for node, degree in top_nodes]
+        "node_id": nodes[i],
+        "degree": int(degrees[i]),
+        **network.nodes[nodes[i]]
+    } for i in top_indices(degrees, top_n)]
     
     json_filename = os.path.join(output_directory2, f"{base_filename}_{network_title}_{top_n}_top_nodes.json")
     with open(json_filename, 'w', encoding='utf-8') as f:
         json.dump(top_nodes_data, f, indent=4)
     print(f"Top {top_n} nodes saved to {json_filename}")
 
-def build_network(file_path, network_type):
-    G = nx.DiGraph() if network_type == '1' else nx.Graph()
-    with open(file_path, 'r', encoding='utf-8') as file:
-        data = json.load(file)
-
-    for record in tqdm(data, desc="Building network", unit="papers"):
-        node_attributes = {
-            'year': str(record.get('year', "")),
-            'title': str(record.get('title', "")),
-            'fos': ', '.join(record.get('fos', [])) if record.get('fos', None) is not None else "Unknown",
-            'references': ', '.join(record.get('references', [])) if record.get('references', None) is not None else "Unknown"
-        }
-
-        if network_type == '1':
-            G.add_node(record['_id'], **node_attributes)
-            references = record.get('references', [])
-            if isinstance(references, list):  # Vérifie que 'references' est une liste
-                for ref in references:
-                    if ref and ref in G:
-                        G.add_edge(ref, record['_id'])
-        else:
-            authors = record.get('authors', [])
-            if authors:  # Vérifie que 'authors' n'est pas None
-                for author in authors:
-                    if 'name' in author and '_id' in author:
-                        author_attributes = {
-                            'name': str(author.get('name', "Unknown")),
-                            **node_attributes
-                        }
-                        G.add_node(author['_id'], **author_attributes)
-
-                for i in range(len(authors)):
-                    if '_id' in authors[i]:
-                        for j in range(i + 1, len(authors)):
-                            if '_id' in authors[j]:
-                                G.add_edge(authors[i]['_id'], authors[j]['_id'])
+def build_network(file_path, network_type, stub_nodes=False, max_authors=None, weighting='count'):
+    if network_type != '1':
+        # Paires de co-auteurs développées et agrégées en tableaux, puis ajoutées une fois par arête
+        return add_collaboration_records(nx.Graph(), iter_records(file_path), max_authors, weighting)
+    G = nx.DiGraph()
+    # Références vers des articles pas encore lus : résolues à la fin, l'ordre du fichier n'a plus d'importance
+    pending_references = {}
 
+    for record in tqdm(iter_records(file_path), desc="Building network", unit="papers"):
+        G.add_node(record['_id'], **paper_attributes(record))
+        references = record.get('references', [])
+        if isinstance(references, list):  # Vérifie que 'references' est une liste
+            for ref in references:
+                if ref and ref in G:
+                    G.add_edge(ref, record['_id'])
+                elif ref:
+                    pending_references.setdefault(ref, []).append(record['_id'])
+
+    resolve_pending_references(G, pending_references, stub_nodes)
     return G
 
+def draw_network(graph, labels, title, view='full', top_n=1000, weight=None, max_edges=200000):
+    """ Figure of a CompactGraph coloured by community, with multilevel positions cached by graph content.
+
+    view='full' draws every node, 'top' the subgraph of the top_n nodes by degree, and 'communities'
+    one disc per community (area proportional to its size) with the inter-community edges.
+    """
+    if view == 'top':
+        nodes = top_indices(graph.degree(), top_n)
+        graph, labels = induced_subgraph(graph, nodes), np.unique(labels[nodes], return_inverse=True)[1]
+    if view == 'communities':
+        # Seul le graphe des communautés est disposé : pas de positions par sommet à calculer
+        coarse, sizes = coarsen(symmetric_adjacency(graph, weight), labels)
+        community_pos = force_layout(coarse, mass=sizes, iterations=100)
+        pairs = sp.triu(coarse, k=1).tocoo()
+        return draw_layout(community_pos, pairs.row, pairs.col, np.arange(len(sizes)), title,
+                           sizes=5 + 500 * sizes / max(sizes.max(initial=0), 1), max_edges=max_edges)
+    pos, _, info = cached_layout(graph, labels, weight=weight)
+    if info['cached']:
+        print("Positions des sommets reprises du cache.")
+    else:
+        print(f"Positions de {info['nodes']} sommets calculées en {info['seconds']:.1f} s ({info['communities']} communautés).")
+    # Points plus fins quand le graphe est grand, pour garder une image lisible
+    return draw_layout(pos, graph.src, graph.dst, labels, title, sizes=5 if graph.num_nodes <= 100000 else 0.5, max_edges=max_edges)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construire, dessiner et exporter un réseau de citations ou de collaboration.")
+    parser.add_argument('--view', choices=['full', 'top', 'communities'], default='full',
+                        help="Dessiner tout le graphe, les sommets de plus haut degré ou une pastille par communauté")
+    parser.add_argument('--top', type=int, default=1000, help="Nombre de sommets dessinés avec --view top (défaut : 1000)")
+    parser.add_argument('--max-edges', type=int, default=200000, help="Nombre maximal d'arêtes dessinées, tirées au hasard (défaut : 200000)")
+    parser.add_argument('--compact', action='store_true', help="Construire le graphe directement en tableaux, sans NetworkX (grands graphes)")
+    parser.add_argument('--max-authors', type=int, help="Ignorer les articles ayant plus d'auteurs que ce nombre (réseau de collaboration)")
+    parser.add_argument('--weighting', choices=['count', 'newman'], default='count',
+                        help="Poids des collaborations : nombre d'articles, ou 1/(k-1) par article à k auteurs")
+    args = parser.parse_args()
+
     # Obtenir le chemin du répertoire du script
     current_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -86,38 +116,45 @@ if __name__ == "__main__":
 
     output_directory2 = os.path.join(current_dir, '..', 'Dataset', 'Dataset_Collaboration_Top_1000_Sommets')
 
+    stub_nodes = False
+    if network_type == '1':
+        stub_nodes = input("Ajouter les articles cités hors du fichier comme sommets fantômes ? (o/n) : ").strip().lower() == 'o'
+
     if chosen_file_path:
-        network = build_network(chosen_file_path, network_type)
+        # Sans NetworkX, le graphe est construit directement en tableaux
+        compact = build_compact_network(chosen_file_path, network_type, stub_nodes, args.max_authors, args.weighting) if args.compact \
+            else from_networkx(build_network(chosen_file_path, network_type, stub_nodes, args.max_authors, args.weighting))
         network_title = 'Citation' if network_type == '1' else 'Collaboration'
         base_filename = chosen_filename.replace('.json', '')
-        print(f"Le réseau {network_title} a {len(network.nodes())} sommets et {len(network.edges())} arrêtes.")
+        print(f"Le réseau {network_title} a {compact.num_nodes} sommets et {compact.num_edges} arrêtes.")
         
-        try:
-            communities = nx_comm.greedy_modularity_communities(network)
-            community_color_map = {node: i for i, comm in enumerate(communities) for node in comm}
-        except ValueError as e:
-            print("Erreur lors de la détection des communautés :", e)
-            community_color_map = {node: 0 for node in network.nodes()}
+        # Partition Leiden mise en cache : l'analyse du même graphe la réutilise
+        weight = 'weight' if 'weight' in compact.edge_attributes else None
+        labels, info = cached_communities(compact, weight=weight)
+        print(f"{info['communities']} communautés détectées (modularité {info['modularity']:.4f}).")
         
-        pos = nx.spring_layout(network, k=0.1, iterations=20)
-        plt.figure(figsize=(12, 12))
-        nx.draw_networkx_nodes(network, pos, node_size=5, cmap=plt.cm.jet,
-                               node_color=[community_color_map[node] for node in network.nodes()], alpha=0.6)
-        nx.draw_networkx_edges(network, pos, alpha=0.5)
-        plt.axis('off')
-        plt.title(f"Réseau de {network_title} avec Détection de communauté - {base_filename}")
+        # Disposition multiniveau en O(n + m) par itération, mise en cache : un second dessin la reprend
+        draw_network(compact, labels, f"Réseau de {network_title} avec Détection de communauté - {base_filename}",
+                     args.view, args.top, weight, args.max_edges)
         
         output_directory = os.path.join(current_dir, '..', 'Dataset', 'Graphe')
         if not os.path.exists(output_directory):
             os.makedirs(output_directory)
 
-        jpeg_filename = os.path.join(output_directory, f"{base_filename}_{network_title.lower()}_network.jpeg")
+        view_suffix = '' if args.view == 'full' else f"_{args.view}"
+        jpeg_filename = os.path.join(output_directory, f"{base_filename}_{network_title.lower()}_network{view_suffix}.jpeg")
         plt.savefig(jpeg_filename, format='jpeg', dpi=300)
         print(f"Graphe enregistré sous {jpeg_filename}.")
         
         gexf_filename = os.path.join(output_directory, f"{base_filename}_{network_title.lower()}_network.gexf")
-        nx.write_gexf(network, gexf_filename)
+        write_gexf(compact, gexf_filename)
         print(f"Le Graphe a été exporté pour Gephi comme : {gexf_filename}.")
+        # Instantané binaire à côté du GEXF, chargé en priorité par les outils d'analyse
+        print(f"Instantané binaire enregistré sous : {write_snapshot_for(compact, gexf_filename)}.")
+        # Graphe des communautés : quelques milliers de sommets à ouvrir dans Gephi au lieu de millions
+        fos = None if 'fos' in compact.attributes else node_fos(compact, iter_records(chosen_file_path), network_type)
+        supergraph, summary_gexf, summary_json = export_summary(compact, labels, os.path.splitext(gexf_filename)[0], weight, fos)
+        print(f"Graphe des {supergraph.num_nodes} communautés exporté sous : {summary_gexf} et {summary_json}.")
         
         plt.show()
     else:
@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+# Version de l'algorithme, incluse dans la clé du cache : la changer invalide les partitions enregistrées
+PARTITION_VERSION = 2
+
+# Partitions partagées par les scripts d'analyse et de dessin
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output', 'communautes')
+
+def symmetric_adjacency(graph, weight=None):
+    """ Undirected weighted adjacency (A + A^T for directed graphs); a self-loop of weight w counts 2w, as in NetworkX. """
+    n = graph.num_nodes
+    data = np.ones(len(graph.src)) if weight is None else np.asarray(graph.edge_attributes[weight], dtype=np.float64)
+    adjacency = sp.csr_matrix((np.concatenate([data, data]),
+                               (np.concatenate([graph.src, graph.dst]), np.concatenate([graph.dst, graph.src]))), shape=(n, n))
+    adjacency.sum_duplicates()
+    return adjacency
+
+def modularity(adjacency, labels, resolution=1.0):
+    """ Modularity of a partition on a symmetric adjacency (same value as networkx.community.modularity). """
+    total = adjacency.sum()
+    if total == 0:
+        return 0.0
+    coo = adjacency.tocoo()
+    intra = labels[coo.row] == labels[coo.col]
+    num_communities = labels.max() + 1
+    inside = np.bincount(labels[coo.row[intra]], weights=coo.data[intra], minlength=num_communities)
+    strength = np.bincount(labels, weights=np.asarray(adjacency.sum(axis=1)).ravel(), minlength=num_communities)
+    return float(inside.sum() / total - resolution * np.square(strength / total).sum())
+
+def _best_moves(links_matrix, degree, labels, strength, total, resolution, rows):
+    """ For the given nodes: best community (-1 for a new one), its gain and the gain of staying.
+
+    Gains are relative to the node being alone in its own community.
+    """
+    block = links_matrix[rows]
+    node = np.repeat(np.arange(len(rows)), np.diff(block.indptr))
+    # Poids des arêtes de chaque sommet vers chaque communauté voisine (clé sommet, communauté)
+    keys, inverse = np.unique(node * len(strength) + labels[block.indices], return_inverse=True)
+    weights = np.bincount(inverse, weights=block.data)
+    node, community = keys // len(strength), keys % len(strength)
+    node_degree = degree[rows]
+    current = labels[rows]
+    own = community == current[node]
+    gains = weights - resolution * node_degree[node] * (strength[community] - own * node_degree[node]) / total
+
+    stay_gain = -resolution * node_degree * (strength[current] - node_degree) / total
+    stay_gain[node[own]] = gains[own]
+    best_target = np.full(len(rows), -1, dtype=np.int64)
+    best_gain = np.zeros(len(rows))
+    if len(gains):
+        order = np.lexsort((-gains, node))
+        first = order[np.r_[0, np.flatnonzero(np.diff(node[order])) + 1]]
+        better = gains[first] > 0
+        best_target[node[first][better]] = community[first][better]
+        best_gain[node[first][better]] = gains[first][better]
+    return best_target, best_gain, stay_gain
+
+def _local_moving(adjacency, labels, resolution, rng, batches=32, max_sweeps=50, tol=1.0e-7):
+    """ Local moving by batches: the nodes of a batch choose their best community together (sparse products), then all move.
+
+    Each sweep visits the nodes in random order, split into batches; strengths are updated between
+    batches, so that most moves see an up-to-date partition. Sweeps stop when modularity stalls.
+    """
+    n = adjacency.shape[0]
+    links_matrix = (adjacency - sp.diags(adjacency.diagonal())).tocsr()
+    links_matrix.eliminate_zeros()
+    degree = np.asarray(adjacency.sum(axis=1)).ravel()
+    total = degree.sum()
+    # Étiquettes [n, 2n) : communautés créées pour un sommet qui s'isole
+    labels = np.unique(labels, return_inverse=True)[1]
+    strength = np.bincount(labels, weights=degree, minlength=2 * n)
+    quality = modularity(adjacency, labels, resolution)
+
+    for _ in range(max_sweeps):
+        previous_labels, previous_strength = labels.copy(), strength.copy()
+        for batch in np.array_split(rng.permutation(n), min(batches, n)):
+            rows = batch
+            target, best_gain, stay_gain = _best_moves(links_matrix, degree, labels, strength, total, resolution, rows)
+            target = np.where(target >= 0, target, n + rows)
+            # Une communauté créée pour un sommet n'est reprise que si elle est vide
+            moving = (best_gain > stay_gain + 1.0e-12) & ((target < n) | (strength[target] == 0))
+            rows, target = rows[moving], target[moving]
+            np.subtract.at(strength, labels[rows], degree[rows])
+            np.add.at(strength, target, degree[rows])
+            labels[rows] = target
+        new_quality = modularity(adjacency, labels, resolution)
+        if new_quality <= quality:
+            labels, strength = previous_labels, previous_strength
+            break
+        gain, quality = new_quality - quality, new_quality
+        if gain < tol:
+            break
+    return np.unique(labels, return_inverse=True)[1]
+
+def _split_disconnected(adjacency, labels):
+    """ Split every community into its connected components (never decreases modularity). """
+    coo = adjacency.tocoo()
+    intra = labels[coo.row] == labels[coo.col]
+    inside = sp.csr_matrix((coo.data[intra], (coo.row[intra], coo.col[intra])), shape=adjacency.shape)
+    return connected_components(inside, directed=False)[1]
+
+def _refine(adjacency, labels, resolution, rng, batches=32):
+    """ Leiden refinement: every community of the local moving is split again, starting from singletons.
+
+    Visited by batches in random order, a node still alone in its sub-community and well connected
+    to its community joins the sub-community of the same community, itself well connected, with
+    the best positive modularity gain (greedy choice, the θ → 0 limit of Leiden's random merge).
+    Sub-communities are thus connected subsets of the communities. Returns the refined labels.
+    """
+    n = adjacency.shape[0]
+    coo = adjacency.tocoo()
+    keep = (labels[coo.row] == labels[coo.col]) & (coo.row != coo.col)
+    inside = sp.csr_matrix((coo.data[keep], (coo.row[keep], coo.col[keep])), shape=adjacency.shape)
+    inside_rows = np.repeat(np.arange(n), np.diff(inside.indptr))
+    degree = np.asarray(adjacency.sum(axis=1)).ravel()
+    total = degree.sum()
+    refined = np.arange(n)
+    if total == 0:
+        return refined
+    community_strength = np.bincount(labels, weights=degree)[labels]
+    # Poids des arêtes d'un sommet vers le reste de sa communauté
+    to_community = np.asarray(inside.sum(axis=1)).ravel()
+    candidate = to_community >= resolution * degree * (community_strength - degree) / total
+
+    for batch in np.array_split(rng.permutation(n), min(batches, n)):
+        # Un sous-ensemble est désigné par l'un de ses sommets, donc appartient à la communauté de ce sommet
+        size = np.bincount(refined, minlength=n)
+        rows = batch[candidate[batch] & (size[refined[batch]] == 1)]
+        if not len(rows):
+            continue
+        strength = np.bincount(refined, weights=degree, minlength=n)
+        same = refined[inside_rows] == refined[inside.indices]
+        external = np.bincount(refined, weights=to_community, minlength=n) - np.bincount(
+            refined[inside_rows[same]], weights=inside.data[same], minlength=n)
+        well_connected = external >= resolution * strength * (community_strength - strength) / total
+        # Les singletons du lot ne sont pas des cibles : les déplacements d'un lot restent indépendants
+        well_connected[rows] = False
+
+        block = inside[rows]
+        node = np.repeat(np.arange(len(rows)), np.diff(block.indptr))
+        keys, inverse = np.unique(node * n + refined[block.indices], return_inverse=True)
+        weights = np.bincount(inverse, weights=block.data)
+        node, target = keys // n, keys % n
+        gains = weights - resolution * degree[rows][node] * strength[target] / total
+        allowed = well_connected[target] & (gains > 0)
+        node, target, gains = node[allowed], target[allowed], gains[allowed]
+        if len(gains):
+            order = np.lexsort((-gains, node))
+            first = order[np.r_[0, np.flatnonzero(np.diff(node[order])) + 1]]
+            refined[rows[node[first]]] = target[first]
+    return np.unique(refined, return_inverse=True)[1]
+
+def find_communities(graph, resolution=1.0, method='leiden', seed=0, weight=None, max_levels=20):
+    """ Louvain or Leiden community detection on the CSR adjacency of a CompactGraph.
+
+    Local moving is vectorized (sparse products) over batches of nodes, on a single core.
+    With method='leiden' each level goes through the refinement phase (see _refine) and the graph
+    is aggregated by refined sub-community, each aggregate starting in its unrefined community;
+    the final communities are guaranteed connected. Returns (labels, info).
+    """
+    if method not in ('louvain', 'leiden'):
+        raise ValueError(f"Méthode inconnue : {method}")
+    start_time = time.time()
+    rng = np.random.default_rng(seed)
+    adjacency = symmetric_adjacency(graph, weight)
+    current = adjacency
+    membership = np.arange(graph.num_nodes)
+    labels = np.arange(graph.num_nodes)
+    levels = 0
+    for _ in range(max_levels):
+        labels = _local_moving(current, labels, resolution, rng)
+        if labels.max(initial=-1) + 1 >= current.shape[0]:
+            break
+        refined = _refine(current, labels, resolution, rng) if method == 'leiden' else labels
+        if refined.max(initial=-1) + 1 >= current.shape[0]:
+            # Raffinement sans fusion : agrégation par communauté, comme Louvain
+            refined = labels
+        # Agrégation : un sommet par (sous-)communauté, arêtes internes en boucles
+        levels += 1
+        indicator = sp.csr_matrix((np.ones(current.shape[0]), (np.arange(current.shape[0]), refined)))
+        current = (indicator.T @ current @ indicator).tocsr()
+        membership = refined[membership]
+        # Chaque agrégat part de sa communauté non raffinée
+        aggregate_labels = np.zeros(current.shape[0], dtype=np.int64)
+        aggregate_labels[refined] = labels
+        labels = aggregate_labels
+
+    labels = np.unique(labels[membership], return_inverse=True)[1] if graph.num_nodes else labels
+    if method == 'leiden' and graph.num_nodes:
+        labels = _split_disconnected(adjacency, labels)
+    info = {
+        'method': method,
+        'resolution': resolution,
+        'levels': levels,
+        'communities': int(labels.max(initial=-1) + 1),
+        'modularity': modularity(adjacency, labels, resolution) if graph.num_nodes else 0.0,
+        'seconds': time.time() - start_time,
+    }
+    return labels, info
+
+def _canonical_order(graph):
+    return np.argsort(np.array(graph.ids, dtype=str), kind='stable')
+
+def graph_fingerprint(graph, weight=None, order=None):
+    """ Content hash of a graph (ids, edges, weights), independent of the order of nodes and edges. """
+    order = _canonical_order(graph) if order is None else order
+    rank = np.empty(graph.num_nodes, dtype=np.int64)
+    rank[order] = np.arange(graph.num_nodes)
+    src, dst = rank[graph.src], rank[graph.dst]
+    if not graph.directed:
+        src, dst = np.minimum(src, dst), np.maximum(src, dst)
+    keys = src << 32 | dst
+    edge_order = np.argsort(keys, kind='stable')
+    digest = hashlib.sha256(b'directed' if graph.directed else b'undirected')
+    digest.update('\0'.join(graph.ids[i] for i in order).encode('utf-8'))
+    digest.update(keys[edge_order].tobytes())
+    if weight is not None:
+        digest.update(np.asarray(graph.edge_attributes[weight], dtype=np.float64)[edge_order].tobytes())
+    return digest.hexdigest()
+
+def cached_communities(graph, cache_directory=DEFAULT_CACHE_DIRECTORY, resolution=1.0, method='leiden', seed=0, weight=None):
+    """ find_communities, reusing the partition saved for the same graph content and parameters. """
+    order = _canonical_order(graph)
+    fingerprint = graph_fingerprint(graph, weight, order)
+    parameters = f"{method}_r{resolution}_s{seed}_{weight or 'unweighted'}_v{PARTITION_VERSION}"
+    cache_path = os.path.join(cache_directory, f"{fingerprint}_{parameters}.npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as saved:
+            labels = np.empty(graph.num_nodes, dtype=np.int64)
+            labels[order] = saved['labels']
+            info = json.loads(saved['info'].item())
+        info['cached'] = True
+        return labels, info
+
+    labels, info = find_communities(graph, resolution, method, seed, weight)
+    os.makedirs(cache_directory, exist_ok=True)
+    # Écriture dans un fichier temporaire (propre au processus) puis renommage : pas de cache à moitié écrit
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as f:
+        np.savez(f, labels=labels[order], info=np.array(json.dumps(info)))
+    os.replace(temporary_path, cache_path)
+    info['cached'] = False
+    return labels, info
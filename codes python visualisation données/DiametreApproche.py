@@ -0,0 +1,168 @@
+import math
+import time
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components, shortest_path
+
+def largest_component(graph):
+    """ Binary symmetric CSR adjacency of the largest connected component (edge directions ignored), and its node indices. """
+    n = graph.num_nodes
+    adjacency = sp.csr_matrix((np.ones(2 * len(graph.src), dtype=np.int8),
+                               (np.concatenate([graph.src, graph.dst]), np.concatenate([graph.dst, graph.src]))), shape=(n, n))
+    adjacency.sum_duplicates()
+    adjacency.data[:] = 1
+    adjacency.setdiag(0)
+    adjacency.eliminate_zeros()
+    _, labels = connected_components(adjacency, directed=False)
+    nodes = np.flatnonzero(labels == np.argmax(np.bincount(labels))) if n else np.zeros(0, dtype=np.int64)
+    return adjacency[nodes][:, nodes].tocsr(), nodes
+
+def _bfs(adjacency, sources, predecessors=False):
+    return shortest_path(adjacency, method='D', unweighted=True, indices=sources, return_predecessors=predecessors)
+
+def _middle(predecessors, source, target):
+    """ Node halfway along the BFS tree path from source to target. """
+    path = [target]
+    while path[-1] != source:
+        path.append(predecessors[path[-1]])
+    return path[len(path) // 2]
+
+def diameter_bounds(adjacency, max_bfs=None, batch_size=16):
+    """ Exact diameter of a connected graph with iFUB, or lower/upper bounds when max_bfs BFS are not enough.
+
+    A 4-sweep picks a central node u and gives a first lower bound; the nodes are then taken by
+    decreasing distance from u, and the eccentricities of each level raise the lower bound while
+    the upper bound 2 * (level - 1) goes down, until they meet. Returns a dict with the bounds,
+    the number of BFS and the elapsed time.
+    """
+    start = time.time()
+    n = adjacency.shape[0]
+    if n <= 1:
+        return {'lower': 0, 'upper': 0, 'exact': True, 'bfs': 0, 'seconds': time.time() - start}
+    bfs_count = 0
+
+    def sweep(source):
+        nonlocal bfs_count
+        bfs_count += 1
+        distances, predecessors = _bfs(adjacency, source, predecessors=True)
+        farthest = int(np.argmax(distances))
+        return int(distances[farthest]), farthest, predecessors
+
+    # 4-sweep : deux doubles balayages depuis le sommet de plus haut degré puis depuis un milieu
+    lower = 0
+    source = int(np.argmax(np.diff(adjacency.indptr)))
+    for _ in range(2):
+        eccentricity, a, _ = sweep(source)
+        lower = max(lower, eccentricity)
+        eccentricity, b, predecessors = sweep(a)
+        lower = max(lower, eccentricity)
+        source = _middle(predecessors, a, b)
+
+    bfs_count += 1
+    distances = _bfs(adjacency, source).astype(np.int64)
+    radius = int(distances.max())
+    lower = max(lower, radius)
+    upper = 2 * radius
+    level = radius
+    while upper > lower and level > 0:
+        if max_bfs is not None and bfs_count >= max_bfs:
+            break
+        fringe = np.flatnonzero(distances == level)
+        # Excentricités des sommets du niveau, par lots de BFS
+        for first in range(0, len(fringe), batch_size):
+            batch = fringe[first:first + batch_size]
+            bfs_count += len(batch)
+            lower = max(lower, int(np.atleast_2d(_bfs(adjacency, batch)).max()))
+            if lower > 2 * (level - 1) or (max_bfs is not None and bfs_count >= max_bfs):
+                break
+        if lower > 2 * (level - 1):
+            upper = lower
+            break
+        if max_bfs is not None and bfs_count >= max_bfs and first + batch_size < len(fringe):
+            break
+        upper = max(lower, 2 * (level - 1))
+        level -= 1
+    return {'lower': lower, 'upper': upper, 'exact': lower == upper, 'bfs': bfs_count, 'seconds': time.time() - start}
+
+def _splitmix64(values):
+    """ 64-bit hash of integers (vectorized splitmix64 finalizer). """
+    with np.errstate(over='ignore'):
+        z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+def _hyperloglog_registers(n, log2m, seed):
+    """ One HyperLogLog counter per node, each containing only the node itself. """
+    m = 1 << log2m
+    hashes = _splitmix64(np.arange(n, dtype=np.uint64) + np.uint64(seed) * np.uint64(n + 1))
+    register = (hashes >> np.uint64(64 - log2m)).astype(np.int64)
+    # 53 bits suivants : exacts en flottant, leur longueur binaire donne le rang du premier bit à 1
+    remaining = ((hashes << np.uint64(log2m)) >> np.uint64(11)).astype(np.float64)
+    rank = 53 - np.frexp(remaining)[1] + 1
+    registers = np.zeros((n, m), dtype=np.uint8)
+    registers[np.arange(n), register] = rank
+    return registers
+
+def _estimate(registers):
+    """ HyperLogLog estimate of every counter (with the small range correction). """
+    m = registers.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.exp2(-registers.astype(np.float64)).sum(axis=1)
+    zeros = (registers == 0).sum(axis=1)
+    small = (raw <= 2.5 * m) & (zeros > 0)
+    raw[small] = m * np.log(m / zeros[small])
+    return raw
+
+def neighbourhood_function(adjacency, log2m=7, seed=0, max_iter=1000, chunk_edges=1 << 21):
+    """ HyperANF: approximate number of pairs (x, y) with d(x, y) <= t, for t = 0, 1, ... until it stabilizes.
+
+    Each node keeps a HyperLogLog counter of its ball; at step t it becomes the union (register-wise
+    maximum) of its own counter and its neighbours' ones. Rows are processed in chunks of about
+    chunk_edges edges to bound memory. The relative standard error of every value is 1.04 / sqrt(2^log2m).
+    """
+    n = adjacency.shape[0]
+    registers = _hyperloglog_registers(n, log2m, seed)
+    counts = [float(_estimate(registers).sum())]
+    indptr, indices = adjacency.indptr, adjacency.indices
+    boundaries = [0]
+    while boundaries[-1] < n:
+        boundaries.append(int(np.searchsorted(indptr, indptr[boundaries[-1]] + chunk_edges, side='right')) - 1)
+        boundaries[-1] = max(boundaries[-1], boundaries[-2] + 1)
+    boundaries[-1] = n
+
+    for _ in range(max_iter):
+        updated = registers.copy()
+        for first, last in zip(boundaries[:-1], boundaries[1:]):
+            rows = np.arange(first, last)
+            degrees = np.diff(indptr[first:last + 1])
+            rows = rows[degrees > 0]
+            if not len(rows):
+                continue
+            neighbours = registers[indices[indptr[first]:indptr[last]]]
+            starts = indptr[rows] - indptr[first]
+            updated[rows] = np.maximum(updated[rows], np.maximum.reduceat(neighbours, starts, axis=0))
+        if np.array_equal(updated, registers):
+            break
+        registers = updated
+        counts.append(float(_estimate(registers).sum()))
+    return np.array(counts)
+
+def distance_statistics(adjacency, log2m=7, seed=0, percentile=0.9):
+    """ Average distance and effective diameter (interpolated percentile of the distance distribution) from HyperANF. """
+    start = time.time()
+    counts = neighbourhood_function(adjacency, log2m, seed)
+    # Les valeurs estimées peuvent décroître légèrement : on impose la monotonie
+    counts = np.maximum.accumulate(counts)
+    pairs = counts[-1] - counts[0]
+    if pairs <= 0:
+        return {'average_distance': 0.0, 'effective_diameter': 0.0, 'relative_error': 0.0,
+                'iterations': len(counts) - 1, 'seconds': time.time() - start}
+    per_distance = np.diff(counts)
+    average = float((np.arange(1, len(counts)) * per_distance).sum() / pairs)
+    target = counts[0] + percentile * pairs
+    t = int(np.searchsorted(counts, target))
+    effective = t - 1 + (target - counts[t - 1]) / (counts[t] - counts[t - 1]) if counts[t] > counts[t - 1] else float(t)
+    return {'average_distance': average, 'effective_diameter': float(effective),
+            'relative_error': 1.04 / math.sqrt(1 << log2m), 'iterations': len(counts) - 1,
+            'seconds': time.time() - start}
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import scipy.sparse as sp
+from functools import lru_cache
+from scipy.fft import rfft2, irfft2, next_fast_len
+from GrapheCompact import CompactGraph
+from DetectionCommunautes import symmetric_adjacency, graph_fingerprint, _canonical_order
+
+# Version de l'algorithme, incluse dans la clé du cache : la changer invalide les positions enregistrées
+LAYOUT_VERSION = 1
+
+# Positions partagées entre les dessins successifs d'un même graphe
+DEFAULT_LAYOUT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output', 'positions')
+
+def coarsen(adjacency, labels):
+    """ Community-level adjacency (inter-community weights, internal weights on the diagonal) and community sizes. """
+    n = adjacency.shape[0]
+    indicator = sp.csr_matrix((np.ones(n), (np.arange(n), labels)), shape=(n, int(labels.max(initial=-1)) + 1))
+    return (indicator.T @ adjacency @ indicator).tocsr(), np.bincount(labels, minlength=indicator.shape[1])
+
+@lru_cache(maxsize=4)
+def _kernel_spectrum(grid_size):
+    """ FFT of the kernel r/|r|² (x and y parts) over every cell offset of the grid, in cell units. """
+    offsets = np.arange(-(grid_size - 1), grid_size)
+    dx, dy = np.meshgrid(offsets, offsets, indexing='ij')
+    squared = (dx ** 2 + dy ** 2).astype(np.float64)
+    squared[grid_size - 1, grid_size - 1] = np.inf
+    shape = (next_fast_len(3 * grid_size - 2, real=True),) * 2
+    return shape, rfft2(dx / squared, shape), rfft2(dy / squared, shape)
+
+def _repulsion(pos, mass, k, grid_size, exact_below=500):
+    """ Repulsive force k²/d between all pairs of nodes, scaled by their masses.
+
+    Small graphs (e.g. community graphs) are computed exactly. Otherwise the masses are binned on a
+    grid_size x grid_size grid over the layout and convolved (FFT) with the kernel r/|r|², so the cost
+    is O(n + G² log G) instead of O(n²) (particle-mesh); nodes in the same cell do not repel.
+    """
+    if len(pos) <= exact_below:
+        delta = pos[:, None, :] - pos[None, :, :]
+        squared = (delta ** 2).sum(axis=2)
+        np.fill_diagonal(squared, np.inf)
+        return k * k * mass[:, None] * (delta * (mass[None, :] / np.maximum(squared, 1e-18))[:, :, None]).sum(axis=1)
+    low = pos.min(axis=0)
+    extent = max(float((pos.max(axis=0) - low).max()), 1e-9)
+    h = extent / (grid_size - 1)
+    cells = np.minimum(np.rint((pos - low) / h).astype(np.int64), grid_size - 1)
+    flat = cells[:, 0] * grid_size + cells[:, 1]
+    density = np.bincount(flat, weights=mass, minlength=grid_size * grid_size).reshape(grid_size, grid_size)
+    shape, kernel_x, kernel_y = _kernel_spectrum(grid_size)
+    spectrum = rfft2(density, shape)
+    force = np.empty_like(pos)
+    for axis, kernel in enumerate((kernel_x, kernel_y)):
+        # Décalage de grid_size - 1 : la convolution complète est centrée sur la grille
+        field = irfft2(spectrum * kernel, shape)[grid_size - 1:2 * grid_size - 1, grid_size - 1:2 * grid_size - 1]
+        force[:, axis] = field.ravel()[flat] / h
+    return force * (k * k * mass)[:, None]
+
+def force_layout(adjacency, pos=None, mass=None, iterations=50, temperature=0.1, gravity=1.0, grid_size=256, seed=0):
+    """ Fruchterman–Reingold layout in O(n + m) per iteration, on a symmetric (weighted) adjacency.
+
+    Attraction d²/k runs over the edge arrays and repulsion k²/d over a particle-mesh grid (see
+    _repulsion); a gravity term keeps disconnected parts close to the centre. Nodes carry a mass
+    (e.g. the size of a community) that scales the repulsion and slows their moves. The step is
+    bounded by a temperature starting at temperature times the layout extent and cooling linearly.
+    """
+    n = adjacency.shape[0]
+    mass = np.ones(n) if mass is None else np.asarray(mass, dtype=np.float64)
+    if pos is None:
+        pos = np.random.default_rng(seed).random((n, 2))
+    pos = np.array(pos, dtype=np.float64)
+    if n < 2:
+        return pos
+    # Une entrée par paire de sommets, sans les boucles
+    pairs = sp.triu(adjacency, k=1).tocoo()
+    rows, cols, weights = pairs.row, pairs.col, pairs.data
+    k = 1.0 / np.sqrt(mass.sum())
+    extent = max(float((pos.max(axis=0) - pos.min(axis=0)).max()), k)
+    for step in range(iterations):
+        displacement = _repulsion(pos, mass, k, grid_size)
+        # Gravité vers le barycentre pondéré : les grosses communautés restent au centre
+        displacement -= gravity * mass[:, None] * (pos - mass @ pos / mass.sum())
+        delta = pos[cols] - pos[rows]
+        pull = delta * (weights * np.sqrt((delta ** 2).sum(axis=1)) / k)[:, None]
+        for axis in range(2):
+            displacement[:, axis] += np.bincount(rows, pull[:, axis], minlength=n) - np.bincount(cols, pull[:, axis], minlength=n)
+        displacement /= mass[:, None]
+        # Pas borné par la température, qui décroît linéairement jusqu'à zéro
+        limit = temperature * extent * (1 - step / iterations)
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-12)
+        pos += displacement * (np.minimum(length, limit) / length)[:, None]
+    return pos
+
+def multilevel_layout(adjacency, labels, coarse_iterations=100, iterations=30, grid_size=256, seed=0):
+    """ Two-level layout: the community graph is laid out first, then every node starts around its
+    community and the whole graph is refined with a few cooler iterations. Returns (positions, community positions). """
+    rng = np.random.default_rng(seed)
+    coarse, sizes = coarsen(adjacency, labels)
+    coarse_pos = force_layout(coarse, mass=sizes, iterations=coarse_iterations, grid_size=grid_size, seed=seed)
+    # Placement initial dans un disque dont l'aire suit la taille de la communauté
+    k = 1.0 / np.sqrt(max(len(labels), 1))
+    radius = k * np.sqrt(sizes[labels]) * np.sqrt(rng.random(len(labels)))
+    angle = rng.random(len(labels)) * 2 * np.pi
+    pos = coarse_pos[labels] + radius[:, None] * np.stack([np.cos(angle), np.sin(angle)], axis=1)
+    pos = force_layout(adjacency, pos, iterations=iterations, temperature=0.02, grid_size=grid_size, seed=seed)
+    return pos, coarse_pos
+
+def cached_layout(graph, labels, cache_directory=DEFAULT_LAYOUT_DIRECTORY, weight=None, iterations=30, grid_size=256, seed=0):
+    """ multilevel_layout of a CompactGraph, reusing the positions saved for the same graph content, partition and parameters.
+
+    Returns (positions, community positions, info); positions are aligned on the node indices of the graph.
+    """
+    order = _canonical_order(graph)
+    fingerprint = graph_fingerprint(graph, weight, order)
+    partition = hashlib.sha256(np.ascontiguousarray(labels[order], dtype=np.int64).tobytes()).hexdigest()[:16]
+    parameters = f"{partition}_i{iterations}_g{grid_size}_s{seed}_{weight or 'unweighted'}_v{LAYOUT_VERSION}"
+    cache_path = os.path.join(cache_directory, f"{fingerprint}_{parameters}.npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as saved:
+            pos = np.empty((graph.num_nodes, 2))
+            pos[order] = saved['positions']
+            coarse_pos = saved['communities']
+            info = json.loads(saved['info'].item())
+        info['cached'] = True
+        return pos, coarse_pos, info
+
+    start_time = time.time()
+    pos, coarse_pos = multilevel_layout(symmetric_adjacency(graph, weight), labels, iterations=iterations, grid_size=grid_size, seed=seed)
+    info = {'nodes': graph.num_nodes, 'communities': len(coarse_pos), 'seconds': time.time() - start_time}
+    os.makedirs(cache_directory, exist_ok=True)
+    # Écriture dans un fichier temporaire (propre au processus) puis renommage : pas de cache à moitié écrit
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as f:
+        np.savez(f, positions=pos[order], communities=coarse_pos, info=np.array(json.dumps(info)))
+    os.replace(temporary_path, cache_path)
+    info['cached'] = False
+    return pos, coarse_pos, info
+
+def induced_subgraph(graph, nodes):
+    """ CompactGraph restricted to the given node indices (in that order), with their attribute columns. """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    remap = np.full(graph.num_nodes, -1, dtype=np.int64)
+    remap[nodes] = np.arange(len(nodes))
+    keep = (remap[graph.src] >= 0) & (remap[graph.dst] >= 0)
+    attributes = {name: np.asarray(column)[nodes] for name, column in graph.attributes.items()}
+    edge_attributes = {name: np.asarray(column)[keep] for name, column in graph.edge_attributes.items()}
+    return CompactGraph([graph.ids[i] for i in nodes], remap[graph.src[keep]], remap[graph.dst[keep]],
+                        graph.directed, attributes, edge_attributes)
+
+def draw_layout(pos, src, dst, colors, title=None, sizes=5, max_edges=200000, seed=0):
+    """ Draw nodes as one rasterized scatter and edges as one rasterized LineCollection (at most max_edges,
+    sampled at random), so the drawing time grows linearly and the saved file stays small. Returns the figure. """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+    src, dst = np.asarray(src), np.asarray(dst)
+    if len(src) > max_edges:
+        sample = np.sort(np.random.default_rng(seed).choice(len(src), max_edges, replace=False))
+        src, dst = src[sample], dst[sample]
+    figure, ax = plt.subplots(figsize=(12, 12))
+    ax.add_collection(LineCollection(np.stack([pos[src], pos[dst]], axis=1), colors='grey',
+                                     linewidths=0.2, alpha=0.3, rasterized=True, zorder=1))
+    ax.scatter(pos[:, 0], pos[:, 1], s=sizes, c=colors, cmap='jet', alpha=0.6, linewidths=0, rasterized=True, zorder=2)
+    ax.autoscale_view()
+    ax.set_aspect('equal')
+    ax.set_axis_off()
+    if title:
+        ax.set_title(title)
+    return figure
@@ -0,0 +1,99 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from tqdm import tqdm
+
+
+def default_workers():
+    """ Number of worker processes used when none is given (all available cores). """
+    return os.cpu_count() or 1
+
+
+def add_workers_argument(parser):
+    """ Add the shared --workers option to an argparse parser. """
+    parser.add_argument('--workers', type=int, default=default_workers(),
+                        help="Nombre de processus en parallèle (défaut : tous les cœurs)")
+    return parser
+
+
+def _run_isolated(func, task, initializer=None, initargs=()):
+    """ func(*task) in its own single-worker pool: a crash (e.g. out of memory) only breaks this pool. """
+    with ProcessPoolExecutor(max_workers=1, initializer=initializer, initargs=initargs) as executor:
+        return executor.submit(func, *task).result()
+
+
+def run_sharded(func, tasks, workers=None, retries=2, desc="Traitement des fichiers", initializer=None, initargs=(), unit="fichier"):
+    """ Run func(*task) for every task on a process pool, retrying each failed shard on its own.
+
+    initializer(*initargs) runs once in every worker (or once in the current process when running
+    serially), e.g. to share a large read-only structure instead of sending it with every task.
+    Returns (results, failures): results are aligned with tasks (None for a shard that kept failing)
+    and failures lists the (task, exception) pairs that exhausted their retries. When a worker dies
+    and breaks the pool, the shards it left unfinished are rerun one at a time in their own pool, so
+    the failure is charged to the shard that caused it.
+    """
+    tasks = [task if isinstance(task, tuple) else (task,) for task in tasks]
+    workers = workers or default_workers()
+    results = [None] * len(tasks)
+    attempts = [0] * len(tasks)
+    errors = {}
+    pending = list(range(len(tasks)))
+
+    initialized = False
+    with tqdm(total=len(tasks), desc=desc, unit=unit) as progress:
+        while pending:
+            retry = []
+
+            def record_failure(index, error):
+                attempts[index] += 1
+                if attempts[index] <= retries:
+                    tqdm.write(f"Échec sur {tasks[index]} ({error}), nouvelle tentative {attempts[index]}/{retries}.")
+                    retry.append(index)
+                else:
+                    errors[index] = error
+                    progress.update(1)
+
+            if workers == 1:
+                # Pas de pool pour un seul processus : même logique, dans le processus courant
+                if initializer is not None and not initialized:
+                    initializer(*initargs)
+                    initialized = True
+                for index in pending:
+                    try:
+                        results[index] = func(*tasks[index])
+                        progress.update(1)
+                    except Exception as e:
+                        record_failure(index, e)
+            else:
+                # Un nouveau pool par tour : un processus tué (mémoire) ne bloque pas les tentatives suivantes
+                with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=initializer, initargs=initargs) as executor:
+                    futures = {executor.submit(func, *tasks[index]): index for index in pending}
+                    interrupted = []
+                    for future in as_completed(futures):
+                        index = futures[future]
+                        try:
+                            results[index] = future.result()
+                            progress.update(1)
+                        except BrokenProcessPool:
+                            # Un processus tué casse tout le pool : on ne sait pas encore quelle tâche en est la cause
+                            interrupted.append(index)
+                        except Exception as e:
+                            record_failure(index, e)
+                # Tâches interrompues relancées une par une, chacune dans son propre pool :
+                # l'échec n'est compté qu'à celle qui fait tomber son processus
+                for index in sorted(interrupted):
+                    try:
+                        results[index] = _run_isolated(func, tasks[index], initializer, initargs)
+                        progress.update(1)
+                    except Exception as e:
+                        record_failure(index, e)
+            pending = retry
+
+    failures = [(tasks[index], error) for index, error in sorted(errors.items())]
+    return results, failures
+
+
+def report_failures(failures):
+    """ Print the shards that could not be processed. """
+    for task, error in failures:
+        print(f"Le traitement de {task} a échoué : {error}")
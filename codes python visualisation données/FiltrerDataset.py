@@ -1,8 +1,175 @@
 import pandas as pd
+import numpy as np
+from pandas.api.types import union_categoricals
 import os
-import json
+import argparse
+from array import array
+from ExecutionParallele import add_workers_argument, run_sharded, report_failures
+from LireEnregistrements import iter_records, is_parquet, write_output
+from PipelinePretraitement import parse_year_range
+
+def iter_file_records(input_path, start_year=None, end_year=None, fos_list=None):
+    """ Stream the records of a JSON or Parquet file (Parquet skips year partitions and row groups without a wanted FOS). """
+    if is_parquet(input_path):
+        from StockageColonnaire import iter_parquet_records
+        return iter_parquet_records(input_path, start_year, end_year, fos_list)
+    return iter_records(input_path)
+
+def load_frame(input_path, start_year=None, end_year=None, fos_list=None):
+    """ Load a JSON or Parquet file once into a DataFrame. """
+    return pd.DataFrame.from_records(iter_file_records(input_path, start_year, end_year, fos_list)).reset_index(drop=True)
+
+def explode_column(data, column, key=None):
+    """ Flatten a list column into (row positions, categorical values) for vectorized membership tests. """
+    if column not in data.columns:
+        return np.empty(0, dtype=np.int64), pd.Categorical([])
+    exploded = data[column].explode().dropna()
+    if key is not None:
+        # Colonnes de dictionnaires (auteurs) : extraire le champ voulu, lui-même éventuellement une liste
+        exploded = exploded.str.get(key).explode().dropna()
+    return exploded.index.to_numpy(), pd.Categorical(exploded.astype(str))
+
+def membership_mask(num_rows, exploded, values):
+    """ True for rows having at least one exploded value in values (compared on category codes). """
+    rows, categories = exploded
+    wanted = categories.categories.get_indexer(list(values))
+    hits = np.isin(categories.codes, wanted[wanted >= 0])
+    mask = np.zeros(num_rows, dtype=bool)
+    mask[rows[hits]] = True
+    return mask
+
+class ExplodedColumns:
+    """ Cache of the exploded FOS/author/org columns of a DataFrame, reused across filters. """
+
+    def __init__(self, data):
+        self.data = data
+        self.cache = {}
+
+    def get(self, name):
+        if name not in self.cache:
+            if name == 'fos':
+                self.cache[name] = explode_column(self.data, 'fos')
+            elif name == 'authors':
+                rows_id, values_id = explode_column(self.data, 'authors', '_id')
+                rows_name, values_name = explode_column(self.data, 'authors', 'name')
+                self.cache[name] = (np.concatenate([rows_id, rows_name]), union_categoricals([values_id, values_name]))
+            elif name == 'orgs':
+                rows_org, values_org = explode_column(self.data, 'authors', 'org')
+                rows_orgs, values_orgs = explode_column(self.data, 'authors', 'orgs')
+                self.cache[name] = (np.concatenate([rows_org, rows_orgs]), union_categoricals([values_org, values_orgs]))
+        return self.cache[name]
+
+def build_mask(data, start_year=None, end_year=None, fos_list=None, authors=None, orgs=None, exploded=None):
+    """ Combine year range AND FOS AND author AND org predicates into a single boolean mask. """
+    exploded = exploded or ExplodedColumns(data)
+    mask = np.ones(len(data), dtype=bool)
+    if start_year is not None or end_year is not None:
+        years = pd.to_numeric(data['year'], errors='coerce') if 'year' in data.columns else pd.Series(np.nan, index=data.index)
+        if start_year is not None:
+            mask &= (years >= start_year).to_numpy()
+        if end_year is not None:
+            mask &= (years <= end_year).to_numpy()
+    if fos_list:
+        mask &= membership_mask(len(data), exploded.get('fos'), fos_list)
+    if authors:
+        mask &= membership_mask(len(data), exploded.get('authors'), authors)
+    if orgs:
+        mask &= membership_mask(len(data), exploded.get('orgs'), orgs)
+    return mask
+
+def frame_records(data):
+    """ Yield the rows of a DataFrame as JSON records, dropping the NaN cells. """
+    for record in data.to_dict(orient='records'):
+        record = {k: v for k, v in record.items() if not (isinstance(v, float) and np.isnan(v))}
+        if isinstance(record.get('year'), float):
+            # Une colonne year avec des valeurs manquantes est passée en flottant
+            record['year'] = int(record['year'])
+        yield record
+
+def filter_file(input_path, output_path, start_year=None, end_year=None, fos_list=None, authors=None, orgs=None):
+    """ Read a file once, apply every predicate in a single vectorized pass and save the result. """
+    data = load_frame(input_path, start_year, end_year, fos_list)
+    data_filtered = data[build_mask(data, start_year, end_year, fos_list, authors, orgs)] if len(data) else data
+    write_output(frame_records(data_filtered), output_path)
+    return output_path
+
+class FileIndex:
+    """ Year and FOS index of one file, built in a streaming pass: enough to compute the masks of the
+    interactive menu without keeping the records in memory (they are streamed again when written). """
+
+    def __init__(self, input_path):
+        self.input_path = input_path
+        years, fos_rows, fos_codes, vocabulary = [], array('i'), array('i'), {}
+        for row, record in enumerate(iter_file_records(input_path)):
+            years.append(record.get('year'))
+            fos = record.get('fos')
+            for value in fos if isinstance(fos, list) else []:
+                if value is not None:
+                    fos_rows.append(row)
+                    fos_codes.append(vocabulary.setdefault(str(value), len(vocabulary)))
+        # Même conversion que build_mask : une année illisible devient NaN
+        self.years = pd.to_numeric(pd.Series(years, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+        self.fos = (np.frombuffer(fos_rows, dtype=np.int32).astype(np.int64),
+                    pd.Categorical.from_codes(np.frombuffer(fos_codes, dtype=np.int32), categories=list(vocabulary)))
+
+    def __len__(self):
+        return len(self.years)
+
+    def mask(self, start_year=None, end_year=None, fos_list=None):
+        mask = np.ones(len(self), dtype=bool)
+        if start_year is not None:
+            mask &= self.years >= start_year
+        if end_year is not None:
+            mask &= self.years <= end_year
+        if fos_list:
+            mask &= membership_mask(len(self), self.fos, fos_list)
+        return mask
+
+def write_selected_rows(input_path, output_path, rows):
+    """ Stream a file again and write only the records at the given (sorted) positions. """
+    selected = np.zeros(int(rows[-1]) + 1 if len(rows) else 0, dtype=bool)
+    selected[rows] = True
+    records = (record for row, record in enumerate(iter_file_records(input_path)) if row < len(selected) and selected[row])
+    write_output(records, output_path)
+    return output_path
+
+def filter_label(start_year=None, end_year=None, fos_list=None, authors=None, orgs=None):
+    """ Build the output subfolder name describing the predicates. """
+    parts = []
+    if start_year is not None or end_year is not None:
+        parts.append(f"{'' if start_year is None else start_year}-{'' if end_year is None else end_year}")
+    for values in (fos_list, authors, orgs):
+        if values:
+            parts.append(','.join(values))
+    return "Filtered_by_" + "_".join(parts)
+
+def list_input_files(source_directory):
+    return [filename for filename in os.listdir(source_directory) if filename.endswith(".json") or is_parquet(filename)]
+
+def filtered_filename(filename):
+    base = filename[:-len('.parquet')] if is_parquet(filename) else filename.replace('.json', '')
+    return f"{base}_Filtered" + ('.parquet' if is_parquet(filename) else '.json')
+
+def filter_dataset(source_directory, output_directory, workers=1, start_year=None, end_year=None, fos_list=None, authors=None, orgs=None):
+    """ Non-interactive filtering: every file is read once and all predicates are combined (AND). """
+    full_output_directory = os.path.join(output_directory, filter_label(start_year, end_year, fos_list, authors, orgs))
+    os.makedirs(full_output_directory, exist_ok=True)
+
+    tasks = [(os.path.join(source_directory, filename), os.path.join(full_output_directory, filtered_filename(filename)),
+              start_year, end_year, fos_list, authors, orgs)
+             for filename in list_input_files(source_directory)]
+    results, failures = run_sharded(filter_file, tasks, workers, desc="Filtrage des fichiers")
+    report_failures(failures)
+    return [output_path for output_path in results if output_path]
+
+def filter_files(source_directory, output_directory, workers=1):
+    # Seuls les index années/FOS restent en mémoire ; les enregistrements sont relus à l'écriture
+    filenames = list_input_files(source_directory)
+    indexes, failures = run_sharded(FileIndex, [os.path.join(source_directory, filename) for filename in filenames],
+                                    workers, desc="Indexation des fichiers")
+    report_failures(failures)
+    loaded = [(filename, index) for filename, index in zip(filenames, indexes) if index is not None]
 
-def filter_files(source_directory, output_directory):
     while True:
         print("\nOptions de filtrage des données:")
         print("1 - Filtrer pour une année précise")
@@ -11,52 +178,52 @@ def filter_files(source_directory, output_directory):
         print("4 - Filtrer pour les années postérieures à une année donnée")
         print("5 - Filtrer par Field of Study (FOS)")
         print("7 - Quitter")
-        
+
         choice = input("Entrez votre choix (1-7): ")
-        
+
         if choice == '7':
             print("Annulation de l'opération.")
             break
-        
+
+        if choice not in ['1', '2', '3', '4', '5']:
+            print("Choix invalide.")
+            continue
+
+        start_year = end_year = None
         if choice in ['1', '3', '4']:
             year = int(input("Entrez l'année: "))
+            start_year, end_year = {'1': (year, year), '3': (None, year - 1), '4': (year + 1, None)}[choice]
+            label = year
         elif choice == '2':
             year_range = input("Entrez la plage d'années (ex: 2017-2020): ")
             start_year, end_year = map(int, year_range.split('-'))
+            label = f"{start_year}-{end_year}"
         fos_list = []
         if choice == '5':
             fos_input = input("Entrez les Fields of Study à filtrer, séparés par des virgules (ex: Computer Science, Mathematics): ")
             fos_list = [fos.strip() for fos in fos_input.split(',')]
+            label = ','.join(fos_list)
 
-        for filename in os.listdir(source_directory):
-            if filename.endswith(".json"):
-                input_path = os.path.join(source_directory, filename)
-                data = pd.read_json(input_path)  # Charger le fichier JSON dans un DataFrame
-                
-                # Conversion des NaN en None pour compatibilité JSON
-                data = data.where(pd.notnull(data), None)
-                
-                subfolder_name = f"Filtered_by_{choice}_{year if choice in ['1', '3', '4'] else '-'.join(map(str, [start_year, end_year])) if choice == '2' else ','.join(fos_list)}"
-                full_output_directory = os.path.join(output_directory, subfolder_name)
-                os.makedirs(full_output_directory, exist_ok=True)
-
-                output_filename = f"{filename.replace('.json', '')}_Filtered.json"
-                output_path = os.path.join(full_output_directory, output_filename)
-
-                if choice in ['1', '3', '4']:
-                    data_filtered = data[data["year"] == year if choice == '1' else (data["year"] < year if choice == '3' else data["year"] > year)]
-                elif choice == '2':
-                    data_filtered = data[(data["year"] >= start_year) & (data["year"] <= end_year)]
-                elif choice == '5':
-                    data_filtered = data[data['fos'].apply(lambda x: any(f in x for f in fos_list) if isinstance(x, list) else False)]
-
-                # Sauvegarder avec le bon format JSON
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(data_filtered.to_dict(orient='records'), f, indent=4)
+        full_output_directory = os.path.join(output_directory, f"Filtered_by_{choice}_{label}")
+        os.makedirs(full_output_directory, exist_ok=True)
 
+        tasks = [(index.input_path, os.path.join(full_output_directory, filtered_filename(filename)),
+                  np.flatnonzero(index.mask(start_year, end_year, fos_list)))
+                 for filename, index in loaded]
+        results, failures = run_sharded(write_selected_rows, tasks, workers, desc="Écriture des fichiers filtrés")
+        report_failures(failures)
+        for output_path in results:
+            if output_path:
                 print(f"Fichier traité et enregistré sous : {output_path}")
 
 if __name__ == "__main__":
+    parser = add_workers_argument(argparse.ArgumentParser(description="Filtrer les fichiers nettoyés par année, FOS, auteur ou organisation."))
+    parser.add_argument('--years', help="Année ou plage d'années (ex: 2020, 2017-2020, -2019, 2021-)")
+    parser.add_argument('--fos', help="Fields of Study séparés par des virgules")
+    parser.add_argument('--authors', help="Identifiants ou noms d'auteurs séparés par des virgules")
+    parser.add_argument('--orgs', help="Organisations séparées par des virgules")
+    args = parser.parse_args()
+
     # Obtenir le chemin du répertoire du script
     current_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -65,7 +232,15 @@ if __name__ == "__main__":
     # Chemin relatif du dossier de sortie
     output_directory = os.path.join(current_dir, '..', 'Dataset', 'Split_filtré')
 
-    filter_files(source_directory, output_directory)
+    if args.years or args.fos or args.authors or args.orgs:
+        # Mode non interactif : tous les critères sont combinés en un seul passage
+        start_year, end_year = parse_year_range(args.years) if args.years else (None, None)
+        split = lambda value: [v.strip() for v in value.split(',')] if value else None
+        for output_path in filter_dataset(source_directory, output_directory, args.workers, start_year, end_year,
+                                          split(args.fos), split(args.authors), split(args.orgs)):
+            print(f"Fichier traité et enregistré sous : {output_path}")
+    else:
+        filter_files(source_directory, output_directory, args.workers)
 
 
 
@@ -0,0 +1,225 @@
+import re
+import datetime
+from array import array
+import numpy as np
+from lxml import etree
+from GrapheCompact import CompactGraph, IdInterner
+
+GEXF_NAMESPACE = 'http://www.gexf.net/1.2draft'
+
+# Caractères interdits en XML 1.0 (fréquents dans les titres bruts) : supprimés à l'écriture
+_INVALID_XML = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', '\n': '&#10;', '\r': '&#13;', '\t': '&#9;'})
+
+def _escape(value):
+    return _INVALID_XML.sub('', str(value)).translate(_ESCAPES)
+
+def _gexf_type(column):
+    from FormatBinaireGraphe import _value_dtype
+    column = np.asarray(column)
+    # Colonne objet (valeurs absentes) : type choisi d'après les valeurs présentes
+    dtype = _value_dtype(column) if column.dtype == object else column.dtype
+    if dtype is None:
+        return 'string'
+    if dtype == bool:
+        return 'boolean'
+    if np.issubdtype(dtype, np.integer):
+        return 'long'
+    if np.issubdtype(dtype, np.floating):
+        return 'double'
+    return 'string'
+
+def _formatted(column, gexf_type):
+    """ Attribute values of a column as escaped strings (None where the value is missing). """
+    if gexf_type == 'boolean':
+        return [None if value is None else 'true' if value else 'false' for value in column.tolist()]
+    if gexf_type in ('long', 'double'):
+        convert = float if gexf_type == 'double' else int
+        return [None if value is None else repr(convert(value)) for value in column.tolist()]
+    return [None if value is None else _escape(value) for value in column]
+
+def _attvalues(columns, first, last):
+    """ <attvalues> block of every item in [first, last) (empty string for an item without values). """
+    blocks = [[] for _ in range(last - first)]
+    for key, (column, gexf_type) in columns.items():
+        for values, value in zip(blocks, _formatted(column[first:last], gexf_type)):
+            if value is not None:
+                values.append(f'<attvalue for="{key}" value="{value}" />')
+    return [f"<attvalues>{''.join(values)}</attvalues>" if values else '' for values in blocks]
+
+def write_gexf(graph, file_path, chunk_size=65536):
+    """ Write a graph (CompactGraph or NetworkX) as GEXF 1.2 with bounded memory.
+
+    Nodes and edges are written straight from the arrays and attribute columns, by chunks of
+    chunk_size, without building an XML tree. The layout is the one of nx.write_gexf (the edge
+    weight is an edge attribute, the other columns are declared attributes), so Gephi and
+    nx.read_gexf read it the same way.
+    """
+    if not isinstance(graph, CompactGraph):
+        from FormatBinaireGraphe import from_networkx
+        graph = from_networkx(graph)
+    node_columns = {name: column for name, column in graph.attributes.items() if name != 'label'}
+    edge_columns = {name: column for name, column in graph.edge_attributes.items() if name not in ('weight', 'id')}
+    declared = {}
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write("<?xml version='1.0' encoding='utf-8'?>\n")
+        f.write(f'<gexf xmlns="{GEXF_NAMESPACE}" version="1.2">\n')
+        f.write(f'  <meta lastmodifieddate="{datetime.date.today().isoformat()}">\n    <creator>FluxGEXF</creator>\n  </meta>\n')
+        f.write(f'  <graph defaultedgetype="{"directed" if graph.directed else "undirected"}" mode="static" name="">\n')
+        for class_name, columns in (('edge', edge_columns), ('node', node_columns)):
+            if not columns:
+                continue
+            f.write(f'    <attributes mode="static" class="{class_name}">\n')
+            declared[class_name] = {}
+            for name, column in columns.items():
+                key = str(sum(len(keys) for keys in declared.values()))
+                gexf_type = _gexf_type(column)
+                declared[class_name][key] = (column, gexf_type)
+                f.write(f'      <attribute id="{key}" title="{_escape(name)}" type="{gexf_type}" />\n')
+            f.write('    </attributes>\n')
+
+        f.write('    <nodes>\n')
+        labels = graph.attributes.get('label')
+        for first in range(0, graph.num_nodes, chunk_size):
+            last = min(first + chunk_size, graph.num_nodes)
+            values = _attvalues(declared.get('node', {}), first, last)
+            lines = []
+            for node in range(first, last):
+                node_id = _escape(graph.ids[node])
+                label = node_id if labels is None or labels[node] is None else _escape(labels[node])
+                lines.append(f'      <node id="{node_id}" label="{label}">{values[node - first]}</node>\n')
+            f.write(''.join(lines))
+        f.write('    </nodes>\n')
+
+        f.write('    <edges>\n')
+        weights = graph.edge_attributes.get('weight')
+        for first in range(0, len(graph.src), chunk_size):
+            last = min(first + chunk_size, len(graph.src))
+            values = _attvalues(declared.get('edge', {}), first, last)
+            sources = graph.src[first:last].tolist()
+            targets = graph.dst[first:last].tolist()
+            # Arête sans poids (None) : attribut omis, relu comme un poids de 1.0
+            weight_values = [''] * (last - first) if weights is None else [
+                '' if w is None else f' weight="{float(w)!r}"' for w in np.asarray(weights[first:last]).tolist()]
+            f.write(''.join(
+                f'      <edge source="{_escape(graph.ids[u])}" target="{_escape(graph.ids[v])}" id="{first + k}"{weight_values[k]}>{values[k]}</edge>\n'
+                for k, (u, v) in enumerate(zip(sources, targets))))
+        f.write('    </edges>\n  </graph>\n</gexf>\n')
+    return file_path
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+def _convert(value, gexf_type):
+    if value is None:
+        return None
+    try:
+        if gexf_type in ('integer', 'long', 'short', 'byte'):
+            return int(value)
+        if gexf_type in ('float', 'double'):
+            return float(value)
+    except ValueError:
+        return value
+    if gexf_type == 'boolean':
+        return value.strip().lower() in ('true', '1')
+    return value
+
+class _Columns:
+    """ Attribute columns filled item by item, missing values left as None. """
+
+    def __init__(self):
+        self.columns = {}
+        self.count = 0
+
+    def append(self, values):
+        for name, value in values.items():
+            if name not in self.columns:
+                self.columns[name] = [None] * self.count
+            self.columns[name].append(value)
+        self.count += 1
+        for column in self.columns.values():
+            if len(column) < self.count:
+                column.append(None)
+
+def read_gexf(file_path, recover=True):
+    """ Read a GEXF file as a CompactGraph with lxml iterparse, with bounded memory beyond the graph itself.
+
+    Each <node> and <edge> element is turned into array entries and attribute column values as soon
+    as it is complete, then cleared with its already read siblings, so the document tree never grows.
+    Labels are kept in a 'label' column only when they differ from the ids; edge ids are dropped.
+    With recover=True, XML errors (e.g. invalid characters written by other tools) are skipped.
+    """
+    from FormatBinaireGraphe import _column
+    interner = IdInterner()
+    src, dst = array('i'), array('i')
+    declarations = {'node': {}, 'edge': {}}
+    node_values, edge_values = _Columns(), _Columns()
+    labels = {}
+    directed = False
+
+    def node_index(node_id):
+        node = interner.intern(node_id)
+        if node == node_values.count:
+            # Sommet seulement cité par une arête : ajouté sans attributs, comme dans NetworkX
+            node_values.append({})
+        return node
+
+    def attvalues(element, class_name):
+        values = {}
+        for attvalue in element.iterfind('{*}attvalues/{*}attvalue'):
+            key = attvalue.get('for', attvalue.get('id'))
+            title, gexf_type, _ = declarations[class_name].get(key, (key, 'string', None))
+            values[title] = _convert(attvalue.get('value'), gexf_type)
+        for title, gexf_type, default in declarations[class_name].values():
+            if default is not None and title not in values:
+                values[title] = _convert(default, gexf_type)
+        return values
+
+    # Seuls ces éléments produisent des événements ; les <attvalue> sont lus depuis leur sommet ou arête
+    tags = ('{*}graph', '{*}attribute', '{*}node', '{*}edge')
+    for event, element in etree.iterparse(file_path, events=('start', 'end'), tag=tags, recover=recover, huge_tree=True):
+        tag = _local(element.tag)
+        if event == 'start':
+            if tag == 'graph':
+                directed = element.get('defaultedgetype') == 'directed'
+            continue
+        attribute_class = element.getparent().get('class') if tag == 'attribute' else None
+        if tag == 'attribute' and attribute_class in declarations:
+            default = element.findtext('{*}default')
+            declarations[attribute_class][element.get('id')] = (element.get('title'), element.get('type', 'string'), default)
+        elif tag == 'node':
+            node_id = element.get('id')
+            values = attvalues(element, 'node')
+            node = interner.intern(node_id)
+            if node < node_values.count:
+                # Sommet déjà créé par une arête lue plus tôt : ses attributs remplacent les valeurs vides
+                for name, value in values.items():
+                    if name not in node_values.columns:
+                        node_values.columns[name] = [None] * node_values.count
+                    node_values.columns[name][node] = value
+            else:
+                node_values.append(values)
+            if element.get('label') not in (None, node_id):
+                labels[node] = element.get('label')
+        elif tag == 'edge':
+            values = attvalues(element, 'edge')
+            if element.get('weight') is not None:
+                values['weight'] = float(element.get('weight'))
+            src.append(node_index(element.get('source')))
+            dst.append(node_index(element.get('target')))
+            edge_values.append(values)
+        else:
+            continue
+        # Libérer l'élément et ceux déjà lus avant lui : l'arbre reste de taille constante
+        element.clear(keep_tail=True)
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+    attributes = {name: _column(values) for name, values in sorted(node_values.columns.items())}
+    if labels:
+        attributes['label'] = _column([labels.get(node) for node in range(len(interner))])
+    edge_attributes = {name: _column(values) for name, values in sorted(edge_values.columns.items())}
+    if 'weight' in edge_attributes:
+        weights = edge_attributes['weight']
+        edge_attributes['weight'] = np.array([1.0 if w is None else w for w in weights], dtype=np.float64) if weights.dtype == object else weights.astype(np.float64)
+    return CompactGraph(list(interner.ids), src, dst, directed, attributes, edge_attributes)
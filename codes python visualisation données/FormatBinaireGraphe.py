@@ -0,0 +1,204 @@
+import os
+import json
+import shutil
+import numpy as np
+import scipy.sparse as sp
+from GrapheCompact import CompactGraph
+
+# Version du format, à incrémenter si la disposition des fichiers change
+SNAPSHOT_VERSION = 1
+
+def snapshot_path(gexf_path):
+    """ Snapshot directory stored next to a GEXF file: graph.gexf -> graph.graph """
+    return os.path.splitext(gexf_path)[0] + '.graph'
+
+def has_fresh_snapshot(gexf_path):
+    """ True when a snapshot exists and is not older than the GEXF file. """
+    meta_path = os.path.join(snapshot_path(gexf_path), 'meta.json')
+    if not os.path.exists(meta_path):
+        return False
+    return not os.path.exists(gexf_path) or os.path.getmtime(meta_path) >= os.path.getmtime(gexf_path)
+
+def _save_strings(directory, name, values):
+    # Chaînes concaténées en UTF-8 + décalages : lisible par memmap, sans objets Python
+    encoded = [b'' if value is None else str(value).encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    with open(os.path.join(directory, f'{name}.bin'), 'wb') as blob:
+        blob.write(b''.join(encoded))
+    np.save(os.path.join(directory, f'{name}.offsets.npy'), offsets)
+    np.save(os.path.join(directory, f'{name}.valid.npy'), np.array([value is not None for value in values], dtype=bool))
+
+def _load_strings(directory, name):
+    offsets = np.load(os.path.join(directory, f'{name}.offsets.npy'))
+    valid = np.load(os.path.join(directory, f'{name}.valid.npy'))
+    with open(os.path.join(directory, f'{name}.bin'), 'rb') as blob:
+        data = blob.read()
+    values = np.empty(len(valid), dtype=object)
+    bounds = zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    text = data.decode('utf-8')
+    if len(text) == len(data):
+        # Texte ASCII : un seul décodage, découpé aux mêmes positions
+        values[:] = [text[start:end] for start, end in bounds]
+    else:
+        values[:] = [data[start:end].decode('utf-8') for start, end in bounds]
+    values[~valid] = None
+    return values
+
+def _save_columns(directory, prefix, columns):
+    kinds = {}
+    for name, column in columns.items():
+        column = np.asarray(column)
+        file_name = f'{prefix}.{len(kinds)}'
+        dtype = _value_dtype(column) if column.dtype == object else None
+        if dtype is not None:
+            # Colonne numérique ou booléenne avec des valeurs absentes : tableau typé + masque des valeurs présentes
+            valid = np.array([value is not None for value in column], dtype=bool)
+            data = np.zeros(len(column), dtype=dtype)
+            data[valid] = column[valid].tolist()
+            np.save(os.path.join(directory, f'{file_name}.npy'), data)
+            np.save(os.path.join(directory, f'{file_name}.valid.npy'), valid)
+            kinds[name] = {'file': file_name, 'kind': 'masked'}
+        elif column.dtype == object:
+            _save_strings(directory, file_name, column)
+            kinds[name] = {'file': file_name, 'kind': 'string'}
+        else:
+            np.save(os.path.join(directory, f'{file_name}.npy'), column)
+            kinds[name] = {'file': file_name, 'kind': 'array'}
+    return kinds
+
+def _load_columns(directory, kinds, mmap_mode):
+    columns = {}
+    for name, description in kinds.items():
+        if description['kind'] == 'string':
+            columns[name] = _load_strings(directory, description['file'])
+        elif description['kind'] == 'masked':
+            values = np.load(os.path.join(directory, f"{description['file']}.npy")).astype(object)
+            values[~np.load(os.path.join(directory, f"{description['file']}.valid.npy"))] = None
+            columns[name] = values
+        else:
+            columns[name] = np.load(os.path.join(directory, f"{description['file']}.npy"), mmap_mode=mmap_mode)
+    return columns
+
+def save_snapshot(graph, path):
+    """ Write a CompactGraph as a snapshot directory (edge arrays, CSR, id table, attribute columns).
+
+    The snapshot is written into a sibling temporary directory that then replaces the previous one,
+    so an interrupted rewrite never mixes old and new files.
+    """
+    path = path.rstrip(os.sep)
+    # Dossiers temporaires propres au processus : deux processus peuvent écrire le même instantané
+    final_path, path = path, f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    adjacency = graph.to_csr()
+    np.save(os.path.join(path, 'src.npy'), graph.src)
+    np.save(os.path.join(path, 'dst.npy'), graph.dst)
+    np.save(os.path.join(path, 'csr_indptr.npy'), adjacency.indptr.astype(np.int64))
+    np.save(os.path.join(path, 'csr_indices.npy'), adjacency.indices.astype(np.int32))
+    _save_strings(path, 'ids', graph.ids)
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        'directed': graph.directed,
+        'num_nodes': graph.num_nodes,
+        'node_attributes': _save_columns(path, 'node', graph.attributes),
+        'edge_attributes': _save_columns(path, 'edge', graph.edge_attributes),
+    }
+    # meta.json est écrit en dernier : sa présence signale un instantané complet
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=4)
+    # L'ancien instantané est écarté avant le renommage : un dossier non vide ne peut pas être remplacé
+    previous_path = f"{final_path}.{os.getpid()}.old"
+    shutil.rmtree(previous_path, ignore_errors=True)
+    if os.path.exists(final_path):
+        os.replace(final_path, previous_path)
+    os.replace(path, final_path)
+    shutil.rmtree(previous_path, ignore_errors=True)
+
+def load_snapshot(path, mmap=True):
+    """ Load a snapshot as a CompactGraph; numeric arrays are memory-mapped (shared between processes). """
+    with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Version d'instantané non prise en charge : {meta.get('version')}")
+    mmap_mode = 'r' if mmap else None
+    graph = CompactGraph(
+        list(_load_strings(path, 'ids')),
+        np.load(os.path.join(path, 'src.npy'), mmap_mode=mmap_mode),
+        np.load(os.path.join(path, 'dst.npy'), mmap_mode=mmap_mode),
+        directed=meta['directed'],
+        attributes=_load_columns(path, meta['node_attributes'], mmap_mode),
+        edge_attributes=_load_columns(path, meta['edge_attributes'], mmap_mode),
+    )
+    # La matrice CSR non pondérée est reprise telle quelle, sans reconstruction
+    n = meta['num_nodes']
+    indptr = np.load(os.path.join(path, 'csr_indptr.npy'), mmap_mode=mmap_mode)
+    indices = np.load(os.path.join(path, 'csr_indices.npy'), mmap_mode=mmap_mode)
+    graph._csr[None] = sp.csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr), shape=(n, n))
+    return graph
+
+def _value_dtype(values):
+    """ bool, int64 or float64 when every present (not None) value is of that kind, None otherwise. """
+    present = [value for value in values if value is not None]
+    if not present:
+        return None
+    if all(isinstance(value, (bool, np.bool_)) for value in present):
+        return np.dtype(bool)
+    if any(isinstance(value, (bool, np.bool_)) for value in present):
+        return None
+    if all(isinstance(value, (int, np.integer)) for value in present):
+        return np.dtype(np.int64)
+    if all(isinstance(value, (int, float, np.integer, np.floating)) for value in present):
+        return np.dtype(np.float64)
+    return None
+
+def _column(values):
+    """ Typed column when every value is an int/float/bool, string column otherwise.
+
+    A numeric or boolean column with missing values is kept as an object column of native values
+    (None where missing), so its type survives the GEXF and snapshot round trips.
+    """
+    dtype = _value_dtype(values)
+    if dtype is not None and all(value is not None for value in values):
+        return np.array(values, dtype=dtype)
+    column = np.empty(len(values), dtype=object)
+    if dtype is not None:
+        column[:] = [None if value is None else dtype.type(value).item() for value in values]
+    else:
+        column[:] = [value if value is None or isinstance(value, str) else str(value) for value in values]
+    return column
+
+def from_networkx(graph):
+    """ Convert a NetworkX graph (e.g. read from GEXF) into a CompactGraph, keeping all attributes. """
+    ids = list(graph.nodes())
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    node_names = sorted({name for _, data in graph.nodes(data=True) for name in data})
+    attributes = {name: _column([data.get(name) for _, data in graph.nodes(data=True)]) for name in node_names}
+    edges = list(graph.edges(data=True))
+    src = np.array([index[u] for u, _, _ in edges], dtype=np.int32)
+    dst = np.array([index[v] for _, v, _ in edges], dtype=np.int32)
+    edge_names = sorted({name for _, _, data in edges for name in data})
+    edge_attributes = {name: _column([data.get(name) for _, _, data in edges]) for name in edge_names}
+    return CompactGraph([str(node_id) for node_id in ids], src, dst, graph.is_directed(), attributes, edge_attributes)
+
+def write_snapshot_for(graph, gexf_path):
+    """ Write the snapshot next to a GEXF file, from a NetworkX graph or a CompactGraph. """
+    compact = graph if isinstance(graph, CompactGraph) else from_networkx(graph)
+    save_snapshot(compact, snapshot_path(gexf_path))
+    return snapshot_path(gexf_path)
+
+def load_compact(gexf_path):
+    """ CompactGraph for a GEXF file, from its snapshot when fresh (the GEXF is parsed and cached otherwise). """
+    if has_fresh_snapshot(gexf_path):
+        return load_snapshot(snapshot_path(gexf_path))
+    from FluxGEXF import read_gexf
+    compact = read_gexf(gexf_path)
+    try:
+        save_snapshot(compact, snapshot_path(gexf_path))
+    except OSError as e:
+        print(f"Impossible d'écrire l'instantané binaire : {e}")
+    return compact
+
+def load_networkx(gexf_path):
+    """ NetworkX graph for a GEXF file, built from the binary snapshot (written first when missing or stale). """
+    return load_compact(gexf_path).to_networkx()
@@ -1,26 +1,24 @@
 import os
-import json
+import argparse
+from LireEnregistrements import iter_directory_records, write_output, output_filename
 
-def merge_json_files(source_directory, output_directory):
-    merged_data = []
+def merge_json_files(source_directory, output_directory, output_format='json'):
     # Extraire le nom du dossier pour le fichier de sortie
     folder_name = os.path.basename(source_directory)
-    output_file_name = f"{folder_name}_merged.json"
+    output_file_name = output_filename(f"{folder_name}_merged.json", output_format)
     output_file_path = os.path.join(output_directory, output_file_name)
 
-    for filename in os.listdir(source_directory):
-        if filename.endswith(".json"):
-            file_path = os.path.join(source_directory, filename)
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-                merged_data.extend(data)
+    # Enchaîner les enregistrements de tous les fichiers sans les charger en mémoire
+    merged_records = (record for _, record in iter_directory_records(source_directory))
+    write_output(merged_records, output_file_path)
 
-    with open(output_file_path, 'w', encoding='utf-8') as output_file:
-        json.dump(merged_data, output_file, indent=4)
-
-    print(f"Tous les fichiers JSON ont été fusionnés dans : {output_file_path}")
+    print(f"Tous les fichiers ont été fusionnés dans : {output_file_path}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fusionner les fichiers filtrés en un seul fichier.")
+    parser.add_argument('--format', choices=['json', 'parquet'], default='json', help="Format du fichier fusionné")
+    args = parser.parse_args()
+
     # Obtenir le chemin du répertoire du script
     current_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -34,6 +32,6 @@ if __name__ == "__main__":
         os.makedirs(output_directory)
 
     # Appel de la fonction pour fusionner les fichiers
-    merge_json_files(source_directory, output_directory)
+    merge_json_files(source_directory, output_directory, args.format)
 
 
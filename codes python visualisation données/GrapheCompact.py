@@ -0,0 +1,277 @@
+import argparse
+from array import array
+import numpy as np
+import scipy.sparse as sp
+from tqdm import tqdm
+from LireEnregistrements import iter_records
+
+class IdInterner:
+    """ Map string ids to dense int32 ids, in order of first appearance. """
+
+    def __init__(self):
+        self.index = {}
+        self.ids = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def intern(self, key):
+        node = self.index.get(key)
+        if node is None:
+            node = len(self.ids)
+            self.index[key] = node
+            self.ids.append(key)
+        return node
+
+    def get(self, key, default=-1):
+        return self.index.get(key, default)
+
+class CompactGraph:
+    """ Integer-indexed graph: edge arrays, a node id table and columnar node attributes. """
+
+    def __init__(self, ids, src, dst, directed, attributes=None, edge_attributes=None):
+        self.ids = ids
+        self.index = {node_id: i for i, node_id in enumerate(ids)}
+        self.src = np.asarray(src, dtype=np.int32)
+        self.dst = np.asarray(dst, dtype=np.int32)
+        self.directed = directed
+        self.attributes = attributes or {}
+        # Colonnes alignées sur src/dst (ex : weight, first_year, last_year)
+        self.edge_attributes = edge_attributes or {}
+        self._csr = {}
+
+    @property
+    def num_nodes(self):
+        return len(self.ids)
+
+    @property
+    def num_edges(self):
+        return self.to_csr().nnz if self.directed else (self.to_csr().nnz + self.num_self_loops()) // 2
+
+    def num_self_loops(self):
+        return int(self.to_csr().diagonal().astype(bool).sum())
+
+    def to_csr(self, weight=None):
+        """ Adjacency matrix (symmetric for undirected graphs); duplicates are summed when weight names an edge column, collapsed to 1 otherwise. """
+        if weight not in self._csr:
+            n = self.num_nodes
+            src, dst = (self.src, self.dst) if self.directed else (np.concatenate([self.src, self.dst]), np.concatenate([self.dst, self.src]))
+            if weight is None:
+                data = np.ones(len(src), dtype=np.float32)
+            else:
+                data = self.edge_attributes[weight].astype(np.float32)
+                data = data if self.directed else np.concatenate([data, data])
+            adjacency = sp.csr_matrix((data, (src, dst)), shape=(n, n))
+            adjacency.sum_duplicates()
+            if weight is None:
+                adjacency.data[:] = 1
+            self._csr[weight] = adjacency
+        return self._csr[weight]
+
+    def degree(self):
+        """ Degree of every node (in + out for directed graphs, like NetworkX). """
+        adjacency = self.to_csr()
+        out_degree = np.diff(adjacency.indptr)
+        if self.directed:
+            return out_degree + np.bincount(adjacency.indices, minlength=self.num_nodes)
+        # Une boucle compte deux fois dans le degré, comme dans NetworkX
+        return out_degree + adjacency.diagonal().astype(bool)
+
+    def node_attributes(self, node_id):
+        """ Attributes of one node, rebuilt from the columns. """
+        node = self.index[node_id]
+        return _present({name: column[node] for name, column in self.attributes.items()})
+
+    def memory_usage(self):
+        """ Approximate size in bytes of the edge arrays and of the adjacency matrix. """
+        adjacency = self.to_csr()
+        return self.src.nbytes + self.dst.nbytes + adjacency.data.nbytes + adjacency.indices.nbytes + adjacency.indptr.nbytes
+
+    def to_networkx(self):
+        """ Convert to NetworkX (for small graphs: drawing, GEXF export). """
+        import networkx as nx
+        graph = nx.DiGraph() if self.directed else nx.Graph()
+        for node, node_id in enumerate(self.ids):
+            graph.add_node(node_id, **_present({name: column[node] for name, column in self.attributes.items()}))
+        ids = self.ids
+        if self.edge_attributes:
+            names = list(self.edge_attributes)
+            graph.add_edges_from((ids[i], ids[j], _present({name: self.edge_attributes[name][k] for name in names}))
+                                 for k, (i, j) in enumerate(zip(self.src.tolist(), self.dst.tolist())))
+        else:
+            adjacency = self.to_csr().tocoo()
+            graph.add_edges_from((ids[i], ids[j]) for i, j in zip(adjacency.row, adjacency.col))
+        return graph
+
+def _native(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+def _present(attributes):
+    # Les valeurs absentes (None) ne sont pas recopiées comme attributs
+    return {name: _native(value) for name, value in attributes.items() if value is not None}
+
+def build_citation_graph(records, stub_nodes=False):
+    """ Citation graph (edge ref -> paper) with year/title columns, independent of the record order.
+
+    Edges are resolved once every record has been read; references to papers outside the loaded
+    records are dropped, or kept as stub nodes (flagged in the 'stub' column) when stub_nodes is True.
+    """
+    interner = IdInterner()
+    is_paper = bytearray()
+    years = array('i')
+    titles = []
+    src = array('i')
+    dst = array('i')
+
+    def node_index(key):
+        node = interner.intern(key)
+        if node == len(titles):
+            # Nouvel identifiant : réserver sa place dans les colonnes
+            is_paper.append(0)
+            years.append(-1)
+            titles.append("")
+        return node
+
+    for record in tqdm(records, desc="Building network", unit="papers"):
+        if not record.get('_id'):
+            continue
+        node = node_index(record['_id'])
+        is_paper[node] = 1
+        year = record.get('year')
+        years[node] = int(year) if isinstance(year, (int, float)) else -1
+        titles[node] = str(record.get('title', ""))
+        references = record.get('references', [])
+        if isinstance(references, list):
+            for ref in references:
+                if ref:
+                    src.append(node_index(ref))
+                    dst.append(node)
+
+    # Ne garder que les articles chargés (sauf sommets fantômes) et renuméroter les sommets de façon dense
+    is_paper = np.frombuffer(bytes(is_paper), dtype=np.uint8).astype(bool)
+    keep = np.ones_like(is_paper) if stub_nodes else is_paper
+    remap = np.cumsum(keep, dtype=np.int64) - 1
+    src = np.frombuffer(src, dtype=np.int32)
+    dst = np.frombuffer(dst, dtype=np.int32)
+    valid = keep[src] if len(src) else np.zeros(0, dtype=bool)
+    kept = np.flatnonzero(keep)
+    attributes = {
+        'year': np.frombuffer(years, dtype=np.int32)[kept],
+        'title': np.array(titles, dtype=object)[kept],
+    }
+    if stub_nodes:
+        attributes['stub'] = ~is_paper[kept]
+    ids = [interner.ids[i] for i in kept]
+    return CompactGraph(ids, remap[src[valid]], remap[dst[valid]], directed=True, attributes=attributes)
+
+def coauthorship_edges(author_nodes, paper_offsets, paper_years, max_authors=None, weighting='count'):
+    """ Expand every paper into its author pairs with NumPy and aggregate them into weighted edges.
+
+    author_nodes holds the distinct author ids of all papers back to back, paper i owning
+    author_nodes[paper_offsets[i]:paper_offsets[i + 1]]. Papers with more than max_authors authors
+    are skipped. With weighting='count' the weight of an edge is its number of co-authored papers;
+    with weighting='newman' each paper with k authors adds 1 / (k - 1) to each of its pairs, which
+    keeps hyper-authored papers from dominating the weights.
+    Returns (src, dst, weight, first_year, last_year) with src < dst and one entry per edge.
+    """
+    author_nodes = np.asarray(author_nodes, dtype=np.int32)
+    paper_offsets = np.asarray(paper_offsets, dtype=np.int64)
+    paper_years = np.asarray(paper_years, dtype=np.int32)
+    sizes = np.diff(paper_offsets)
+    all_src, all_dst, all_weight, all_year = [], [], [], []
+
+    # Les articles sont groupés par nombre d'auteurs k : chaque groupe est une matrice (articles x k)
+    for k in np.unique(sizes):
+        if k < 2 or (max_authors is not None and k > max_authors):
+            continue
+        papers = np.flatnonzero(sizes == k)
+        members = author_nodes[paper_offsets[papers][:, None] + np.arange(k)]
+        first, second = np.triu_indices(k, 1)
+        src = members[:, first].ravel()
+        dst = members[:, second].ravel()
+        all_src.append(np.minimum(src, dst))
+        all_dst.append(np.maximum(src, dst))
+        all_weight.append(np.full(len(src), 1.0 if weighting == 'count' else 1.0 / (k - 1)))
+        all_year.append(np.repeat(paper_years[papers], len(first)))
+
+    if not all_src:
+        empty = np.zeros(0, dtype=np.int32)
+        return empty, empty, np.zeros(0), empty, empty
+    src, dst = np.concatenate(all_src), np.concatenate(all_dst)
+    weight, year = np.concatenate(all_weight), np.concatenate(all_year)
+
+    # Agréger les paires identiques : tri sur une clé 64 bits puis réductions par segment
+    keys = src.astype(np.int64) << 32 | dst.astype(np.int64)
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    year = year[order]
+    known = year >= 0
+    first_year = np.minimum.reduceat(np.where(known, year, np.iinfo(np.int32).max), starts) if len(starts) else year
+    first_year = np.where(first_year == np.iinfo(np.int32).max, -1, first_year)
+    last_year = np.maximum.reduceat(year, starts) if len(starts) else year
+    edge_weight = np.add.reduceat(weight[order], starts) if len(starts) else weight
+    unique_keys = keys[starts]
+    return ((unique_keys >> 32).astype(np.int32), (unique_keys & 0xFFFFFFFF).astype(np.int32),
+            edge_weight, first_year.astype(np.int32), last_year.astype(np.int32))
+
+def build_collaboration_graph(records, max_authors=None, weighting='count'):
+    """ Weighted co-authorship graph between author ids, with name/year node columns and
+    weight/first_year/last_year edge columns (see coauthorship_edges for max_authors and weighting). """
+    interner = IdInterner()
+    names = []
+    years = array('i')
+    author_nodes = array('i')
+    paper_offsets = array('q', [0])
+    paper_years = array('i')
+
+    def node_index(key):
+        node = interner.intern(key)
+        if node == len(names):
+            names.append("Unknown")
+            years.append(-1)
+        return node
+
+    for record in tqdm(records, desc="Building network", unit="papers"):
+        authors = record.get('authors') or []
+        year = record.get('year')
+        year = int(year) if isinstance(year, (int, float)) else -1
+        # Un auteur listé deux fois sur le même article ne compte qu'une fois
+        paper_authors = {}
+        for author in authors:
+            if isinstance(author, dict) and '_id' in author:
+                node = node_index(author['_id'])
+                if 'name' in author:
+                    names[node] = str(author['name'])
+                years[node] = max(years[node], year)
+                paper_authors[node] = None
+        author_nodes.extend(paper_authors)
+        paper_offsets.append(len(author_nodes))
+        paper_years.append(year)
+
+    src, dst, weight, first_year, last_year = coauthorship_edges(author_nodes, paper_offsets, paper_years, max_authors, weighting)
+    attributes = {'name': np.array(names, dtype=object), 'year': np.frombuffer(years, dtype=np.int32).copy()}
+    edge_attributes = {'weight': weight, 'first_year': first_year, 'last_year': last_year}
+    return CompactGraph(list(interner.ids), src, dst, directed=False, attributes=attributes, edge_attributes=edge_attributes)
+
+def build_compact_network(file_path, network_type, stub_nodes=False, max_authors=None, weighting='count'):
+    """ Same choice as DessinerGraphe.build_network ('1' citation, '2' collaboration), compact storage. """
+    records = iter_records(file_path)
+    if network_type == '1':
+        return build_citation_graph(records, stub_nodes)
+    return build_collaboration_graph(records, max_authors, weighting)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construire un graphe compact (CSR) à partir d'un fichier de publications.")
+    parser.add_argument('file', help="Fichier JSON ou Parquet de publications")
+    parser.add_argument('--type', choices=['1', '2'], default='1', help="'1' réseau de citations, '2' réseau de collaboration")
+    parser.add_argument('--stubs', action='store_true', help="Garder les articles cités hors du fichier comme sommets fantômes")
+    parser.add_argument('--max-authors', type=int, help="Ignorer les articles ayant plus d'auteurs que ce nombre (réseau de collaboration)")
+    parser.add_argument('--weighting', choices=['count', 'newman'], default='count',
+                        help="Poids des collaborations : nombre d'articles, ou 1/(k-1) par article à k auteurs")
+    args = parser.parse_args()
+
+    graph = build_compact_network(args.file, args.type, args.stubs, args.max_authors, args.weighting)
+    network_title = 'Citation' if args.type == '1' else 'Collaboration'
+    print(f"Le réseau {network_title} a {graph.num_nodes} sommets et {graph.num_edges} arrêtes.")
+    print(f"Mémoire des tableaux d'arêtes et de la matrice CSR : {graph.memory_usage() / 2**20:.1f} Mo")
@@ -0,0 +1,257 @@
+import os
+import sqlite3
+import argparse
+import numpy as np
+from tqdm import tqdm
+from GrapheCompact import CompactGraph
+from LireEnregistrements import iter_records
+
+# Une entrée du journal d'arêtes : (source, cible, année de l'article qui crée l'arête)
+EDGE_DTYPE = np.dtype([('src', '<i4'), ('dst', '<i4'), ('year', '<i4')])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS nodes (
+    idx INTEGER PRIMARY KEY,
+    node_id TEXT UNIQUE NOT NULL,
+    stub INTEGER NOT NULL DEFAULT 0,
+    year INTEGER NOT NULL DEFAULT -1,
+    title TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL DEFAULT '',
+    fos TEXT NOT NULL DEFAULT '',
+    in_degree INTEGER NOT NULL DEFAULT 0,
+    out_degree INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS papers (paper_id TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS pending (ref TEXT NOT NULL, citing_idx INTEGER NOT NULL, year INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS pending_ref ON pending (ref);
+"""
+
+class GraphStore:
+    """ Persistent graph: SQLite node table with degree counters plus an append-only binary edge log.
+
+    Ingesting a batch only touches the rows of the nodes it mentions and appends to the edge log,
+    so its cost is proportional to the batch, not to the graph. In a citation store an edge goes
+    from the cited paper to the citing one (in/out degrees follow it); in a collaboration store each
+    co-authored paper appends one edge per author pair and out_degree counts the collaborations.
+    """
+
+    def __init__(self, directory, network_type='1', stub_nodes=False):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.edge_log_path = os.path.join(directory, 'edges.bin')
+        self.connection = sqlite3.connect(os.path.join(directory, 'nodes.sqlite'))
+        self.connection.executescript(SCHEMA)
+        meta = dict(self.connection.execute("SELECT key, value FROM meta"))
+        if 'network_type' not in meta:
+            meta = {'network_type': network_type, 'stub_nodes': '1' if stub_nodes else '0', 'edge_count': '0'}
+            self.connection.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+            self.connection.commit()
+        self.network_type = meta['network_type']
+        self.stub_nodes = meta['stub_nodes'] == '1'
+        self.edge_count = int(meta['edge_count'])
+        self.num_nodes = self.connection.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+        self._truncate_edge_log()
+
+    def _truncate_edge_log(self):
+        # Des arêtes écrites sans que la transaction correspondante ait été validée sont ignorées
+        expected = self.edge_count * EDGE_DTYPE.itemsize
+        if os.path.exists(self.edge_log_path) and os.path.getsize(self.edge_log_path) > expected:
+            with open(self.edge_log_path, 'r+b') as log:
+                log.truncate(expected)
+
+    def close(self):
+        self.connection.close()
+
+    def _lookup(self, node_id):
+        row = self.connection.execute("SELECT idx, stub FROM nodes WHERE node_id = ?", (node_id,)).fetchone()
+        return (row[0], bool(row[1])) if row else (None, False)
+
+    def _create_node(self, node_id, stub=False, **attributes):
+        idx = self.num_nodes
+        self.connection.execute(
+            "INSERT INTO nodes (idx, node_id, stub, year, title, name, fos) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (idx, node_id, int(stub), attributes.get('year', -1), attributes.get('title', ''),
+             attributes.get('name', ''), attributes.get('fos', '')))
+        self.num_nodes += 1
+        return idx
+
+    def _update_node(self, idx, **attributes):
+        assignments = ', '.join(f"{name} = ?" for name in attributes)
+        self.connection.execute(f"UPDATE nodes SET stub = 0, {assignments} WHERE idx = ?", (*attributes.values(), idx))
+
+    def ingest(self, records):
+        """ Add new records (already ingested papers are skipped) and return the number of papers added. """
+        edges = []
+        in_degree = {}
+        out_degree = {}
+        added = 0
+
+        def add_edge(src, dst, year):
+            edges.append((src, dst, year))
+            out_degree[src] = out_degree.get(src, 0) + 1
+            if self.network_type == '1':
+                in_degree[dst] = in_degree.get(dst, 0) + 1
+            else:
+                # Collaboration non orientée : le compteur est symétrique
+                out_degree[dst] = out_degree.get(dst, 0) + 1
+
+        with self.connection:
+            for record in tqdm(records, desc="Ingesting records", unit="papers"):
+                paper_id = record.get('_id')
+                if not paper_id or self.connection.execute("SELECT 1 FROM papers WHERE paper_id = ?", (paper_id,)).fetchone():
+                    continue
+                self.connection.execute("INSERT INTO papers VALUES (?)", (paper_id,))
+                added += 1
+                year = record.get('year')
+                year = int(year) if isinstance(year, (int, float)) else -1
+                fos = ', '.join(record['fos']) if isinstance(record.get('fos'), list) else "Unknown"
+
+                if self.network_type == '1':
+                    attributes = {'year': year, 'title': str(record.get('title', "")), 'fos': fos}
+                    idx, _ = self._lookup(paper_id)
+                    if idx is None:
+                        idx = self._create_node(paper_id, **attributes)
+                    else:
+                        # Un sommet fantôme devient un vrai article en gardant ses arêtes
+                        self._update_node(idx, **attributes)
+                    # Références qui attendaient cet article
+                    for citing_idx, citing_year in self.connection.execute("SELECT citing_idx, year FROM pending WHERE ref = ?", (paper_id,)).fetchall():
+                        add_edge(idx, citing_idx, citing_year)
+                    self.connection.execute("DELETE FROM pending WHERE ref = ?", (paper_id,))
+
+                    references = record.get('references')
+                    for ref in dict.fromkeys(references if isinstance(references, list) else []):
+                        if not ref:
+                            continue
+                        ref_idx, _ = self._lookup(ref)
+                        if ref_idx is None and self.stub_nodes:
+                            ref_idx = self._create_node(ref, stub=True, fos="Unknown")
+                        if ref_idx is None:
+                            self.connection.execute("INSERT INTO pending VALUES (?, ?, ?)", (ref, idx, year))
+                        else:
+                            add_edge(ref_idx, idx, year)
+                else:
+                    author_nodes = {}
+                    for author in record.get('authors') or []:
+                        if isinstance(author, dict) and '_id' in author:
+                            idx, _ = self._lookup(author['_id'])
+                            if idx is None:
+                                idx = self._create_node(author['_id'], name=str(author.get('name', "Unknown")), year=year)
+                            elif 'name' in author:
+                                self._update_node(idx, name=str(author['name']))
+                            author_nodes[idx] = None
+                    author_nodes = sorted(author_nodes)
+                    for i, a in enumerate(author_nodes):
+                        for b in author_nodes[i + 1:]:
+                            add_edge(a, b, year)
+
+            # Mettre à jour les compteurs de degré en place, puis journaliser les arêtes
+            self.connection.executemany("UPDATE nodes SET in_degree = in_degree + ? WHERE idx = ?",
+                                        [(count, idx) for idx, count in in_degree.items() if count])
+            self.connection.executemany("UPDATE nodes SET out_degree = out_degree + ? WHERE idx = ?",
+                                        [(count, idx) for idx, count in out_degree.items() if count])
+            if edges:
+                with open(self.edge_log_path, 'ab') as log:
+                    np.array(edges, dtype=EDGE_DTYPE).tofile(log)
+                    log.flush()
+                    os.fsync(log.fileno())
+                self.edge_count += len(edges)
+            self.connection.execute("UPDATE meta SET value = ? WHERE key = 'edge_count'", (str(self.edge_count),))
+        return added
+
+    def ingest_file(self, file_path):
+        return self.ingest(iter_records(file_path))
+
+    def node_ids(self):
+        return [node_id for (node_id,) in self.connection.execute("SELECT node_id FROM nodes ORDER BY idx")]
+
+    def degrees(self):
+        """ (in_degree, out_degree) counters of every node, indexed like node_ids(). """
+        rows = self.connection.execute("SELECT in_degree, out_degree FROM nodes ORDER BY idx").fetchall()
+        counters = np.array(rows, dtype=np.int64).reshape(-1, 2)
+        return counters[:, 0], counters[:, 1]
+
+    def edge_log(self):
+        """ Memory-mapped view of the edge log. """
+        if not self.edge_count:
+            return np.zeros(0, dtype=EDGE_DTYPE)
+        return np.memmap(self.edge_log_path, dtype=EDGE_DTYPE, mode='r', shape=(self.edge_count,))
+
+    def to_compact_graph(self):
+        """ Materialize the store as a CompactGraph (collaboration edges aggregated with weights). """
+        rows = self.connection.execute("SELECT node_id, stub, year, title, name FROM nodes ORDER BY idx").fetchall()
+        ids = [row[0] for row in rows]
+        attributes = {'year': np.array([row[2] for row in rows], dtype=np.int32)}
+        log = self.edge_log()
+        if self.network_type == '1':
+            attributes['title'] = np.array([row[3] for row in rows], dtype=object)
+            attributes['stub'] = np.array([bool(row[1]) for row in rows], dtype=bool)
+            return CompactGraph(ids, log['src'], log['dst'], directed=True, attributes=attributes)
+
+        attributes['name'] = np.array([row[4] for row in rows], dtype=object)
+        keys = log['src'].astype(np.int64) << 32 | log['dst'].astype(np.int64)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        year = np.asarray(log['year'])
+        first_year = np.full(len(unique_keys), np.iinfo(np.int32).max, dtype=np.int64)
+        np.minimum.at(first_year, inverse[year >= 0], year[year >= 0])
+        last_year = np.full(len(unique_keys), -1, dtype=np.int64)
+        np.maximum.at(last_year, inverse, year)
+        edge_attributes = {
+            'weight': np.bincount(inverse, minlength=len(unique_keys)).astype(np.float64),
+            'first_year': np.where(first_year == np.iinfo(np.int32).max, -1, first_year).astype(np.int32),
+            'last_year': last_year.astype(np.int32),
+        }
+        return CompactGraph(ids, (unique_keys >> 32).astype(np.int32), (unique_keys & 0xFFFFFFFF).astype(np.int32),
+                            directed=False, attributes=attributes, edge_attributes=edge_attributes)
+
+    def pagerank(self, personalization=None):
+        """ PageRank of the stored graph, warm-started from the scores of the previous call (kept in the store). """
+        from PageRankCreux import pagerank
+        scores_path = os.path.join(self.directory, 'pagerank.npy')
+        graph = self.to_compact_graph()
+        start = None
+        if personalization is None and os.path.exists(scores_path):
+            # Les indices des sommets sont stables : les sommets ajoutés depuis partent de la valeur uniforme
+            previous = np.load(scores_path)
+            start = np.full(graph.num_nodes, 1.0 / max(graph.num_nodes, 1))
+            start[:len(previous)] = previous[:graph.num_nodes]
+        weight = 'weight' if 'weight' in graph.edge_attributes else None
+        scores, info = pagerank(graph, personalization, start=start, weight=weight)
+        if personalization is None:
+            np.save(scores_path, scores)
+        return graph, scores, info
+
+    def export_gexf(self, file_path):
+        """ Write the whole graph as GEXF (and its binary snapshot), only when asked. """
+        from FluxGEXF import write_gexf
+        from FormatBinaireGraphe import write_snapshot_for
+        graph = self.to_compact_graph()
+        write_gexf(graph, file_path)
+        write_snapshot_for(graph, file_path)
+        print(f"Graph exported to {file_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ajouter des enregistrements à un graphe persistant sans relire ni réécrire tout le GEXF.")
+    parser.add_argument('store', help="Dossier du graphe persistant (créé s'il n'existe pas)")
+    parser.add_argument('records', nargs='*', help="Fichiers JSON ou Parquet d'enregistrements à ajouter")
+    parser.add_argument('--type', choices=['1', '2'], default='1', help="'1' réseau de citations, '2' réseau de collaboration (à la création)")
+    parser.add_argument('--stubs', action='store_true', help="Créer des sommets fantômes pour les articles cités inconnus (à la création)")
+    parser.add_argument('--export-gexf', help="Exporter ensuite le graphe complet dans ce fichier GEXF")
+    parser.add_argument('--pagerank', action='store_true', help="Recalculer ensuite le PageRank (à partir des scores précédents)")
+    args = parser.parse_args()
+
+    store = GraphStore(args.store, args.type, args.stubs)
+    for records_path in args.records:
+        added = store.ingest_file(records_path)
+        print(f"{added} nouveaux articles ajoutés depuis {records_path}.")
+    print(f"Le graphe contient {store.num_nodes} sommets et {store.edge_count} arêtes journalisées.")
+    if args.pagerank:
+        from CentraliteApprochee import top_k
+        graph, scores, info = store.pagerank()
+        print(f"PageRank calculé en {info['iterations']} itérations ({info['seconds']:.2f} s) :")
+        for node_id, score in top_k(graph, scores, 10):
+            print(f"{node_id}: {score}")
+    if args.export_gexf:
+        store.export_gexf(args.export_gexf)
+    store.close()
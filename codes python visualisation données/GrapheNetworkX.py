@@ -0,0 +1,59 @@
+from array import array
+from tqdm import tqdm
+from GrapheCompact import IdInterner, coauthorship_edges
+
+def paper_attributes(record):
+    """ Node attributes of a paper, as stored in the NetworkX graphs (strings, for GEXF). """
+    return {
+        'year': str(record.get('year', "")),
+        'title': str(record.get('title', "")),
+        'fos': ', '.join(record.get('fos', [])) if record.get('fos', None) is not None else "Unknown",
+        'references': ', '.join(record.get('references', [])) if record.get('references', None) is not None else "Unknown"
+    }
+
+def resolve_pending_references(graph, pending_references, stub_nodes=False):
+    """ Add in bulk the citation edges whose cited paper was not yet in the graph when read. """
+    for ref, citing_ids in pending_references.items():
+        if ref not in graph:
+            if not stub_nodes:
+                continue
+            # Article cité hors des enregistrements chargés : sommet fantôme, remplacé si l'article est ajouté plus tard
+            graph.add_node(ref, year="", title="", fos="Unknown", references="Unknown", stub=True)
+        graph.add_edges_from((ref, citing_id) for citing_id in citing_ids)
+
+def add_collaboration_records(graph, records, max_authors=None, weighting='count', desc="Building network"):
+    """ Add the authors of records to a NetworkX graph, and their co-authorships as weighted edges.
+
+    Author pairs are expanded and aggregated with coauthorship_edges (vectorized, papers with more
+    than max_authors authors skipped, weighting 'count' or 'newman'); the graph is then touched once
+    per distinct pair, an existing edge having its weight increased.
+    """
+    interner = IdInterner()
+    author_nodes = array('i')
+    paper_offsets = array('q', [0])
+    paper_years = array('i')
+    for record in tqdm(records, desc=desc, unit="papers"):
+        node_attributes = paper_attributes(record)
+        # Un auteur listé deux fois sur le même article ne compte qu'une fois
+        paper_authors = {}
+        for author in record.get('authors') or []:
+            if isinstance(author, dict) and '_id' in author:
+                if 'name' in author:
+                    graph.add_node(author['_id'], name=str(author.get('name', "Unknown")), **node_attributes)
+                paper_authors[interner.intern(author['_id'])] = None
+        author_nodes.extend(paper_authors)
+        paper_offsets.append(len(author_nodes))
+        year = record.get('year')
+        paper_years.append(int(year) if isinstance(year, (int, float)) else -1)
+
+    src, dst, weight, _, _ = coauthorship_edges(author_nodes, paper_offsets, paper_years, max_authors, weighting)
+    ids = interner.ids
+    for u, v, w in zip(src.tolist(), dst.tolist(), weight.tolist()):
+        source, target = ids[u], ids[v]
+        # Poids entier pour le décompte des articles, comme dans les graphes déjà enregistrés
+        w = int(w) if weighting == 'count' else w
+        if graph.has_edge(source, target):
+            graph[source][target]['weight'] = graph[source][target].get('weight', 1) + w
+        else:
+            graph.add_edge(source, target, weight=w)
+    return graph
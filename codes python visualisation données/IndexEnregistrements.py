@@ -0,0 +1,155 @@
+import os
+import json
+import mmap
+import numpy as np
+from tqdm import tqdm
+from LireEnregistrements import NUMBER_INT_PATTERN
+
+def _escaped(data, position):
+    """ Whether the byte at position is preceded by an odd number of backslashes. """
+    count = 0
+    while position - count - 1 >= 0 and data[position - count - 1] == 92:
+        count += 1
+    return count % 2 == 1
+
+def record_level(data):
+    """ Depth of the records: 1 inside a JSON array, 0 for JSON lines or concatenated objects. """
+    first = np.flatnonzero(~np.isin(data[:4096], np.frombuffer(b' \t\r\n', dtype=np.uint8)))
+    return 1 if len(first) and data[first[0]] == ord('[') else 0
+
+def iter_record_offsets(data, block_size=16 * 2**20, progress=None):
+    """ Yield the (starts, ends) byte offsets of the records completed in each block of a byte array.
+
+    Blocks are scanned with NumPy: unescaped quotes give the string mask, brackets outside strings
+    give the depth, and a record spans from a '{' opened at the record depth to the '}' that closes
+    it. A truncated last record is yielded with end -1.
+    """
+    level = record_level(data)
+    in_string, depth = False, 0
+    pending = np.zeros(0, dtype=np.int64)
+    for low in range(0, len(data), block_size):
+        block = data[low:low + block_size]
+        # Seuls les guillemets et les crochets comptent : { et [ deviennent 123, } et ] 125 avec le bit 0x20
+        folded = block | 0x20
+        positions = np.flatnonzero((folded == ord('{')) | (folded == ord('}')) | (block == ord('"')))
+        values = block[positions]
+        is_quote = values == ord('"')
+        # Guillemets échappés (rares) : précédés d'un nombre impair de barres obliques inverses
+        quote_index = np.flatnonzero(is_quote)
+        quotes = positions[quote_index] + low
+        suspects = np.flatnonzero(data[np.maximum(quotes - 1, 0)] == 92)
+        escaped = [quote_index[i] for i in suspects if quotes[i] > 0 and _escaped(data, quotes[i])]
+        if escaped:
+            keep = np.ones(len(positions), dtype=bool)
+            keep[escaped] = False
+            positions, values, is_quote = positions[keep], values[keep], is_quote[keep]
+        outside = ~is_quote & ((np.cumsum(is_quote) + in_string) % 2 == 0)
+        structural, values = positions[outside], values[outside]
+        delta = np.where((values == ord('{')) | (values == ord('[')), 1, -1)
+        after = depth + np.cumsum(delta)
+        before = after - delta
+        starts = np.concatenate([pending, structural[(values == ord('{')) & (before == level)] + low])
+        ends = structural[(values == ord('}')) & (after == level)] + low + 1
+        pending = starts[len(ends):]
+        yield starts[:len(ends)], ends
+        in_string = (in_string + int(is_quote.sum())) % 2 == 1
+        depth = int(after[-1]) if len(after) else depth
+        if progress is not None:
+            progress.update(len(block))
+    if len(pending):
+        yield pending[:1], np.array([-1], dtype=np.int64)
+
+def scan_record_offsets(file_path, block_size=16 * 2**20):
+    """ (starts, ends) byte offsets of the top-level records of a JSON array, JSON lines or Mongo export
+    file, from a single memory-mapped scan (see iter_record_offsets). A truncated last record is left out. """
+    if os.path.getsize(file_path) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    starts, ends = [], []
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        data = np.frombuffer(mapped, dtype=np.uint8)
+        with tqdm(total=len(data), desc="Indexation des enregistrements", unit="o", unit_scale=True) as progress:
+            for block_starts, block_ends in iter_record_offsets(data, block_size, progress):
+                starts.append(block_starts)
+                ends.append(block_ends)
+        del data
+    starts, ends = np.concatenate(starts), np.concatenate(ends)
+    complete = ends >= 0
+    return starts[complete], ends[complete]
+
+def _signature(file_path):
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+class RecordIndex:
+    """ Record boundary index of a large JSON dump: record k can be read by seeking, without re-splitting.
+
+    The offsets are saved next to the dump (<dump>.offsets.npy, with a .json file holding the dump
+    size and date) and reused while the dump is unchanged.
+    """
+
+    def __init__(self, file_path, offsets):
+        self.file_path = file_path
+        # Une ligne par enregistrement : (début, fin) en octets
+        self.offsets = offsets
+
+    @classmethod
+    def load_or_build(cls, file_path, index_path=None):
+        index_path = index_path or file_path + '.offsets.npy'
+        meta_path = os.path.splitext(index_path)[0] + '.json'
+        if os.path.exists(index_path) and os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                if json.load(f) == _signature(file_path):
+                    return cls(file_path, np.load(index_path, mmap_mode='r'))
+        starts, ends = scan_record_offsets(file_path)
+        offsets = np.stack([starts, ends], axis=1)
+        np.save(index_path, offsets)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(_signature(file_path), f)
+        return cls(file_path, offsets)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def record_bytes(self, k):
+        start, end = (int(value) for value in self.offsets[k])
+        with open(self.file_path, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def record(self, k):
+        """ Record k as a dict (Mongo "NumberInt(x)" values read as integers). """
+        return json.loads(NUMBER_INT_PATTERN.sub(rb'\1', self.record_bytes(k)))
+
+    def ranges(self, chunk_size):
+        """ (first, last) record ranges of at most chunk_size bytes each (at least one record per range). """
+        sizes = np.cumsum(self.offsets[:, 1] - self.offsets[:, 0] + 2)
+        ranges, first = [], 0
+        while first < len(self):
+            reached = sizes[first - 1] if first else 0
+            last = max(int(np.searchsorted(sizes, reached + chunk_size, side='right')), first + 1)
+            ranges.append((first, last))
+            first = last
+        return ranges
+
+def write_records_range(file_path, offsets, output_path, output_format='json', number_int=False):
+    """ Copy the records at the given (start, end) offsets to a JSON array or JSON lines file, and return the count.
+
+    Records are copied byte for byte (newlines between tokens become spaces in JSON lines), with
+    Mongo "NumberInt(x)" values rewritten as integers when number_int is True.
+    """
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+         open(output_path, 'wb') as output_file:
+        if output_format == 'json':
+            output_file.write(b'[')
+        for i, (start, end) in enumerate(offsets):
+            record = mapped[int(start):int(end)]
+            if number_int:
+                record = NUMBER_INT_PATTERN.sub(rb'\1', record)
+            if output_format == 'json':
+                output_file.write(b',\n' if i else b'\n')
+                output_file.write(record)
+            else:
+                output_file.write(record.replace(b'\r', b' ').replace(b'\n', b' ') + b'\n')
+        if output_format == 'json':
+            output_file.write(b'\n]')
+    return len(offsets)
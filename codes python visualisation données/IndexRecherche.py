@@ -0,0 +1,115 @@
+import os
+import re
+import sqlite3
+from tqdm import tqdm
+from LireEnregistrements import iter_records, is_parquet, DECODE_ERRORS
+
+# Champs indexés : titre, noms et organisations des auteurs, domaines (FOS)
+INDEXED_FIELDS = ('title', 'authors.name', 'authors.org', 'fos')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, signature TEXT NOT NULL);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5(
+    value, file UNINDEXED, record_id UNINDEXED, field UNINDEXED, tokenize = 'unicode61'
+);
+"""
+
+def _signature(path):
+    """ Size and modification time of a file, or of all the files of a partitioned Parquet folder. """
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return f"{stat.st_size}|{stat.st_mtime_ns}"
+    size, mtime = 0, 0
+    for folder, _, filenames in os.walk(path):
+        for filename in filenames:
+            stat = os.stat(os.path.join(folder, filename))
+            size, mtime = size + stat.st_size, max(mtime, stat.st_mtime_ns)
+    return f"{size}|{mtime}"
+
+def record_entries(record):
+    """ (field, value) pairs of a record for the indexed fields, without duplicates. """
+    entries = {}
+    if isinstance(record.get('title'), str):
+        entries[('title', record['title'])] = None
+    for author in record.get('authors') or []:
+        if not isinstance(author, dict):
+            continue
+        if isinstance(author.get('name'), str):
+            entries[('authors.name', author['name'])] = None
+        orgs = [author.get('org')] + (author.get('orgs') if isinstance(author.get('orgs'), list) else [])
+        for org in orgs:
+            if isinstance(org, str) and org:
+                entries[('authors.org', org)] = None
+    for fos in record.get('fos') or []:
+        if isinstance(fos, str):
+            entries[('fos', fos)] = None
+    return list(entries)
+
+def fts_query(term):
+    """ FTS5 query in which every word of the term is a case-insensitive prefix ('delb' finds 'Delbot'). """
+    words = re.findall(r"\w+", term)
+    return ' '.join('"' + word.replace('"', '""') + '"*' for word in words)
+
+class SearchIndex:
+    """ Persistent full-text index (SQLite FTS5) over the titles, authors, organisations and FOS of the splits.
+
+    Each split is indexed once in a streaming pass; update() only (re)indexes the files that are new
+    or whose size or date changed, and drops the entries of files that disappeared.
+    """
+
+    def __init__(self, index_path):
+        os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(index_path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def update(self, directory, batch_size=10000):
+        """ Bring the index in line with the JSON/Parquet files of directory and return the names of the files indexed. """
+        files = sorted(f for f in os.listdir(directory) if f.endswith('.json') or is_parquet(f))
+        known = dict(self.connection.execute("SELECT name, signature FROM files"))
+        with self.connection:
+            for name in set(known) - set(files):
+                self.connection.execute("DELETE FROM entries WHERE file = ?", (name,))
+                self.connection.execute("DELETE FROM files WHERE name = ?", (name,))
+
+        indexed = []
+        for name in files:
+            file_path = os.path.join(directory, name)
+            signature = _signature(file_path)
+            if known.get(name) == signature:
+                continue
+            # Une transaction par fichier : un fichier illisible n'est pas enregistré et sera repris
+            try:
+                with self.connection:
+                    if name in known:
+                        self.connection.execute("DELETE FROM entries WHERE file = ?", (name,))
+                    rows = []
+                    for record in tqdm(iter_records(file_path), desc=f"Indexation de {name}", unit="articles"):
+                        record_id = record.get('_id')
+                        rows.extend((value, name, record_id, field) for field, value in record_entries(record))
+                        if len(rows) >= batch_size:
+                            self.connection.executemany("INSERT INTO entries (value, file, record_id, field) VALUES (?, ?, ?, ?)", rows)
+                            rows = []
+                    self.connection.executemany("INSERT INTO entries (value, file, record_id, field) VALUES (?, ?, ?, ?)", rows)
+                    self.connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?)", (name, signature))
+                indexed.append(name)
+            except DECODE_ERRORS:
+                print(f"Error decoding JSON from file {name}")
+        return indexed
+
+    def search(self, term, fields=None, limit=None):
+        """ (file, _id, field, value) hits, in indexing order, whose value has words starting with every word of term. """
+        query = fts_query(term)
+        if not query:
+            return []
+        sql = "SELECT file, record_id, field, value FROM entries WHERE entries MATCH ?"
+        parameters = [f"value : ({query})"]
+        if fields:
+            sql += f" AND field IN ({', '.join('?' * len(fields))})"
+            parameters.extend(fields)
+        if limit:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        return self.connection.execute(sql, parameters).fetchall()
@@ -8,7 +8,11 @@ modules = [
     "community",
     "matplotlib",
     "tqdm",
-    "lxml"
+    "lxml",
+    "ijson",
+    "numpy",
+    "scipy",
+    "pyarrow"  # Optionnel : stockage colonnaire Parquet
 ]
 
 def install_modules(modules):
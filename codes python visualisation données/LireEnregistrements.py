@@ -0,0 +1,133 @@
+import os
+import re
+import json
+import ijson
+
+# Expression régulière pour les entiers exportés par Mongo : "NumberInt(x)" -> "x"
+NUMBER_INT_PATTERN = re.compile(rb'NumberInt\((-?\d+)\)')
+
+# Erreurs de décodage possibles, quel que soit le backend d'ijson
+DECODE_ERRORS = (ijson.JSONError, json.JSONDecodeError, UnicodeDecodeError)
+
+
+class NumberIntReader:
+    """ Binary file wrapper rewriting Mongo "NumberInt(x)" values into plain integers on the fly. """
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = b''
+
+    def read(self, size=-1):
+        # Un "NumberInt(x)" ne traverse jamais un retour à la ligne : on réécrit ligne par ligne
+        while size < 0 or len(self.buffer) < size:
+            line = self.file.readline()
+            if not line:
+                break
+            self.buffer += NUMBER_INT_PATTERN.sub(rb'\1', line)
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+class _PrefixedStream:
+    """ Re-inject the bytes already consumed while sniffing the start of a stream. """
+
+    def __init__(self, prefix, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size=-1):
+        if self.prefix and size != 0:
+            chunk, self.prefix = self.prefix, b''
+            if size < 0:
+                return chunk + self.stream.read()
+            return chunk + self.stream.read(max(size - len(chunk), 0))
+        return self.stream.read(size)
+
+
+def is_parquet(file_path):
+    """ Tell whether a path points to the columnar (Parquet) storage instead of JSON. """
+    return file_path.endswith('.parquet')
+
+
+def detect_format(file_path):
+    """ Detect whether a file holds a JSON array, JSON lines, a raw Mongo export or Parquet data. """
+    if is_parquet(file_path):
+        return 'parquet'
+    with open(file_path, 'rb') as file:
+        head = file.read(64 * 1024)
+    if b'NumberInt(' in head:
+        return 'mongo'
+    if head.lstrip()[:1] == b'[':
+        return 'array'
+    return 'jsonl'
+
+
+def iter_records(file_path, file_format=None):
+    """ Yield the records of a JSON array, JSON lines, Mongo export or Parquet file one at a time. """
+    if file_format is None:
+        file_format = detect_format(file_path)
+    if file_format == 'parquet':
+        # pyarrow n'est nécessaire que pour le format colonnaire
+        from StockageColonnaire import iter_parquet_records
+        yield from iter_parquet_records(file_path)
+        return
+
+    with open(file_path, 'rb') as file:
+        stream = NumberIntReader(file) if file_format == 'mongo' else file
+
+        # Chercher le premier caractère significatif pour choisir le préfixe ijson
+        first_char = stream.read(1)
+        while first_char and first_char.isspace():
+            first_char = stream.read(1)
+        if not first_char:
+            return
+
+        prefixed = _PrefixedStream(first_char, stream)
+        if first_char == b'[':
+            # Tableau JSON : chaque élément est un enregistrement
+            records = ijson.items(prefixed, 'item', use_float=True)
+        else:
+            # JSON lines (ou objets concaténés) : chaque valeur de premier niveau est un enregistrement
+            records = ijson.items(prefixed, '', multiple_values=True, use_float=True)
+
+        for record in records:
+            if isinstance(record, dict):
+                yield record
+
+
+def iter_directory_records(directory, suffix='.json'):
+    """ Yield (filename, record) pairs for every JSON (or Parquet) file of a directory. """
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(suffix) or is_parquet(filename):
+            for record in iter_records(os.path.join(directory, filename)):
+                yield filename, record
+
+
+def write_records(records, output_path):
+    """ Stream records to a JSON array file, one compact record per line, and return the count. """
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as output_file:
+        output_file.write('[')
+        for record in records:
+            output_file.write(',\n' if count else '\n')
+            output_file.write(json.dumps(record))
+            count += 1
+        output_file.write('\n]')
+    return count
+
+
+def write_output(records, output_path):
+    """ Write records as Parquet when output_path ends with .parquet, as a JSON array otherwise. """
+    if is_parquet(output_path):
+        from StockageColonnaire import write_parquet
+        return write_parquet(records, output_path)
+    return write_records(records, output_path)
+
+
+def output_filename(filename, output_format):
+    """ Swap the .json extension of a file name for the chosen output format. """
+    if output_format == 'parquet' and filename.endswith('.json'):
+        return filename[:-len('.json')] + '.parquet'
+    return filename
@@ -1,18 +1,70 @@
 import os
 from lxml import etree
 
+# Éléments recopiés ouverts : leurs enfants sont écrits un par un puis libérés
+STREAMED_ELEMENTS = ('graph', 'nodes', 'edges')
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+def _write_element(xf, element):
+    """ Write a complete element through the writer: its namespaces are those declared on the root, not repeated. """
+    if not isinstance(element.tag, str):
+        # Commentaires et instructions de traitement : recopiés tels quels
+        tail, element.tail = element.tail, None
+        xf.write(element)
+        element.tail = tail
+        return
+    with xf.element(element.tag, dict(element.attrib)):
+        if element.text:
+            xf.write(element.text)
+        for child in element:
+            _write_element(xf, child)
+            if child.tail:
+                xf.write(child.tail)
+
 def fix_gexf_file(input_path, output_path):
+    """ Rewrite a damaged GEXF file (invalid characters, broken markup) as valid GEXF, in a streaming pass.
+
+    The file is read with lxml iterparse in recover mode and copied with an incremental writer:
+    <gexf>, <graph>, <nodes> and <edges> are reopened with their attributes, and every other element
+    (<meta>, <attributes>, each <node> and <edge> with its viz:*, ids and attvalues) is written
+    unchanged as soon as it is complete, then freed, so memory stays bounded.
+    """
+    temporary_path = output_path + '.tmp'
     try:
-        # Lire et parser le fichier GEXF en entier
-        parser = etree.XMLParser(recover=True)
-        tree = etree.parse(input_path, parser)
-        
-        # Écrire le fichier corrigé
-        with open(output_path, 'wb') as outfile:
-            tree.write(outfile, encoding='utf-8', pretty_print=True, xml_declaration=True)
+        with etree.xmlfile(temporary_path, encoding='utf-8') as xf:
+            xf.write_declaration()
+            opened = []
+            for event, element in etree.iterparse(input_path, events=('start', 'end'), recover=True, huge_tree=True):
+                parent = element.getparent()
+                if event == 'start':
+                    if parent is None or (opened and parent is opened[-1][0] and _local(element.tag) in STREAMED_ELEMENTS):
+                        writer = xf.element(element.tag, dict(element.attrib), nsmap=element.nsmap if parent is None else None)
+                        writer.__enter__()
+                        xf.write('\n')
+                        opened.append((element, writer))
+                elif opened and element is opened[-1][0]:
+                    opened.pop()[1].__exit__(None, None, None)
+                    if opened:
+                        xf.write('\n')
+                elif opened and parent is opened[-1][0]:
+                    _write_element(xf, element)
+                    xf.write('\n')
+                    # Libérer l'élément et ceux déjà écrits avant lui : l'arbre reste de taille constante
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del parent[0]
+            # Fichier tronqué : fermeture des éléments restés ouverts
+            while opened:
+                opened.pop()[1].__exit__(None, None, None)
+        os.replace(temporary_path, output_path)
         print(f"Le fichier GEXF corrigé a été enregistré sous : {output_path}")
     except etree.XMLSyntaxError as e:
         print(f"Erreur de syntaxe XML lors de la lecture du fichier GEXF : {e}")
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
 
 if __name__ == "__main__":
     # Obtenir le chemin du répertoire du script
@@ -0,0 +1,94 @@
+import os
+import time
+import numpy as np
+
+def _normalize_columns(matrix):
+    totals = matrix.sum(axis=0)
+    if np.any(totals <= 0):
+        raise ValueError("Chaque vecteur de personnalisation doit avoir une somme strictement positive.")
+    return matrix / totals
+
+def fos_personalization(graph, fos_list):
+    """ One personalization column per field of study: uniform over the nodes having it among their FOS.
+
+    The 'fos' attribute holds FOS names joined by ', '; names are compared whole and case-insensitively
+    ('Art' does not select 'Artificial intelligence'). Raises ValueError naming the FOS no node has.
+    """
+    fos = graph.attributes.get('fos')
+    if fos is None:
+        raise ValueError("Le graphe n'a pas d'attribut 'fos'.")
+    wanted = {name.strip().lower(): j for j, name in enumerate(fos_list)}
+    columns = np.zeros((graph.num_nodes, len(fos_list)))
+    for node, value in enumerate(fos):
+        if isinstance(value, str) and value:
+            for name in value.split(', '):
+                j = wanted.get(name.strip().lower())
+                if j is not None:
+                    columns[node, j] = 1.0
+    missing = [name for j, name in enumerate(fos_list) if not columns[:, j].any()]
+    if missing:
+        raise ValueError(f"Aucun sommet n'a le domaine : {', '.join(missing)}")
+    return columns
+
+def align_start(graph, previous_ids, previous_scores):
+    """ Warm-start vector for graph from scores computed on an earlier version of it (matched by node id). """
+    previous_scores = np.asarray(previous_scores, dtype=np.float64)
+    shape = (graph.num_nodes,) + previous_scores.shape[1:]
+    # Les nouveaux sommets partent de la valeur uniforme
+    start = np.full(shape, 1.0 / max(graph.num_nodes, 1))
+    positions = np.array([graph.index.get(node_id, -1) for node_id in previous_ids], dtype=np.int64)
+    known = positions >= 0
+    start[positions[known]] = previous_scores[known]
+    return start
+
+def pagerank(graph, personalization=None, alpha=0.85, tol=1.0e-6, max_iter=100, start=None, weight=None):
+    """ PageRank by power iteration on the sparse adjacency, with the same conventions as NetworkX.
+
+    personalization is None (uniform), a vector of length n or an (n, p) matrix whose p columns are
+    solved together in one batch; dangling nodes redistribute their rank like the personalization.
+    start is a previous score vector/matrix (see align_start) to warm-start from after an update.
+    Returns (scores, info) with scores shaped like the personalization (a vector when None).
+    """
+    begin = time.time()
+    n = graph.num_nodes
+    if n == 0:
+        return np.zeros(0), {'iterations': 0, 'seconds': 0.0, 'converged': True}
+    adjacency = graph.to_csr(weight)
+    adjacency_t = adjacency.T.tocsr()
+    out_weight = np.asarray(adjacency.sum(axis=1), dtype=np.float64).ravel()
+    dangling = out_weight == 0
+    inverse_out = np.zeros(n)
+    np.divide(1.0, out_weight, out=inverse_out, where=~dangling)
+
+    single = personalization is None or np.ndim(personalization) == 1
+    p = np.full((n, 1), 1.0 / n) if personalization is None else _normalize_columns(np.asarray(personalization, dtype=np.float64).reshape(n, -1))
+    x = p.copy() if start is None else _normalize_columns(np.array(start, dtype=np.float64).reshape(n, -1))
+    if x.shape[1] != p.shape[1]:
+        x = np.repeat(x[:, :1], p.shape[1], axis=1)
+
+    converged = False
+    for iteration in range(1, max_iter + 1):
+        previous = x
+        dangling_mass = x[dangling].sum(axis=0)
+        x = alpha * (adjacency_t @ (x * inverse_out[:, None]) + dangling_mass * p) + (1 - alpha) * p
+        # Critère de NetworkX : somme des écarts absolus sous n * tol, pour chaque vecteur
+        if np.all(np.abs(x - previous).sum(axis=0) < n * tol):
+            converged = True
+            break
+    if not converged:
+        print(f"PageRank : pas de convergence après {max_iter} itérations.")
+    scores = x[:, 0] if single else x
+    return scores, {'iterations': iteration, 'seconds': time.time() - begin, 'converged': converged}
+
+def save_scores(path, graph, scores):
+    """ Keep a score vector/matrix with the node ids, to warm-start the next computation. """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        np.savez(f, ids=np.array(graph.ids, dtype=str), scores=scores)
+
+def load_start(path, graph):
+    """ Warm-start vector from scores saved by save_scores, None when there are none. """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        return align_start(graph, saved['ids'].tolist(), saved['scores'])
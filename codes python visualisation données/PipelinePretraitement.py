@@ -0,0 +1,96 @@
+import os
+import argparse
+from tqdm import tqdm
+from LireEnregistrements import iter_records, write_output
+
+# Colonnes conservées après nettoyage (identiques à NettoyerColonnes)
+KEEP_KEYS = {'_id', 'title', 'authors', 'year', 'fos', 'references'}
+
+
+def read_sources(input_paths):
+    """ Chain the records of several raw files; NumberInt values are rewritten while reading. """
+    for input_path in input_paths:
+        for record in iter_records(input_path):
+            yield record
+
+
+def project_columns(records, keep_keys=KEEP_KEYS):
+    """ Keep only the wanted keys of each record. """
+    for record in records:
+        yield {k: v for k, v in record.items() if k in keep_keys}
+
+
+def filter_years(records, start_year=None, end_year=None):
+    """ Keep records whose year lies in [start_year, end_year] (bounds are optional). """
+    for record in records:
+        year = record.get('year')
+        if not isinstance(year, (int, float)):
+            continue
+        if start_year is not None and year < start_year:
+            continue
+        if end_year is not None and year > end_year:
+            continue
+        yield record
+
+
+def filter_fos(records, fos_list):
+    """ Keep records having at least one of the given Fields of Study. """
+    fos_set = set(fos_list)
+    for record in records:
+        fos = record.get('fos')
+        if isinstance(fos, list) and any(f in fos_set for f in fos):
+            yield record
+
+
+def build_stages(keep_keys=KEEP_KEYS, start_year=None, end_year=None, fos_list=None):
+    """ Build the list of stages to apply, in order, on the record stream. """
+    stages = []
+    # Filtrer avant la projection pour ne jamais copier les enregistrements rejetés
+    if start_year is not None or end_year is not None:
+        stages.append(lambda records: filter_years(records, start_year, end_year))
+    if fos_list:
+        stages.append(lambda records: filter_fos(records, fos_list))
+    if keep_keys:
+        stages.append(lambda records: project_columns(records, keep_keys))
+    return stages
+
+
+def run_pipeline(input_paths, output_path, stages):
+    """ Stream every input once through the stages and write only the final merged file (JSON or Parquet). """
+    records = tqdm(read_sources(input_paths), desc="Prétraitement", unit="papers")
+    for stage in stages:
+        records = stage(records)
+    return write_output(records, output_path)
+
+
+def parse_year_range(value):
+    """ Parse '2017-2020', '2020', '-2019' or '2021-' into (start_year, end_year). """
+    if '-' not in value:
+        return int(value), int(value)
+    start, end = value.split('-', 1)
+    return (int(start) if start else None), (int(end) if end else None)
+
+
+if __name__ == "__main__":
+    # Obtenir le chemin du répertoire du script
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+
+    # Chemins relatifs par défaut : le dump brut en entrée, un seul fichier fusionné en sortie
+    default_input = os.path.join(current_dir, '..', 'Dataset', 'Dataset publication scientifique JSON.json')
+    default_output = os.path.join(current_dir, '..', 'Dataset', 'Split_fusionné', 'Dataset_prétraité_merged.json')
+
+    parser = argparse.ArgumentParser(description="Prétraitement en une seule passe : NumberInt, colonnes, filtres et fusion.")
+    parser.add_argument('inputs', nargs='*', default=[default_input], help="Fichiers JSON bruts à traiter")
+    parser.add_argument('-o', '--output', default=default_output, help="Fichier final (.json, ou .parquet pour le format colonnaire partitionné par année)")
+    parser.add_argument('--years', help="Année ou plage d'années (ex: 2020, 2017-2020, -2019, 2021-)")
+    parser.add_argument('--fos', help="Fields of Study séparés par des virgules (ex: Computer Science, Mathematics)")
+    parser.add_argument('--all-columns', action='store_true', help="Ne pas supprimer les colonnes inutiles")
+    args = parser.parse_args()
+
+    start_year, end_year = parse_year_range(args.years) if args.years else (None, None)
+    fos_list = [fos.strip() for fos in args.fos.split(',')] if args.fos else None
+    stages = build_stages(None if args.all_columns else KEEP_KEYS, start_year, end_year, fos_list)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    count = run_pipeline(args.inputs, args.output, stages)
+    print(f"{count} enregistrements écrits dans : {args.output}")
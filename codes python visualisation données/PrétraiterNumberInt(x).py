@@ -1,5 +1,7 @@
 import re
 import os
+import argparse
+from ExecutionParallele import add_workers_argument, run_sharded, report_failures
 
 def preprocess_json(input_path, output_path):
     # Expression régulière pour trouver "NumberInt(x)" et le remplacer par "x"
@@ -12,16 +14,19 @@ def preprocess_json(input_path, output_path):
             new_line = pattern.sub(r'\1', line)
             output_file.write(new_line)
 
-# Obtenir le chemin du répertoire du script
-current_dir = os.path.dirname(os.path.abspath(__file__))
+if __name__ == "__main__":
+    parser = add_workers_argument(argparse.ArgumentParser(description="Remplacer les 'NumberInt' par des entiers standards."))
+    args = parser.parse_args()
 
-# Chemin relatif pour les fichiers d'entrée et de sortie
-base_input_path = os.path.join(current_dir, '..', 'Dataset', 'Split Standart', 'Split_{}_Standart.json')
-base_output_path = os.path.join(current_dir, '..', 'Dataset', 'Split_prétraité', 'Split_{}_prétraité.json')
+    # Obtenir le chemin du répertoire du script
+    current_dir = os.path.dirname(os.path.abspath(__file__))
 
-# Boucler sur les fichiers de 1 à 9
-for i in range(1, 10):
-    input_json_path = base_input_path.format(i)
-    processed_json_path = base_output_path.format(i)
-    preprocess_json(input_json_path, processed_json_path)
-    print(f"Le fichier {input_json_path} a été prétraité pour remplacer les 'NumberInt' par des entiers standards.")
+    # Chemin relatif pour les fichiers d'entrée et de sortie
+    base_input_path = os.path.join(current_dir, '..', 'Dataset', 'Split Standart', 'Split_{}_Standart.json')
+    base_output_path = os.path.join(current_dir, '..', 'Dataset', 'Split_prétraité', 'Split_{}_prétraité.json')
+
+    # Les fichiers de 1 à 9 sont indépendants : les traiter en parallèle
+    tasks = [(base_input_path.format(i), base_output_path.format(i)) for i in range(1, 10)]
+    results, failures = run_sharded(preprocess_json, tasks, args.workers, desc="Prétraitement NumberInt")
+    report_failures(failures)
+    print(f"{len(tasks) - len(failures)} fichiers ont été prétraités pour remplacer les 'NumberInt' par des entiers standards.")
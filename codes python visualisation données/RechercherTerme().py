@@ -1,48 +1,41 @@
-import json
 import os
-
-def search_term_in_files(directory, term):
-    results = {}
-    files = [f for f in os.listdir(directory) if f.endswith('.json')]
-    
-    for filename in files:
-        file_path = os.path.join(directory, filename)
-        with open(file_path, 'r', encoding='utf-8') as file:
-            try:
-                data = json.load(file)
-            
-                if isinstance(data, dict):  
-                    data = [data]
-                for record in data:
-                    for key, value in record.items():
-                        if isinstance(value, str) and term.lower() in value.lower():
-                            if filename not in results:
-                                results[filename] = []
-                            results[filename].append((record['_id'], key, value))
-                        elif isinstance(value, list):  # Si le champ est une liste, cherchez dans chaque élément
-                            for item in value:
-                                if isinstance(item, str) and term.lower() in item.lower():
-                                    if filename not in results:
-                                        results[filename] = []
-                                    results[filename].append((record['_id'], key, item))
-            except json.JSONDecodeError:
-                print(f"Error decoding JSON from file {filename}")
-            except Exception as e:
-                print(f"Error processing file {filename}: {e}")
-    
-    return results
+import argparse
+from IndexRecherche import SearchIndex, INDEXED_FIELDS
 
 # Obtenir le chemin du répertoire du script
 current_dir = os.path.dirname(os.path.abspath(__file__))
 
-# Utilisation
-directory = os.path.join(current_dir, '..', 'Dataset', 'Split_nettoyé')
-term = 'Delbot'
-results = search_term_in_files(directory, term)
+DEFAULT_INDEX_PATH = os.path.join(current_dir, 'output', 'index_recherche.sqlite')
+
+def search_term_in_files(directory, term, index_path=DEFAULT_INDEX_PATH, fields=None, limit=None):
+    """ Hits of term grouped by file: {filename: [(_id, field, value), ...]}.
+
+    The search goes through the persistent inverted index (prefix and case-insensitive matching on
+    titles, author names, organisations and FOS); new or modified splits are indexed first.
+    """
+    index = SearchIndex(index_path)
+    try:
+        index.update(directory)
+        results = {}
+        for filename, record_id, field, value in index.search(term, fields, limit):
+            results.setdefault(filename, []).append((record_id, field, value))
+        return results
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recherche d'un terme dans les titres, auteurs, organisations et domaines des fichiers.")
+    parser.add_argument('term', nargs='?', default='Delbot', help="Terme recherché (chaque mot est un préfixe, sans tenir compte de la casse)")
+    parser.add_argument('--fields', nargs='+', choices=INDEXED_FIELDS, help="Limiter la recherche à ces champs")
+    parser.add_argument('--limit', type=int, help="Nombre maximal de résultats")
+    args = parser.parse_args()
 
-# Afficher les résultats
-for filename, hits in results.items():
-    print(f"Found in {filename}:")
-    for hit in hits:
-        print(f"  ID: {hit[0]}, Field: {hit[1]}, Value: {hit[2]}")
+    # Utilisation
+    directory = os.path.join(current_dir, '..', 'Dataset', 'Split_nettoyé')
+    results = search_term_in_files(directory, args.term, fields=args.fields, limit=args.limit)
 
+    # Afficher les résultats
+    for filename, hits in results.items():
+        print(f"Found in {filename}:")
+        for hit in hits:
+            print(f"  ID: {hit[0]}, Field: {hit[1]}, Value: {hit[2]}")
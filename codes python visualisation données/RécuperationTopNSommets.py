@@ -1,63 +1,27 @@
 import os
 import json
+import argparse
 from tqdm import tqdm
+from LireEnregistrements import DECODE_ERRORS
+from SelectionTopN import stream_top_nodes, global_top_nodes
+from ExecutionParallele import add_workers_argument
 
 def list_json_files(directory):
-    """List all JSON files in a directory."""
-    return [file for file in os.listdir(directory) if file.endswith('.json')]
+    """List all JSON (or Parquet) files in a directory."""
+    return [file for file in os.listdir(directory) if file.endswith('.json') or file.endswith('.parquet')]
 
 def extract_top_nodes(file_path, top_n=1000, network_type='1'):
-    """Extract the top_n nodes with the highest number of citations or collaborations."""
+    """ Extract the top_n nodes with the highest number of citations (papers) or collaborations (authors).
+
+    Degrees are counted in integer arrays over the record stream and only the winners' records are
+    read again, so memory depends on the number of distinct ids, not on the size of the file.
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-    except json.JSONDecodeError:
+        return stream_top_nodes(file_path, top_n, network_type)
+    except DECODE_ERRORS:
         print(f"Failed to decode JSON from {file_path}")
         return []
 
-    # Initialize dictionaries to count citations or collaborations
-    in_degree_counts = {}
-    out_degree_counts = {}
-    node_data = {}
-
-    for record in data:
-        node_id = record.get('_id')
-        if node_id in (None, 'unknown'):
-            continue
-
-        # Initialize node data
-        if node_id not in node_data:
-            node_data[node_id] = record.copy()
-            node_data[node_id]['degré entrant'] = 0
-            node_data[node_id]['degré sortant'] = 0
-
-        if network_type == '1':
-            if 'references' in record and isinstance(record['references'], list):
-                for ref in record['references']:
-                    if ref and ref != 'unknown':
-                        in_degree_counts[ref] = in_degree_counts.get(ref, 0) + 1
-        elif network_type == '2':
-            if 'authors' in record and isinstance(record['authors'], list):
-                authors = [author.get('_id') for author in record['authors'] if author.get('_id') and author.get('_id') != 'unknown']
-                for author in authors:
-                    out_degree_counts[author] = out_degree_counts.get(author, 0) + len(authors) - 1
-
-    # Update node data with degree counts
-    for node_id, in_degree in in_degree_counts.items():
-        if node_id in node_data:
-            node_data[node_id]['degré entrant'] = in_degree
-    for node_id, out_degree in out_degree_counts.items():
-        if node_id in node_data:
-            node_data[node_id]['degré sortant'] = out_degree
-
-    # Sort nodes by counts and select top_n
-    if network_type == '1':
-        sorted_nodes = sorted(node_data.values(), key=lambda x: x['degré entrant'], reverse=True)[:top_n]
-    else:
-        sorted_nodes = sorted(node_data.values(), key=lambda x: x['degré sortant'], reverse=True)[:top_n]
-
-    return sorted_nodes
-
 def save_json(data, output_path):
     """Save data to a JSON file."""
     with open(output_path, 'w', encoding='utf-8') as f:
@@ -85,32 +49,40 @@ def process_directory(source_directory, output_directory, top_n=1000, network_ty
 
     # Remove individual JSON files
     for file in list_json_files(output_directory):
-        if file != os.path.basename(merged_json_filename):
+        if file.endswith('.json') and file != os.path.basename(merged_json_filename):
             os.remove(os.path.join(output_directory, file))
     print("Individual JSON files have been deleted.")
 
-# Configuration utilisateur
-current_dir = os.path.dirname(os.path.abspath(__file__))
-
-source_directory = os.path.join(current_dir, '..', 'Dataset', 'Split_fusionné', 'Année')
-output_directory = os.path.join(current_dir, '..', 'Dataset', 'Split_fusionné', 'collaboration')
-network_type = input("Tapez '1' pour un réseau de citations, '2' pour un réseau de collaboration : ").strip().lower()
-top_n = 1000
-
-# Ensure the output directory exists
-if not os.path.exists(output_directory):
-    os.makedirs(output_directory)
-
-# Process files
-process_directory(source_directory, output_directory, top_n, network_type)
-
-
-
-
-
-
-
-
-
-
-
+def process_directory_global(source_directory, output_directory, top_n=1000, network_type='1', workers=1):
+    """ Global top_n over all the files of a directory (map-reduce on cached per-file counts). """
+    files = [os.path.join(source_directory, file) for file in sorted(list_json_files(source_directory))]
+    top_nodes_data = global_top_nodes(files, top_n, network_type, workers)
+    global_json_filename = os.path.join(output_directory, f"global_top_{top_n}_{network_type}.json")
+    save_json(top_nodes_data, global_json_filename)
+    print(f"Global top {top_n} nodes for {network_type} saved to {global_json_filename}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sommets les plus cités (articles) ou les plus collaboratifs (auteurs).")
+    parser.add_argument('--top', type=int, default=1000, help="Nombre de sommets à garder (défaut : 1000)")
+    parser.add_argument('--per-file', action='store_true',
+                        help="Ancien mode : un classement par fichier, concaténés dans merged_top_N (sans somme entre fichiers)")
+    add_workers_argument(parser)
+    args = parser.parse_args()
+
+    # Configuration utilisateur
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+
+    source_directory = os.path.join(current_dir, '..', 'Dataset', 'Split_fusionné', 'Année')
+    output_directory = os.path.join(current_dir, '..', 'Dataset', 'Split_fusionné', 'collaboration')
+    network_type = input("Tapez '1' pour un réseau de citations, '2' pour un réseau de collaboration : ").strip().lower()
+    top_n = args.top
+
+    # Ensure the output directory exists
+    if not os.path.exists(output_directory):
+        os.makedirs(output_directory)
+
+    # Process files : comptages partiels en cache, relancer avec un autre --top ne relit que les gagnants
+    if args.per_file:
+        process_directory(source_directory, output_directory, top_n, network_type)
+    else:
+        process_directory_global(source_directory, output_directory, top_n, network_type, args.workers)
@@ -1,46 +1,38 @@
 import os
-import json
-
-# Obtenir le chemin du répertoire du script
-current_dir = os.path.dirname(os.path.abspath(__file__))
-
-# Chemin relatif vers le fichier d'entrée
-input_path = os.path.join(current_dir, '..', 'Dataset', 'Dataset publication scientifique JSON.json')
-# Chemin de base relatif pour les fichiers de sortie
-base_output_path = os.path.join(current_dir, '..', 'Dataset', 'Split_')
-
-def split_json_file(input_path, base_output_path, chunk_size=2 * 10**9):
-    with open(input_path, 'r', encoding='utf-8') as big_file:
-        file_count = 1
-        current_file = open(f'{base_output_path}{file_count}.json', 'w', encoding='utf-8')
-        current_file.write('[')  # Ouvrir la balise JSON pour le premier fichier
-        current_size = 0
-        first_record = True
-
-        for line in big_file:
-            record_size = len(line.encode('utf-8'))
-            # Vérifier si ajouter cette ligne dépasserait la taille de chunk_size
-            if current_size + record_size > chunk_size:
-                current_file.write(']')  # Fermer la balise JSON pour le fichier actuel
-                current_file.close()
-                file_count += 1
-                current_file = open(f'{base_output_path}{file_count}.json', 'w', encoding='utf-8')
-                current_file.write('[')  # Ouvrir la balise JSON pour le nouveau fichier
-                current_size = 0
-                first_record = True  # Réinitialiser le drapeau pour le premier enregistrement
-
-            # Ajouter une virgule avant chaque enregistrement sauf le premier
-            if not first_record:
-                current_file.write(',\n')
-            else:
-                first_record = False
-
-            current_file.write(line.strip())
-            current_size += record_size
-
-        current_file.write(']')  # Fermer la balise JSON pour le dernier fichier
-        current_file.close()
-
-split_json_file(input_path, base_output_path)
-
-print("Splitting completed.")
+import argparse
+from ExecutionParallele import add_workers_argument, run_sharded, report_failures
+from IndexEnregistrements import RecordIndex, write_records_range
+
+def split_json_file(input_path, base_output_path, chunk_size=2 * 10**9, workers=1, output_format='json', number_int=False):
+    """ Split a large dump into chunks of about chunk_size bytes, each a valid JSON array (or JSON lines file).
+
+    The record offset index is built once (and kept next to the dump), then the chunks are written
+    in parallel, each worker copying its own range of records. Returns the paths of the chunks.
+    """
+    index = RecordIndex.load_or_build(input_path)
+    extension = '.jsonl' if output_format == 'jsonl' else '.json'
+    tasks = [(input_path, index.offsets[first:last], f'{base_output_path}{count}{extension}', output_format, number_int)
+             for count, (first, last) in enumerate(index.ranges(chunk_size), start=1)]
+    results, failures = run_sharded(write_records_range, tasks, workers, desc="Écriture des fichiers")
+    report_failures(failures)
+    print(f"{sum(count for count in results if count)} enregistrements répartis dans {len(tasks)} fichiers.")
+    return [task[2] for task in tasks]
+
+if __name__ == "__main__":
+    parser = add_workers_argument(argparse.ArgumentParser(description="Découper le fichier brut en fichiers JSON valides d'environ 2 Go."))
+    parser.add_argument('--chunk-size', type=float, default=2e9, help="Taille maximale d'un fichier en octets (défaut : 2e9)")
+    parser.add_argument('--format', choices=['json', 'jsonl'], default='json', help="Tableau JSON ou JSON lines (défaut : json)")
+    parser.add_argument('--number-int', action='store_true', help="Réécrire aussi les 'NumberInt(x)' en entiers pendant le découpage")
+    args = parser.parse_args()
+
+    # Obtenir le chemin du répertoire du script
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+
+    # Chemin relatif vers le fichier d'entrée
+    input_path = os.path.join(current_dir, '..', 'Dataset', 'Dataset publication scientifique JSON.json')
+    # Chemin de base relatif pour les fichiers de sortie
+    base_output_path = os.path.join(current_dir, '..', 'Dataset', 'Split_')
+
+    split_json_file(input_path, base_output_path, int(args.chunk_size), args.workers, args.format, args.number_int)
+
+    print("Splitting completed.")
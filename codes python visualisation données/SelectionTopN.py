@@ -0,0 +1,195 @@
+import os
+from array import array
+import numpy as np
+from GrapheCompact import IdInterner
+from LireEnregistrements import iter_records
+from ExecutionParallele import run_sharded, report_failures
+
+# À incrémenter quand le contenu des comptages partiels change
+COUNTS_VERSION = 1
+
+DEFAULT_COUNTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output', 'comptages_topn')
+
+class DegreeCounter:
+    """ Streaming degree counts in integer arrays indexed by interned ids.
+
+    Citation ('1'): in-degree of every paper from the references of the records; only papers that
+    have a record of their own are candidates, ranked by first record position on ties.
+    Collaboration ('2'): number of co-author slots of every author (len(authors) - 1 per paper).
+    Memory grows with the number of distinct ids, never with the number of records.
+    """
+
+    def __init__(self, network_type='1'):
+        self.network_type = network_type
+        self.interner = IdInterner()
+        self.counts = array('q')
+        # Position du premier enregistrement du sommet, -1 s'il n'a été vu que cité
+        self.positions = array('q')
+        self.records = 0
+
+    def _node(self, key):
+        node = self.interner.intern(key)
+        if node == len(self.counts):
+            self.counts.append(0)
+            self.positions.append(-1)
+        return node
+
+    def add(self, record):
+        if self.network_type == '1':
+            node_id = record.get('_id')
+            if node_id in (None, 'unknown'):
+                return
+            node = self._node(node_id)
+            if self.positions[node] < 0:
+                self.positions[node] = self.records
+            self.records += 1
+            references = record.get('references')
+            if isinstance(references, list):
+                for ref in references:
+                    if ref and ref != 'unknown':
+                        self.counts[self._node(ref)] += 1
+        else:
+            authors = record.get('authors')
+            if not isinstance(authors, list):
+                return
+            authors = [author.get('_id') for author in authors
+                       if isinstance(author, dict) and author.get('_id') and author.get('_id') != 'unknown']
+            for author in authors:
+                node = self._node(author)
+                if self.positions[node] < 0:
+                    self.positions[node] = self.records
+                self.counts[node] += len(authors) - 1
+            self.records += 1
+
+    def update(self, records):
+        for record in records:
+            self.add(record)
+        return self
+
+    def to_arrays(self):
+        """ (ids, counts, positions) as NumPy arrays, the form in which partial counts are cached and merged. """
+        return (np.array(self.interner.ids, dtype=str), np.frombuffer(self.counts, dtype=np.int64).copy(),
+                np.frombuffer(self.positions, dtype=np.int64).copy())
+
+    def top(self, top_n):
+        """ The top_n (id, count) pairs among the candidates, best first. """
+        counts = np.frombuffer(self.counts, dtype=np.int64)
+        positions = np.frombuffer(self.positions, dtype=np.int64)
+        candidates = np.flatnonzero(positions >= 0)
+        best = candidates[top_indices(counts[candidates], top_n, positions[candidates])]
+        return [(self.interner.ids[i], int(counts[i])) for i in best]
+
+def top_indices(scores, top_n, order=None):
+    """ Indices of the top_n largest scores, best first, with a partial partition instead of a full sort.
+
+    Ties are broken by increasing order (the index itself by default), so the result is the same
+    as a stable descending sort truncated to top_n.
+    """
+    scores = np.asarray(scores)
+    top_n = min(top_n, len(scores))
+    if top_n <= 0:
+        return np.zeros(0, dtype=np.int64)
+    order = np.arange(len(scores)) if order is None else np.asarray(order)
+    threshold = np.partition(scores, len(scores) - top_n)[len(scores) - top_n]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)
+    ties = ties[np.argsort(order[ties], kind='stable')][:top_n - len(above)]
+    chosen = np.concatenate([above, ties])
+    return chosen[np.lexsort((order[chosen], -scores[chosen]))]
+
+def fetch_winners(records, winners, network_type='1'):
+    """ Second pass: the first full record (paper, or author entry for a collaboration network) of each winner id. """
+    found = {}
+    for record in records:
+        if network_type == '1':
+            node_id = record.get('_id')
+            if node_id in winners and node_id not in found:
+                found[node_id] = dict(record)
+        else:
+            for author in record.get('authors') or []:
+                if isinstance(author, dict) and author.get('_id') in winners and author['_id'] not in found:
+                    found[author['_id']] = dict(author)
+        # Arrêter la lecture dès que tous les gagnants sont trouvés
+        if len(found) == len(winners):
+            break
+    return found
+
+def _with_degrees(found, ranking, network_type):
+    return [dict(found.get(node_id, {'_id': node_id}), **{'degré entrant': count if network_type == '1' else 0,
+                                                          'degré sortant': count if network_type != '1' else 0})
+            for node_id, count in ranking]
+
+def stream_top_nodes(file_path, top_n=1000, network_type='1'):
+    """ Top_n nodes of a record file in two passes: degree counts, then full records of the winners only. """
+    ranking = DegreeCounter(network_type).update(iter_records(file_path)).top(top_n)
+    found = fetch_winners(iter_records(file_path), {node_id for node_id, _ in ranking}, network_type)
+    return _with_degrees(found, ranking, network_type)
+
+def partial_counts(file_path, network_type='1', cache_directory=DEFAULT_COUNTS_DIRECTORY):
+    """ Map step: degree counts of one file, cached as .npz and reused while the file size and date are unchanged.
+
+    Returns the path of the cached counts (ids, counts, first record positions, number of records).
+    """
+    stat = os.stat(file_path)
+    signature = f"{COUNTS_VERSION}|{network_type}|{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    base_filename = os.path.splitext(os.path.basename(file_path.rstrip(os.sep)))[0]
+    cache_path = os.path.join(cache_directory, f"{base_filename}_{network_type}.npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as saved:
+            if saved['signature'].item() == signature:
+                return cache_path
+    counter = DegreeCounter(network_type).update(iter_records(file_path))
+    ids, counts, positions = counter.to_arrays()
+    os.makedirs(cache_directory, exist_ok=True)
+    temporary_path = cache_path + '.tmp'
+    with open(temporary_path, 'wb') as f:
+        np.savez(f, signature=np.array(signature), ids=ids, counts=counts, positions=positions, records=np.array(counter.records))
+    os.replace(temporary_path, cache_path)
+    return cache_path
+
+def merge_counts(partial_paths):
+    """ Reduce step: sum the partial counts of the files (in order) per id.
+
+    Returns (ids, counts, positions, offsets): positions are global first record positions (-1 for
+    ids that never had a record) and file i owns the positions [offsets[i], offsets[i + 1]).
+    """
+    all_ids, all_counts, all_positions, offsets = [], [], [], [0]
+    for path in partial_paths:
+        with np.load(path) as saved:
+            all_ids.append(saved['ids'])
+            all_counts.append(saved['counts'])
+            all_positions.append(np.where(saved['positions'] >= 0, saved['positions'] + offsets[-1], -1))
+            offsets.append(offsets[-1] + int(saved['records']))
+    if not all_ids:
+        return np.zeros(0, dtype=str), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.array(offsets)
+    ids, inverse = np.unique(np.concatenate(all_ids), return_inverse=True)
+    counts = np.zeros(len(ids), dtype=np.int64)
+    np.add.at(counts, inverse, np.concatenate(all_counts))
+    # Première position connue : minimum des positions valides (les -1 passent au maximum)
+    positions = np.full(len(ids), np.iinfo(np.int64).max, dtype=np.int64)
+    partial_positions = np.concatenate(all_positions)
+    np.minimum.at(positions, inverse, np.where(partial_positions >= 0, partial_positions, np.iinfo(np.int64).max))
+    positions[positions == np.iinfo(np.int64).max] = -1
+    return ids, counts, positions, np.array(offsets)
+
+def global_top_nodes(file_paths, top_n=1000, network_type='1', workers=1, cache_directory=DEFAULT_COUNTS_DIRECTORY):
+    """ True top_n over all the files: cached per-file counts (in parallel), summed per id, then one selection.
+
+    Citations of a paper spread over several files are added up and every node appears once. Only
+    the files holding the first record of a winner are read again, until all their winners are found.
+    """
+    tasks = [(file_path, network_type, cache_directory) for file_path in file_paths]
+    partial_paths, failures = run_sharded(partial_counts, tasks, workers, desc="Comptage des degrés")
+    report_failures(failures)
+    ids, counts, positions, offsets = merge_counts([path for path in partial_paths if path])
+    candidates = np.flatnonzero(positions >= 0)
+    best = candidates[top_indices(counts[candidates], top_n, positions[candidates])]
+    ranking = [(str(ids[i]), int(counts[i])) for i in best]
+
+    found = {}
+    file_of = np.searchsorted(offsets, positions[best], side='right') - 1
+    readable = [file_path for file_path, path in zip(file_paths, partial_paths) if path]
+    for file_index in np.unique(file_of):
+        winners = {str(ids[i]) for i in best[file_of == file_index]}
+        found.update(fetch_winners(iter_records(readable[file_index]), winners, network_type))
+    return _with_degrees(found, ranking, network_type)
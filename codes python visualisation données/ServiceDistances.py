@@ -0,0 +1,199 @@
+import os
+import gzip
+import json
+import time
+import numpy as np
+from scipy.sparse.csgraph import shortest_path
+from DetectionCommunautes import graph_fingerprint
+
+# Distance enregistrée pour un sommet inaccessible dans l'index des repères
+UNREACHABLE = np.iinfo(np.uint16).max
+
+# Au-delà, la matrice de toutes les distances n'est pas écrite (2 n² octets avant compression)
+ALL_PAIRS_LIMIT = 20000
+
+def _bfs_distances(adjacency, sources):
+    """ Hop distances from each source (one row per source), UNREACHABLE when there is no path. """
+    distances = shortest_path(adjacency, method='D', unweighted=True, indices=sources)
+    distances = np.atleast_2d(distances)
+    return np.where(np.isinf(distances), UNREACHABLE, np.minimum(distances, UNREACHABLE - 1)).astype(np.uint16)
+
+def _expand(indptr, indices, frontier):
+    """ (source, neighbour) pairs of all the edges leaving the frontier nodes, without a Python loop. """
+    starts = indptr[frontier]
+    counts = indptr[frontier + 1] - starts
+    offsets = np.cumsum(counts) - counts
+    positions = np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+    return np.repeat(frontier, counts), indices[positions]
+
+class DistanceService:
+    """ Shortest paths on demand: landmark (ALT) index for distance bounds, bidirectional BFS for exact paths.
+
+    The index holds the hop distances from and to a few landmark nodes. For any pair of nodes it
+    gives a lower and an upper bound of their distance in O(landmarks), and the lower bound prunes
+    the nodes of the bidirectional search that cannot be on a shortest path.
+    """
+
+    def __init__(self, graph, landmarks=None, distances_from=None, distances_to=None):
+        self.graph = graph
+        self.adjacency = graph.to_csr()
+        self.adjacency_t = self.adjacency.T.tocsr() if graph.directed else self.adjacency
+        self.landmarks = np.zeros(0, dtype=np.int64) if landmarks is None else landmarks
+        self.distances_from = distances_from
+        self.distances_to = distances_to
+
+    def build_index(self, num_landmarks=16):
+        """ Choose landmarks (highest degree first, then farthest from the chosen ones) and run their BFS. """
+        n = self.graph.num_nodes
+        num_landmarks = min(num_landmarks, n)
+        landmarks = []
+        distances_from, distances_to = [], []
+        closest = np.full(n, UNREACHABLE, dtype=np.int64)
+        degree = self.graph.degree()
+        for _ in range(num_landmarks):
+            if not landmarks:
+                candidate = int(np.argmax(degree))
+            else:
+                # Le sommet accessible le plus éloigné des repères déjà choisis (à degré égal, le plus connecté)
+                reachable = closest < UNREACHABLE
+                reachable[landmarks] = False
+                if not reachable.any():
+                    break
+                score = np.where(reachable, closest * (degree.max() + 1) + degree, -1)
+                candidate = int(np.argmax(score))
+            landmarks.append(candidate)
+            distances_from.append(_bfs_distances(self.adjacency, candidate)[0])
+            distances_to.append(_bfs_distances(self.adjacency_t, candidate)[0] if self.graph.directed else distances_from[-1])
+            closest = np.minimum(closest, np.minimum(distances_from[-1], distances_to[-1]))
+        self.landmarks = np.array(landmarks, dtype=np.int64)
+        self.distances_from = np.array(distances_from, dtype=np.uint16).reshape(len(landmarks), n)
+        self.distances_to = np.array(distances_to, dtype=np.uint16).reshape(len(landmarks), n)
+        return self
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez(f, fingerprint=np.array(graph_fingerprint(self.graph)), landmarks=self.landmarks,
+                     distances_from=self.distances_from, distances_to=self.distances_to)
+
+    @classmethod
+    def load_or_build(cls, graph, index_path, num_landmarks=16):
+        """ Service with the landmark index saved at index_path, rebuilt when the graph has changed. """
+        if os.path.exists(index_path):
+            with np.load(index_path) as saved:
+                if saved['fingerprint'].item() == graph_fingerprint(graph):
+                    return cls(graph, saved['landmarks'], saved['distances_from'], saved['distances_to'])
+        service = cls(graph).build_index(num_landmarks)
+        os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+        service.save(index_path)
+        return service
+
+    def bounds(self, source, targets):
+        """ Lower and upper bounds of the distances from node index source to node indices targets. """
+        targets = np.atleast_1d(targets)
+        lower = np.zeros(len(targets), dtype=np.int64)
+        upper = np.full(len(targets), np.inf)
+        if not len(self.landmarks):
+            return lower, upper
+        from_source = self.distances_from[:, source].astype(np.int64)[:, None]
+        to_source = self.distances_to[:, source].astype(np.int64)[:, None]
+        from_target = self.distances_from[:, targets].astype(np.int64)
+        to_target = self.distances_to[:, targets].astype(np.int64)
+        # Inégalité triangulaire : d(L, t) - d(L, s) <= d(s, t) et d(s, L) - d(t, L) <= d(s, t)
+        known = (from_source < UNREACHABLE) & (from_target < UNREACHABLE)
+        lower = np.maximum(lower, np.where(known, from_target - from_source, 0).max(axis=0))
+        known = (to_source < UNREACHABLE) & (to_target < UNREACHABLE)
+        lower = np.maximum(lower, np.where(known, to_source - to_target, 0).max(axis=0))
+        through = np.where((to_source < UNREACHABLE) & (from_target < UNREACHABLE), to_source + from_target, np.inf)
+        return lower, np.minimum(upper, through.min(axis=0))
+
+    def bounds_to(self, sources, target):
+        """ Lower bounds of the distances from node indices sources to node index target. """
+        sources = np.atleast_1d(sources)
+        from_source = self.distances_from[:, sources].astype(np.int64)
+        to_source = self.distances_to[:, sources].astype(np.int64)
+        from_target = self.distances_from[:, target].astype(np.int64)[:, None]
+        to_target = self.distances_to[:, target].astype(np.int64)[:, None]
+        known = (from_source < UNREACHABLE) & (from_target < UNREACHABLE)
+        lower = np.where(known, from_target - from_source, 0).max(axis=0)
+        known = (to_source < UNREACHABLE) & (to_target < UNREACHABLE)
+        return np.maximum(np.maximum(lower, 0), np.where(known, to_source - to_target, 0).max(axis=0))
+
+    def distances_from_node(self, source, targets=None):
+        """ One-to-many hop distances (-1 when unreachable) from a node id, to every node or to the given ids. """
+        distances = _bfs_distances(self.adjacency, self.graph.index[source])[0].astype(np.int64)
+        distances[distances == UNREACHABLE] = -1
+        if targets is None:
+            return distances
+        return distances[[self.graph.index[target] for target in targets]]
+
+    def shortest_path(self, source, target):
+        """ A shortest path between two node ids (list of ids), None when there is none or a node is unknown. """
+        if source not in self.graph.index or target not in self.graph.index:
+            return None
+        s, t = self.graph.index[source], self.graph.index[target]
+        if s == t:
+            return [source]
+        _, upper = self.bounds(s, t)
+        upper = upper[0]
+        n = self.graph.num_nodes
+        parents = [np.full(n, -2, dtype=np.int64), np.full(n, -2, dtype=np.int64)]
+        depth = [np.full(n, -1, dtype=np.int64), np.full(n, -1, dtype=np.int64)]
+        parents[0][s], parents[1][t] = -1, -1
+        depth[0][s], depth[1][t] = 0, 0
+        frontiers = [np.array([s]), np.array([t])]
+        matrices = [self.adjacency, self.adjacency_t]
+        levels = [0, 0]
+
+        while len(frontiers[0]) and len(frontiers[1]):
+            # Étendre le côté dont la frontière a le moins d'arêtes sortantes
+            side = int(np.diff(matrices[1].indptr)[frontiers[1]].sum() < np.diff(matrices[0].indptr)[frontiers[0]].sum())
+            sources, neighbours = _expand(matrices[side].indptr, matrices[side].indices, frontiers[side])
+            fresh = parents[side][neighbours] == -2
+            neighbours, first = np.unique(neighbours[fresh], return_index=True)
+            sources = sources[fresh][first]
+            levels[side] += 1
+            if np.isfinite(upper) and len(self.landmarks):
+                # Élagage ALT : un sommet trop loin de l'autre extrémité ne peut pas être sur un plus court chemin
+                lower = self.bounds(s, neighbours)[0] if side == 1 else self.bounds_to(neighbours, t)
+                keep = levels[side] + lower <= upper
+                neighbours, sources = neighbours[keep], sources[keep]
+            parents[side][neighbours] = sources
+            depth[side][neighbours] = levels[side]
+            frontiers[side] = neighbours
+
+            meeting = neighbours[depth[1 - side][neighbours] >= 0]
+            if len(meeting):
+                middle = meeting[np.argmin(depth[0][meeting] + depth[1][meeting])]
+                return self._join(parents, middle)
+        return None
+
+    def _join(self, parents, middle):
+        path = []
+        node = middle
+        while node >= 0:
+            path.append(node)
+            node = parents[0][node]
+        path.reverse()
+        node = parents[1][middle]
+        while node >= 0:
+            path.append(node)
+            node = parents[1][node]
+        return [self.graph.ids[node] for node in path]
+
+    def write_all_pairs(self, path, block_size=256):
+        """ Stream the all-pairs hop distance matrix to a gzip-compressed .npy file (readable with np.load(gzip.open(path))).
+
+        Rows are computed and written by blocks of sources, so memory stays at block_size * n; distances
+        are uint16 with UNREACHABLE for missing paths. The node ids are written next to it as JSON.
+        """
+        n = self.graph.num_nodes
+        if n > ALL_PAIRS_LIMIT:
+            raise ValueError(f"Graphe trop grand pour la matrice complète ({n} sommets, limite {ALL_PAIRS_LIMIT}).")
+        start = time.time()
+        with gzip.open(path, 'wb') as f:
+            np.lib.format.write_array_header_1_0(f, {'descr': np.dtype(np.uint16).str, 'fortran_order': False, 'shape': (n, n)})
+            for first in range(0, n, block_size):
+                f.write(_bfs_distances(self.adjacency, np.arange(first, min(first + block_size, n))).tobytes())
+        with open(os.path.splitext(path)[0] + '.ids.json', 'w', encoding='utf-8') as f:
+            json.dump(self.graph.ids, f)
+        return time.time() - start
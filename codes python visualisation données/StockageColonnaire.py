@@ -0,0 +1,157 @@
+import os
+import shutil
+from collections import Counter
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Schéma des enregistrements nettoyés (colonnes de NettoyerColonnes)
+# Champs des auteurs de l'export AMiner : tous conservés, un champ inconnu est signalé à l'écriture
+AUTHOR_FIELDS = ('_id', 'name', 'org', 'gid', 'oid', 'orgid', 'sid', 'email', 'bio')
+AUTHOR_TYPE = pa.struct([(field, pa.string()) for field in AUTHOR_FIELDS] + [('orgs', pa.list_(pa.string()))])
+RECORD_SCHEMA = pa.schema([
+    ('_id', pa.string()),
+    ('title', pa.string()),
+    ('authors', pa.list_(AUTHOR_TYPE)),
+    ('year', pa.int32()),
+    ('fos', pa.list_(pa.string())),
+    ('references', pa.list_(pa.string())),
+])
+PARTITIONING = ds.partitioning(pa.schema([('year', pa.int32())]), flavor='hive')
+
+
+def _to_author(author, dropped):
+    """ Normalize an author dict to AUTHOR_TYPE, counting the keys the schema cannot hold in dropped. """
+    row = {field: None if author.get(field) is None else str(author[field]) for field in AUTHOR_FIELDS}
+    orgs = author.get('orgs')
+    row['orgs'] = [str(org) for org in orgs if org is not None] if isinstance(orgs, list) else None
+    dropped.update(key for key in author if key not in AUTHOR_TYPE.names)
+    return row
+
+
+def _to_row(record, dropped):
+    """ Normalize a JSON record to the columnar schema (missing or malformed fields become null). """
+    year = record.get('year')
+    return {
+        '_id': record.get('_id'),
+        'title': record.get('title'),
+        'authors': [_to_author(a, dropped) for a in record.get('authors') or [] if isinstance(a, dict)] or None,
+        'year': int(year) if isinstance(year, (int, float)) else None,
+        'fos': record.get('fos') if isinstance(record.get('fos'), list) else None,
+        'references': record.get('references') if isinstance(record.get('references'), list) else None,
+    }
+
+
+def _batches(records, batch_size, dropped):
+    rows = []
+    for record in records:
+        rows.append(_to_row(record, dropped))
+        if len(rows) >= batch_size:
+            yield pa.RecordBatch.from_pylist(rows, schema=RECORD_SCHEMA)
+            rows = []
+    if rows:
+        yield pa.RecordBatch.from_pylist(rows, schema=RECORD_SCHEMA)
+
+
+def write_parquet(records, output_path, batch_size=100_000, row_group_size=100_000):
+    """ Stream records into a Parquet dataset partitioned by year, replacing any previous dataset, and return the count. """
+    count = 0
+    dropped = Counter()
+
+    def counted(batches):
+        nonlocal count
+        for batch in batches:
+            count += batch.num_rows
+            yield batch
+
+    # Écriture dans un dossier temporaire puis remplacement : une réécriture ne garde aucun ancien fichier
+    temporary_path = output_path.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(temporary_path, ignore_errors=True)
+    ds.write_dataset(
+        counted(_batches(records, batch_size, dropped)), temporary_path, schema=RECORD_SCHEMA, format='parquet',
+        partitioning=PARTITIONING, basename_template="part-{i}.parquet",
+        existing_data_behavior='error',
+        min_rows_per_group=row_group_size, max_rows_per_group=row_group_size,
+    )
+    if not os.path.exists(temporary_path):
+        os.makedirs(temporary_path)
+    if os.path.isdir(output_path):
+        shutil.rmtree(output_path)
+    os.replace(temporary_path, output_path)
+    if dropped:
+        print(f"Champs d'auteur absents du schéma Parquet, non conservés : "
+              + ', '.join(f"{key} ({n})" for key, n in dropped.most_common()))
+    return count
+
+
+def _year_expression(start_year, end_year):
+    expression = None
+    if start_year is not None:
+        expression = ds.field('year') >= start_year
+    if end_year is not None:
+        upper = ds.field('year') <= end_year
+        expression = upper if expression is None else expression & upper
+    return expression
+
+
+def _fos_mask(table, fos_list):
+    """ Vectorized FOS membership: True for rows having at least one of the wanted FOS. """
+    fos = table.column('fos').combine_chunks()
+    hits = pc.is_in(pc.list_flatten(fos), value_set=pa.array(fos_list, pa.string()))
+    parents = pc.list_parent_indices(fos)
+    mask = np.zeros(table.num_rows, dtype=bool)
+    mask[pc.filter(parents, hits).to_numpy()] = True
+    return pa.array(mask)
+
+
+def _clean(value):
+    """ Drop the null fields introduced by the fixed schema so records look like the JSON ones. """
+    if isinstance(value, dict):
+        return {k: _clean(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_clean(v) for v in value]
+    return value
+
+
+def iter_parquet_tables(path, start_year=None, end_year=None, fos_list=None, columns=None):
+    """ Yield Arrow tables of the matching rows, skipping year partitions outside the range.
+
+    With fos_list, the 'fos' column of a row group is read first and the other columns are only
+    decoded for the row groups having at least one wanted FOS.
+    """
+    dataset = ds.dataset(path, format='parquet', partitioning=PARTITIONING if os.path.isdir(path) else None)
+    year_expression = _year_expression(start_year, end_year)
+    read_columns = None
+    if columns is not None:
+        read_columns = [c for c in columns if c != 'year' or not os.path.isdir(path)]
+
+    # Les partitions year=... hors de la plage ne sont même pas ouvertes
+    for fragment in dataset.get_fragments(filter=year_expression):
+        parquet_file = pq.ParquetFile(fragment.path)
+        for i in range(parquet_file.metadata.num_row_groups):
+            if fos_list:
+                # Colonne fos seule d'abord : un groupe sans FOS recherché n'est pas décodé
+                fos_mask = _fos_mask(parquet_file.read_row_group(i, columns=['fos']), fos_list)
+                if not pc.any(fos_mask).as_py():
+                    continue
+            table = parquet_file.read_row_group(i, columns=read_columns)
+            if fos_list:
+                table = table.filter(fos_mask)
+            if 'year' not in table.column_names and (columns is None or 'year' in columns):
+                # Réinjecter la colonne de partition
+                year_value = ds.get_partition_keys(fragment.partition_expression).get('year')
+                table = table.append_column('year', pa.array([year_value] * table.num_rows, pa.int32()))
+            if year_expression is not None and not os.path.isdir(path):
+                table = table.filter(year_expression)
+            if table.num_rows:
+                yield table
+
+
+def iter_parquet_records(path, start_year=None, end_year=None, fos_list=None, columns=None):
+    """ Yield the records of a Parquet file or dataset one at a time, as JSON-like dicts. """
+    for table in iter_parquet_tables(path, start_year, end_year, fos_list, columns):
+        for batch in table.to_batches():
+            for row in batch.to_pylist():
+                yield _clean(row)
@@ -0,0 +1,150 @@
+import os
+import json
+import argparse
+import numpy as np
+import scipy.sparse as sp
+from GrapheCompact import CompactGraph, IdInterner
+from DetectionCommunautes import cached_communities
+from FormatBinaireGraphe import load_compact
+from FluxGEXF import write_gexf
+from LireEnregistrements import iter_records
+
+def node_fos(graph, records=None, network_type='1'):
+    """ (nodes, codes, vocabulary): one (node index, FOS code) pair per field of study of a node.
+
+    FOS are read from the 'fos' column (strings joined by ', ', as written by DessinerGraphe) or,
+    when records are given, streamed from them: the FOS of a paper go to the paper (network_type '1')
+    or to each of its authors ('2').
+    """
+    vocabulary = IdInterner()
+    nodes, codes = [], []
+    if records is None:
+        for node, value in enumerate(graph.attributes.get('fos', [])):
+            for fos in str(value).split(', ') if value is not None else []:
+                if fos and fos != 'Unknown':
+                    nodes.append(node)
+                    codes.append(vocabulary.intern(fos))
+    else:
+        for record in records:
+            fos_list = [fos for fos in record.get('fos') or [] if isinstance(fos, str) and fos]
+            if network_type == '1':
+                keys = [record.get('_id')]
+            else:
+                keys = [author.get('_id') for author in record.get('authors') or [] if isinstance(author, dict)]
+            for node in (graph.index.get(key, -1) for key in keys):
+                if node >= 0:
+                    nodes.extend([node] * len(fos_list))
+                    codes.extend(vocabulary.intern(fos) for fos in fos_list)
+    return np.array(nodes, dtype=np.int64), np.array(codes, dtype=np.int64), list(vocabulary.ids)
+
+def _years(column):
+    """ Years as floats, NaN where missing (-1, empty string or not a number). """
+    column = np.asarray(column)
+    if np.issubdtype(column.dtype, np.number):
+        years = column.astype(np.float64)
+        years[years < 0] = np.nan
+        return years
+    # Colonne texte (graphes NetworkX de DessinerGraphe) : conversion valeur par valeur
+    years = np.full(len(column), np.nan)
+    for i, value in enumerate(column.tolist()):
+        try:
+            year = int(value)
+        except (TypeError, ValueError):
+            continue
+        if year >= 0:
+            years[i] = year
+    return years
+
+def dominant_fos(labels, nodes, codes, vocabulary, communities):
+    """ Most frequent FOS of every community ('Unknown' when none), ties broken by the first FOS met. """
+    dominant = np.full(communities, 'Unknown', dtype=object)
+    if len(nodes) == 0:
+        return dominant
+    keys, counts = np.unique(labels[nodes] * len(vocabulary) + codes, return_counts=True)
+    community, code = keys // len(vocabulary), keys % len(vocabulary)
+    # Tri par communauté puis par effectif décroissant : la première ligne de chaque communauté gagne
+    order = np.lexsort((code, -counts, community))
+    first = order[np.r_[True, community[order][1:] != community[order][:-1]]]
+    dominant[community[first]] = [vocabulary[c] for c in code[first]]
+    return dominant
+
+def community_supergraph(graph, labels, weight=None, fos=None):
+    """ Community-level summary of a CompactGraph in O(n + m) from a partition (labels).
+
+    One node per community ('c<k>') with its size, dominant FOS, year range and internal edge weight;
+    one edge per pair of linked communities, weighted by the number (or total weight) of the edges
+    between them, directed when the graph is. fos is the result of node_fos (computed from the
+    'fos' column when omitted).
+    """
+    labels = np.asarray(labels, dtype=np.int64)
+    communities = int(labels.max(initial=-1)) + 1
+    data = np.ones(len(graph.src)) if weight is None else np.asarray(graph.edge_attributes[weight], dtype=np.float64)
+    source, target = labels[graph.src], labels[graph.dst]
+    if not graph.directed:
+        source, target = np.minimum(source, target), np.maximum(source, target)
+    internal = source == target
+    internal_weight = np.bincount(source[internal], data[internal], minlength=communities)
+    links = sp.csr_matrix((data[~internal], (source[~internal], target[~internal])), shape=(communities, communities))
+    links.sum_duplicates()
+    links = links.tocoo()
+
+    sizes = np.bincount(labels, minlength=communities)
+    nodes, codes, vocabulary = node_fos(graph) if fos is None else fos
+    dominant = dominant_fos(labels, nodes, codes, vocabulary, communities)
+    attributes = {
+        'size': sizes.astype(np.int64),
+        'fos': dominant,
+        'internal_weight': internal_weight,
+        'label': np.array([f"Communauté {k} ({dominant[k]}, {sizes[k]} sommets)" for k in range(communities)], dtype=object),
+    }
+    if 'year' in graph.attributes:
+        years = _years(graph.attributes['year'])
+        present = ~np.isnan(years)
+        first, last = np.full(communities, np.inf), np.full(communities, -np.inf)
+        np.minimum.at(first, labels[present], years[present])
+        np.maximum.at(last, labels[present], years[present])
+        # Communauté sans année connue : -1, comme les colonnes d'années des graphes compacts
+        attributes['year_min'] = np.where(np.isfinite(first), first, -1).astype(np.int64)
+        attributes['year_max'] = np.where(np.isfinite(last), last, -1).astype(np.int64)
+    return CompactGraph([f"c{k}" for k in range(communities)], links.row, links.col, graph.directed,
+                        attributes, {'weight': links.data.astype(np.float64)})
+
+def write_summary_json(supergraph, file_path):
+    """ Communities and inter-community edges of a supergraph as one JSON document. """
+    names = [name for name in supergraph.attributes if name != 'label']
+    columns = {name: np.asarray(supergraph.attributes[name]).tolist() for name in names}
+    summary = {
+        'directed': supergraph.directed,
+        'communities': [{'id': node_id, **{name: columns[name][k] for name in names}} for k, node_id in enumerate(supergraph.ids)],
+        'edges': [{'source': supergraph.ids[u], 'target': supergraph.ids[v], 'weight': w} for u, v, w in
+                  zip(supergraph.src.tolist(), supergraph.dst.tolist(), supergraph.edge_attributes['weight'].tolist())],
+    }
+    temporary_path = file_path + '.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    os.replace(temporary_path, file_path)
+    return file_path
+
+def export_summary(graph, labels, base_path, weight=None, fos=None):
+    """ Write <base_path>_communautes.gexf and .json and return (supergraph, gexf path, json path). """
+    supergraph = community_supergraph(graph, labels, weight, fos)
+    gexf_path = write_gexf(supergraph, f"{base_path}_communautes.gexf")
+    json_path = write_summary_json(supergraph, f"{base_path}_communautes.json")
+    return supergraph, gexf_path, json_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Résumer un graphe en un graphe de communautés (un sommet par communauté), exporté en GEXF et JSON.")
+    parser.add_argument('gexf', help="Fichier GEXF du graphe (son instantané binaire est utilisé s'il existe)")
+    parser.add_argument('--records', help="Fichier de publications d'où lire les FOS, si le graphe n'a pas de colonne 'fos'")
+    parser.add_argument('--type', choices=['1', '2'], default='1', help="'1' réseau de citations, '2' réseau de collaboration (avec --records)")
+    parser.add_argument('--resolution', type=float, default=1.0, help="Résolution de la détection de communautés (défaut : 1.0)")
+    args = parser.parse_args()
+
+    graph = load_compact(args.gexf)
+    weight = 'weight' if 'weight' in graph.edge_attributes else None
+    # Partition Leiden mise en cache : partagée avec le dessin et les analyses du même graphe
+    labels, info = cached_communities(graph, resolution=args.resolution, weight=weight)
+    fos = node_fos(graph, iter_records(args.records), args.type) if args.records else None
+    supergraph, gexf_path, json_path = export_summary(graph, labels, os.path.splitext(args.gexf)[0], weight, fos)
+    print(f"{graph.num_nodes} sommets résumés en {supergraph.num_nodes} communautés et {len(supergraph.src)} liens.")
+    print(f"Graphe des communautés exporté sous : {gexf_path} et {json_path}")